@@ -0,0 +1,102 @@
+"""Time of random plant placement, blue noise versus naive dart throwing.
+
+    python benchmarks/bench_placement.py [--count 100000] [--naive-count 2000]
+
+"place_species" is the placement behind Add Random Plants: Poisson-disk
+darts thrown at whole grid phases at once, for `count` plants of one
+spacing on a plane just large enough to hold them. "naive darts" throws
+one dart at a time and checks it against every plant placed so far, the
+simplest way to keep the spacing, on a plane sized for `naive-count`.
+"uniform" is plain random.uniform placement without any spacing, which
+shows how many plants it leaves overlapping. "neighbour queries" times
+SpatialHash.conflicts for `count` new positions against the placed plants.
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import placement   # noqa: E402
+
+
+SPACING = 0.25      # BABYSBREATH in garden_planning.py
+DENSITY = 0.6       # plants per spacing squared a Poisson-disk layout reaches
+
+
+def bounds_for(count):
+    side = math.sqrt(count / DENSITY) * SPACING
+    return (0.0, 0.0, side, side)
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return time.perf_counter() - start, result
+
+
+def naive_darts(bounds, count, seed, attempts=30):
+    rng = random.Random(seed)
+    min_x, min_y, max_x, max_y = bounds
+    placed = np.empty((count, 2))
+    total = 0
+    for _ in range(count * attempts):
+        if total == count:
+            break
+        dart = (rng.uniform(min_x, max_x), rng.uniform(min_y, max_y))
+        if not total or ((placed[:total] - dart) ** 2).sum(axis=1).min() >= SPACING * SPACING:
+            placed[total] = dart
+            total += 1
+    return placed[:total]
+
+
+def too_close(points):
+    """How many points have a neighbour closer than SPACING"""
+    grid = placement.SpatialHash(points, SPACING)
+    return sum(len(grid.query(point, SPACING)) > 1 for point in points)
+
+
+def report(name, seconds, points, wanted):
+    print(f"{name:>17}: {seconds:7.3f} s {len(points):>9,} / {wanted:,} plants")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000, help="plants for the blue-noise layout")
+    parser.add_argument("--naive-count", type=int, default=2000, help="plants for naive dart throwing")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    bounds = bounds_for(args.count)
+    print(f"spacing {SPACING}, plane {bounds[2]:.1f} x {bounds[3]:.1f}")
+    seconds, (points, _) = timed(lambda: placement.place_species(bounds, [(SPACING, args.count)], args.seed))
+    report("place_species", seconds, points, args.count)
+
+    grid = placement.SpatialHash(points, SPACING)
+    centres = np.random.default_rng(args.seed).uniform(bounds[:2], bounds[2:], (args.count, 2))
+    seconds, conflicts = timed(lambda: grid.conflicts(centres, SPACING))
+    print(f"{'neighbour queries':>17}: {seconds:7.3f} s {args.count:>9,} positions, "
+          f"{np.count_nonzero(conflicts):,} too close to a plant")
+
+    naive_bounds = bounds_for(args.naive_count)
+    print(f"\nspacing {SPACING}, plane {naive_bounds[2]:.1f} x {naive_bounds[3]:.1f}")
+    seconds, points = timed(lambda: placement.place_species(naive_bounds, [(SPACING, args.naive_count)],
+                                                            args.seed)[0])
+    report("place_species", seconds, points, args.naive_count)
+    seconds, points = timed(lambda: naive_darts(naive_bounds, args.naive_count, args.seed))
+    report("naive darts", seconds, points, args.naive_count)
+
+    rng = random.Random(args.seed)
+    points = np.array([(rng.uniform(0.0, naive_bounds[2]), rng.uniform(0.0, naive_bounds[3]))
+                       for _ in range(args.naive_count)])
+    print(f"{'uniform':>17}: {too_close(points):,} of {len(points):,} plants closer than the spacing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Time and peak memory of drawing an L-system skeleton, whole versus streamed.
+
+    python benchmarks/bench_streaming.py [--depth 11] [--chunk-size 65536]
+
+"whole" derives the full string with LSystem.derive, one array per week,
+and runs the turtle over it in one piece, as rebuilding a plant from its
+string does. "streamed" is skeleton_arrays: derivation_chunks expands the
+string depth first and turtle_chunks draws it chunk by chunk, so only the
+output arrays grow with the derivation. "derivation only" consumes
+derivation_chunks without drawing, showing the flat memory of the stream
+itself. Peak memory is what tracemalloc sees, NumPy arrays included;
+tracing slows Python down a lot, so times come from a separate run.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lsystem     # noqa: E402
+
+
+RULES = {
+    "angle_of_branching": 45,
+    "radius": 0.05,
+    "height": 0.5,
+    "axiom": "FA",
+    "productions": {"A": "F[&A]///[&A]////[&A]"},
+}
+
+
+def measure(run):
+    """(seconds, peak MB, result) of a call, timed and traced in two runs"""
+    start = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2 ** 20, result
+
+
+def whole(system, depth):
+    symbols = system.axiom
+    for age in range(1, depth + 1):
+        symbols = system.derive(symbols, age)
+    co, edges, radii = zip(*lsystem.turtle_chunks([symbols.tobytes()], RULES, (0.0, 0.0, 0.0), 0.5, 0.05))
+    return co[0], edges[0], radii[0]
+
+
+def streamed(system, depth, chunk_size):
+    return lsystem.skeleton_arrays(system, RULES, depth, (0.0, 0.0, 0.0), 0.5, 0.05, chunk_size)
+
+
+def derivation_only(system, depth, chunk_size):
+    return sum(len(chunk) for chunk in lsystem.derivation_chunks(system, depth, chunk_size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=11, help="derivations (each one triples the string)")
+    parser.add_argument("--chunk-size", type=int, default=lsystem.CHUNK_SIZE, help="symbols per chunk")
+    args = parser.parse_args()
+
+    system = lsystem.compile_rules(RULES)
+    symbols = int(system.symbol_counts(args.depth).sum())
+    print(f"depth {args.depth}: {symbols:,} symbols, chunks of {args.chunk_size:,}")
+
+    seconds, peak, length = measure(lambda: derivation_only(system, args.depth, args.chunk_size))
+    assert length == symbols
+    print(f"{'derivation only':>16}: {seconds:7.2f} s {peak:9.1f} MB peak")
+
+    results = []
+    for name, run in (("whole", lambda: whole(system, args.depth)),
+                      ("streamed", lambda: streamed(system, args.depth, args.chunk_size))):
+        seconds, peak, arrays = measure(run)
+        results.append(arrays)
+        size = sum(array.nbytes for array in arrays) / 2 ** 20
+        print(f"{name:>16}: {seconds:7.2f} s {peak:9.1f} MB peak "
+              f"({len(arrays[0]):,} vertices, {size:.1f} MB of output)")
+    assert all((a == b).all() for a, b in zip(*results)), "the streamed skeleton differs from the whole one"
+
+
+if __name__ == "__main__":
+    main()
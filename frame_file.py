@@ -0,0 +1,321 @@
+"""Growth cache files: every week of a simulated garden, memory-mapped.
+
+A cache is written once by FrameFileWriter while a Garden grows, and read
+by FrameFile in any later session. All nodes and branches sit in two
+fixed-layout record arrays, plus a (week, plant) table of where each plant
+starts and how much of it has grown. Plants that only ever add nodes are
+stored once, as their last week, and earlier weeks are prefixes of that;
+plants rebuilt by rewriting keep one run per rebuild. Reading a week
+therefore only touches the records of that week's nodes.
+
+Layout: magic and version, the node, branch and week arrays, a JSON header
+with the plants, their fingerprint and the array offsets, and a trailer
+holding the header offset. Numbers are little-endian; positions and
+rotations are float32. A file is written next to its path and moved into
+place once complete, so a reader never sees it half written.
+
+pack_plants and unpack_plants keep one week in the same node layout, as
+flat float32 and int32 arrays that a .blend file stores as ID properties.
+"""
+
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+import growth_engine
+
+
+MAGIC = b"GARDENFC"
+VERSION = 2
+ALIGN = 64
+KINDS = (growth_engine.STEM, growth_engine.LEAF, growth_engine.FLOWER)
+
+NODE_DTYPE = np.dtype([("location", "<f4", 3), ("rotation", "<f4", 4), ("tip", "<f4", 3),
+                       ("length", "<f4"), ("frame", "<i4"), ("branch", "<i4"), ("kind", "u1")])
+BRANCH_DTYPE = np.dtype([("parent", "<i4"), ("depth", "<i4")])
+WEEK_DTYPE = np.dtype([("node_start", "<i8"), ("node_count", "<i4"), ("branch_start", "<i8"),
+                       ("branch_count", "<i4"), ("derivations", "<i4")])
+
+_TRAILER = struct.Struct("<Q8s")
+
+
+def _derivations(plant):
+    extra = plant.extra_state()
+    return extra[0] if plant.rewrites and extra else 0
+
+
+def garden_fingerprint(garden):
+    """Digest of everything the growth of a garden's plants depends on.
+
+    Covers the garden seed and growth mode (the vectorized mode places
+    nodes from its own random stream) and every plant's id, type, location,
+    size, seed and growth rules, so a cache is only replayed for the garden
+    it was grown from. Plant order does not matter.
+    """
+    rules = {plant_type: repr(garden.rules[plant_type])
+             for plant_type in {plant.type for plant in garden.plants.values()}}
+    plants = sorted((plant.id, plant.type, tuple(plant.location), plant.radius, plant.height, plant.seed,
+                     rules[plant.type]) for plant in garden.plants.values())
+    return hashlib.blake2b(repr((garden.seed, garden.vectorized, plants)).encode(),
+                           digest_size=16).hexdigest()
+
+
+def node_records(nodes):
+    """NODE_DTYPE records of growth_engine.Nodes"""
+    records = np.zeros(len(nodes), dtype=NODE_DTYPE)
+    if nodes:
+        records["location"] = [node.location for node in nodes]
+        records["rotation"] = [node.rotation for node in nodes]
+        records["tip"] = [node.tip for node in nodes]
+        records["length"] = [node.length for node in nodes]
+        records["frame"] = [node.frame for node in nodes]
+        records["branch"] = [node.branch for node in nodes]
+        records["kind"] = [KINDS.index(node.kind) for node in nodes]
+    return records
+
+
+def node_objects(records, first_index=0):
+    """growth_engine.Nodes of NODE_DTYPE records, indexed from `first_index`"""
+    columns = zip(records["kind"].tolist(), records["branch"].tolist(),
+                  records["location"].tolist(), records["rotation"].tolist(),
+                  records["length"].tolist(), records["frame"].tolist(), records["tip"].tolist())
+    return [growth_engine.Node(index, KINDS[kind], branch, tuple(location), tuple(rotation), length, frame,
+                               tuple(tip))
+            for index, (kind, branch, location, rotation, length, frame, tip) in enumerate(columns, first_index)]
+
+
+class FrameFileWriter:
+    """Records the plants of a Garden after each week, written out on close.
+
+        with FrameFileWriter(path, garden) as writer:
+            for week in range(1, 41):
+                garden.grow(week)
+                writer.add(week)
+
+    Weeks must be added in order, without gaps. The garden's plants at the
+    time the writer is made are the plants recorded.
+    """
+
+    def __init__(self, path, garden):
+        self.path = path
+        self.garden = garden
+        self.plant_ids = list(garden.plants)
+        self.fingerprint = garden_fingerprint(garden)
+        self.first = None
+        self._weeks = []        # per week: (run, node count, branch count, derivations) per plant
+        self._runs = []         # [nodes, branches] of every run, the latest lists seen
+        self._current = {}      # plant id -> (run index, derivations)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+
+    def add(self, frame):
+        """Record the garden as it is after week `frame`"""
+        if self.first is None:
+            self.first = frame
+        elif frame != self.first + len(self._weeks):
+            raise ValueError(f"Week {frame} does not follow week {self.first + len(self._weeks) - 1}")
+        row = []
+        for plant_id in self.plant_ids:
+            # Parallel growth hands back new plant objects, so runs are told apart by
+            # rebuilds, not by identity: only rewriting plants ever drop their nodes
+            plant = self.garden.plants[plant_id]
+            derivations = _derivations(plant)
+            run, run_derivations = self._current.get(plant_id, (None, None))
+            if run is None or (plant.rewrites and derivations != run_derivations):
+                run = len(self._runs)
+                self._runs.append(None)
+                self._current[plant_id] = (run, derivations)
+            self._runs[run] = (plant.nodes, plant.branches)
+            row.append((run, len(plant.nodes), len(plant.branches), derivations))
+        self._weeks.append(row)
+
+    def close(self):
+        """Write the file; returns its size in bytes.
+
+        The file is written to `path` + ".tmp" and then replaces `path`, so
+        a cache that is open elsewhere is never truncated under its reader.
+        """
+        node_starts, branch_starts = [], []
+        node_total = branch_total = 0
+        for nodes, branches in self._runs:
+            node_starts.append(node_total)
+            branch_starts.append(branch_total)
+            node_total += len(nodes)
+            branch_total += len(branches)
+
+        nodes = node_records([node for run_nodes, _ in self._runs for node in run_nodes])
+        branches = np.zeros(branch_total, dtype=BRANCH_DTYPE)
+        branches["parent"] = [branch.parent for _, run_branches in self._runs for branch in run_branches]
+        branches["depth"] = [branch.depth for _, run_branches in self._runs for branch in run_branches]
+        weeks = np.zeros((len(self._weeks), len(self.plant_ids)), dtype=WEEK_DTYPE)
+        for week, row in enumerate(self._weeks):
+            for plant, (run, node_count, branch_count, derivations) in enumerate(row):
+                weeks[week, plant] = (node_starts[run], node_count, branch_starts[run], branch_count, derivations)
+
+        plants = [self.garden.plants[plant_id] for plant_id in self.plant_ids]
+        header = {
+            "version": VERSION,
+            "first": self.first if self.first is not None else 0,
+            "seed": self.garden.seed,
+            "fingerprint": self.fingerprint,
+            "plants": [{"id": plant.id, "type": plant.type, "location": list(plant.location),
+                        "radius": plant.radius, "height": plant.height, "seed": plant.seed,
+                        "rewrites": plant.rewrites} for plant in plants],
+            "arrays": {},
+        }
+        partial = self.path + ".tmp"
+        try:
+            with open(partial, "wb") as cache:
+                cache.write(MAGIC + struct.pack("<I", VERSION))
+                for name, array in (("nodes", nodes), ("branches", branches), ("weeks", weeks)):
+                    cache.write(b"\0" * (-cache.tell() % ALIGN))
+                    header["arrays"][name] = [cache.tell(), list(array.shape)]
+                    cache.write(array.tobytes())
+                offset = cache.tell()
+                cache.write(json.dumps(header).encode())
+                cache.write(_TRAILER.pack(offset, MAGIC))
+                size = cache.tell()
+            os.replace(partial, self.path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return size
+
+
+class FrameFile:
+    """A growth cache opened for reading; weeks come back as GardenSnapshots.
+
+    The arrays are memory-mapped, so opening is cheap whatever the file
+    size. Nodes are turned into growth_engine.Node records the first time a
+    week needs them and shared by later weeks, the same way the in-memory
+    FrameCache shares them, so Garden.restore only sees what changed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as cache:
+            if cache.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a growth cache")
+            cache.seek(-_TRAILER.size, 2)
+            offset, magic = _TRAILER.unpack(cache.read(_TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is incomplete")
+            end = cache.seek(0, 2) - _TRAILER.size
+            cache.seek(offset)
+            header = json.loads(cache.read(end - offset))
+        if header["version"] != VERSION:
+            raise ValueError(f"{path} has cache version {header['version']}, expected {VERSION}")
+
+        raw = np.memmap(path, dtype=np.uint8, mode="r")
+        arrays = {}
+        for (name, (start, shape)), dtype in zip(header["arrays"].items(),
+                                                 (NODE_DTYPE, BRANCH_DTYPE, WEEK_DTYPE)):
+            size = int(np.prod(shape)) * dtype.itemsize
+            arrays[name] = raw[start:start + size].view(dtype).reshape(shape)
+        self.nodes = arrays["nodes"]
+        self.branches = arrays["branches"]
+        self.weeks = arrays["weeks"]
+        self.first = header["first"]
+        self.seed = header["seed"]
+        self.fingerprint = header["fingerprint"]
+        self.plants = header["plants"]
+        self.plant_ids = [plant["id"] for plant in self.plants]
+        self._runs = {}     # node start -> Nodes of that run built so far
+        self._extra = {}    # (plant index, node start) -> extra state of the run
+
+    def __len__(self):
+        return len(self.weeks)
+
+    def __contains__(self, frame):
+        return self.first <= frame < self.first + len(self.weeks)
+
+    @property
+    def last(self):
+        return self.first + len(self.weeks) - 1
+
+    def _run_nodes(self, start, count):
+        built = self._runs.setdefault(start, [])
+        if len(built) < count:
+            built.extend(node_objects(self.nodes[start + len(built):start + count], len(built)))
+        return tuple(built[:count])
+
+    def snapshot(self, frame):
+        """GardenSnapshot of week `frame`, for Garden.restore"""
+        if frame not in self:
+            raise KeyError(f"Week {frame} is not in {self.path} (weeks {self.first}-{self.last})")
+        snapshot = growth_engine.GardenSnapshot(frame, ())
+        for index, (plant, row) in enumerate(zip(self.plants, self.weeks[frame - self.first].tolist())):
+            node_start, node_count, branch_start, branch_count, derivations = row
+            records = self.branches[branch_start:branch_start + branch_count]
+            branches = tuple(zip(records["parent"].tolist(), records["depth"].tolist()))
+            extra = None
+            if plant["rewrites"]:
+                # Symbols are not stored: the plant derives again from its axiom if it grows on
+                extra = self._extra.setdefault((index, node_start), (derivations, None))
+            snapshot.plants[plant["id"]] = (self._run_nodes(node_start, node_count), branches, extra)
+        return snapshot
+
+
+def pack_plants(plants):
+    """The nodes and branches `plants` have now, as flat typed arrays.
+
+    Returns a dict of "node_floats" (float32: location, rotation, tip and
+    length of every node), "node_ints" (int32: frame, branch and kind),
+    "branches" (int32: parent and depth) and "plants" (int32: node count,
+    branch count and derivations per plant). A None plant stores nothing.
+    """
+    grown = [plant for plant in plants if plant is not None]
+    records = node_records([node for plant in grown for node in plant.nodes])
+    floats = np.column_stack((records["location"], records["rotation"], records["tip"], records["length"]))
+    ints = np.column_stack((records["frame"], records["branch"], records["kind"])).astype(np.int32)
+    branches = np.array([(branch.parent, branch.depth) for plant in grown for branch in plant.branches],
+                        dtype=np.int32).reshape(-1, 2)
+    counts = np.array([(len(plant.nodes), len(plant.branches), _derivations(plant)) if plant is not None
+                       else (0, 0, 0) for plant in plants], dtype=np.int32).reshape(-1, 3)
+    return {"node_floats": floats.astype(np.float32).ravel(), "node_ints": ints.ravel(),
+            "branches": branches.ravel(), "plants": counts.ravel()}
+
+
+def unpack_plants(arrays, frame, plants):
+    """GardenSnapshot of week `frame` from the arrays pack_plants made of `plants`.
+
+    `arrays` may be any mapping of sequences, such as the ID property group
+    the arrays were stored in. Raises ValueError if they do not fit `plants`.
+    """
+    floats = np.asarray(arrays["node_floats"], dtype=np.float32).reshape(-1, 11)
+    ints = np.asarray(arrays["node_ints"], dtype=np.int32).reshape(-1, 3)
+    branches = np.asarray(arrays["branches"], dtype=np.int32).reshape(-1, 2).tolist()
+    counts = np.asarray(arrays["plants"], dtype=np.int32).reshape(-1, 3).tolist()
+    if (len(counts) != len(plants) or len(floats) != len(ints)
+            or sum(row[0] for row in counts) != len(floats) or sum(row[1] for row in counts) != len(branches)):
+        raise ValueError("Stored plant state does not match the plants")
+
+    records = np.zeros(len(floats), dtype=NODE_DTYPE)
+    records["location"] = floats[:, 0:3]
+    records["rotation"] = floats[:, 3:7]
+    records["tip"] = floats[:, 7:10]
+    records["length"] = floats[:, 10]
+    records["frame"] = ints[:, 0]
+    records["branch"] = ints[:, 1]
+    records["kind"] = ints[:, 2]
+
+    snapshot = growth_engine.GardenSnapshot(frame, ())
+    node_start = branch_start = 0
+    for plant, (node_count, branch_count, derivations) in zip(plants, counts):
+        if plant is not None and node_count:
+            nodes = tuple(node_objects(records[node_start:node_start + node_count]))
+            extra = (derivations, None) if plant.rewrites else None
+            snapshot.plants[plant.id] = (nodes, tuple(map(tuple, branches[branch_start:branch_start + branch_count])),
+                                         extra)
+        node_start += node_count
+        branch_start += branch_count
+    return snapshot
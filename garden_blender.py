@@ -0,0 +1,2012 @@
+"""Blender side of the Garden Planning add-ons.
+
+garden_planning.py and branching_prototype.py only differ in their plant
+types: each passes its plants_rules to register(), and everything else
+(operators, frame handlers, the panel and the state behind them) lives
+here. Enable one of the two add-ons at a time, they share this module's
+state.
+"""
+
+import bpy
+import bpy.ops
+import bpy.app
+import math
+import random
+import bmesh
+import time
+import uuid
+from collections import Counter
+from mathutils import Vector
+
+from bpy.props import FloatProperty
+from bpy_extras.io_utils import ExportHelper, ImportHelper
+
+import frame_file
+import growth_engine
+import lsystem
+import placement
+import plant_mesh
+import transform_kernel
+
+plants_rules = {}   # plant type -> growth rules of the enabled add-on, filled in by register()
+
+# Operator: Clear scene
+# Bulk delete: everything the garden owns is collected first and freed in one batch_remove
+def orphaned_data(objects):
+    """Object data, actions and materials nothing else uses once `objects` are gone"""
+    data_users = Counter(obj.data for obj in objects if obj.data is not None)
+    data = [data for data, count in data_users.items() if data.users == count]
+    action_users = Counter(obj.animation_data.action for obj in objects
+                           if obj.animation_data and obj.animation_data.action)
+    actions = [action for action, count in action_users.items() if action.users == count]
+    material_users = Counter(material for owner in data
+                             for material in getattr(owner, "materials", ()) if material)
+    for obj in objects:
+        for slot in obj.material_slots:
+            if slot.link == 'OBJECT' and slot.material:
+                material_users[slot.material] += 1
+    materials = [material for material, count in material_users.items() if material.users == count]
+    return data + actions + materials
+
+def plant_owned_ids(scene, keep_roots=False):
+    """Branch collections, grown objects and their own data, found from the plant registry"""
+    collections, objects = [], []
+    for record in scene.garden_plants:
+        if record.collection is None:
+            continue
+        if not keep_roots:
+            collections.append(record.collection)
+        collections.extend(record.collection.children_recursive)
+        objects.extend(obj for obj in record.collection.all_objects
+                       if not (keep_roots and obj == record.root))
+    return collections + objects + orphaned_data(objects)
+
+def scene_owned_ids(scene):
+    """What Clear Scene removes: every collection and the objects in them, loose meshes
+    and cameras, the variant and subtree libraries behind instanced plants with their
+    Geometry Nodes groups, the data and materials only they use, and data that is
+    already orphaned"""
+    collections = list(scene.collection.children_recursive)
+    loose = scene.collection.objects
+    objects = [obj for obj in scene.collection.all_objects
+               if obj.type in {'MESH', 'CAMERA'} or obj.name not in loose]
+    # The libraries are not linked to the scene, see variant_collection and subtree_library
+    libraries = [collection for collection in bpy.data.collections
+                 if collection.name.startswith(("Garden_Variants_", "Garden_Subtrees_"))]
+    groups = [bpy.data.node_groups.get(f"{library.name}_Scatter") for library in libraries]
+    library_objects = {obj for library in libraries for obj in library.objects}
+    objects += library_objects.difference(objects)
+    owned = collections + libraries + [group for group in groups if group] + objects + orphaned_data(objects)
+    owned += [mesh for mesh in bpy.data.meshes if mesh.users == 0]
+    owned += [material for material in bpy.data.materials if material.users == 0]
+    return owned
+
+class ClearGrowingObjectsOperator(bpy.types.Operator):
+    """Clear scene completely"""
+    bl_idname = "scene.clear_growing_objects"
+    bl_label = "Clear Growing Objects"
+    
+    def execute(self, context):
+        scene = context.scene
+        # Plant state of older versions, and the stored garden state
+        for key in ('growing_objects', 'initial_object_properties', 'age_object', 'garden_state'):
+            scene.pop(key, None)
+
+        owned = scene_owned_ids(scene)
+        removed = sum(isinstance(id_data, bpy.types.Material) for id_data in owned)
+        scene.garden_plants.clear()
+        scene.garden_baked = False
+        forget_plants()
+        bpy.data.batch_remove(owned)
+        
+        self.report({'INFO'}, "Removed {} data-blocks ({} materials), reused shared materials {} times".format(
+            len(owned), removed, material_stats["reused"]))
+        material_stats["reused"] = 0
+
+        return {'FINISHED'}
+    
+# Operator: Add plane
+class OBJECT_OT_AddCustomPlane(bpy.types.Operator):
+    """Add a Custom Plane"""
+    bl_idname = "mesh.add_custom_plane"
+    bl_label = "Add Custom Plane"
+    
+    def execute(self, context):
+        scene = context.scene
+        size = scene.plane_size
+        color = scene.plane_color
+
+        # Add the plane with the specified size and color
+        bpy.ops.mesh.primitive_plane_add(size=size, enter_editmode=False, align='WORLD', location=(0, 0, 0))
+        plane = bpy.context.active_object
+        plane.name = "soil"
+
+        # Apply color to the plane
+        self.set_color_plane(plane, color)
+
+        return {'FINISHED'}
+    
+    def set_color_plane(self, obj, color):
+        obj.data.materials.append(pooled_material(color, use_nodes=True))
+
+        
+# Operator: Add camera
+class OBJECT_OT_AddCamera(bpy.types.Operator):
+    """Add a Camera to the Scene"""
+    bl_idname = "object.add_camera"
+    bl_label = "Add Camera"
+
+    def execute(self, context):
+        scene = context.scene
+        
+        plane_obj = bpy.data.objects.get("soil")
+        
+        if not plane_obj:
+            self.report({'ERROR'}, "Please add plane to the scene")
+            return {'CANCELLED'}
+
+        else:
+            cam_data = bpy.data.cameras.new(name='New_Scene_Camera')
+        
+            cam_obj = bpy.data.objects.new('New_Scene_Camera', cam_data)
+            
+            scene.collection.objects.link(cam_obj)
+                # Calculate camera position
+            plane_dimensions = plane_obj.dimensions
+            plane_center = plane_obj.location
+            
+            # Set the camera distance based on the size of the plane, and lift it up
+            camera_distance = max(plane_dimensions.x, plane_dimensions.y) * 3.5
+            camera_height = plane_dimensions.z + 6.0  # Adjust multiplier as needed
+            
+            # Set camera to look from behind the plane and above, looking at the center
+            cam_obj.location = Vector((plane_center.x, plane_center.y - camera_distance, plane_center.z  + camera_height))
+            
+            # Make the camera look at the center of the plane
+            self.look_at(cam_obj, plane_center)
+
+        return {'FINISHED'}
+    
+    def look_at(self, obj, target):
+        """Direct an object's -Z axis to look towards a target point.""" 
+        direction = target - obj.location
+        rot_quat = direction.to_track_quat('-Z', 'Y')
+        obj.rotation_euler = rot_quat.to_euler()
+
+# Growth engine state: the engine owns the plants, Blender only mirrors them
+garden = growth_engine.Garden(plants_rules)
+plant_collections = {}  # plant id -> collection name of every branch, by branch index
+plant_meshes = {}       # plant id -> (PlantMesh, object name) in merged mesh mode
+registry_index = {}     # plant id -> index in scene.garden_plants
+plant_objects = {}      # plant id -> object names of the grown nodes, in node order
+frame_cache = growth_engine.FrameCache()    # week -> garden snapshot, for scrubbing
+plant_lods = {}         # plant id -> (LOD level, grown nodes it was applied to)
+bounds_cache = {}       # plant id -> (node count, centre, diameter) of its grown nodes
+culled_plants = set()   # plant ids out of the camera's view, grown in the engine only
+pending_plants = set()  # culled plant ids whose growth the scene has not caught up with
+
+class PlantRecord(bpy.types.PropertyGroup):
+    """A planted plant, kept in the scene so the garden survives save and load"""
+    plant_type: bpy.props.StringProperty(name="Plant Type")
+    collection: bpy.props.PointerProperty(name="Collection", type=bpy.types.Collection)
+    root: bpy.props.PointerProperty(name="Planted Stem", type=bpy.types.Object)
+    radius: bpy.props.FloatProperty(name="Radius")
+    height: bpy.props.FloatProperty(name="Height")
+    active_branches: bpy.props.IntProperty(name="Active Branches", default=1)
+    next_growth_frame: bpy.props.IntProperty(name="Next Growth Week")
+    seed: bpy.props.IntProperty(name="Seed", description="Seed of the plant's random streams")
+
+def plant_record(scene, plant_id):
+    records = scene.garden_plants
+    index = registry_index.get(plant_id, -1)
+    if 0 <= index < len(records) and records[index].name == plant_id:
+        return records[index]
+    return records.get(plant_id)
+
+def engine_plant(record):
+    """Create the growth engine side of a registry record"""
+    x, y, z = record.root.location
+    plant = garden.add_plant(record.name, record.plant_type, (x, y, z), record.radius, record.height,
+                             record.seed)
+    plant_collections[record.name] = [record.collection.name]
+    growth_cache["garden"] = None
+    return plant
+
+def adopt_plant(scene, collection, root_obj, radius, height):
+    """Add a planted collection to the scene registry and the growth engine"""
+    plant_type = collection.name.split("_")[0]
+    if plant_type not in plants_rules:
+        return None
+    record = scene.garden_plants.add()
+    record.name = collection.name
+    record.plant_type = plant_type
+    record.collection = collection
+    record.root = root_obj
+    record.radius = radius
+    record.height = height
+    record.seed = growth_engine.derive_seed(scene.garden_seed, collection.name)
+    registry_index[record.name] = len(scene.garden_plants) - 1
+    frame_cache.clear()     # cached weeks do not know the new plant
+    return engine_plant(record)
+
+def rebuild_garden(scene):
+    """Rebuild the growth engine and lookup tables from the scene registry"""
+    forget_plants()
+    if not scene.garden_plants:
+        # Files saved before the registry existed: adopt the initial objects
+        for obj_name, props in scene.get('initial_object_properties', {}).items():
+            collection = bpy.data.collections.get(props['collection_name'])
+            root_obj = bpy.data.objects.get(obj_name)
+            if collection and root_obj:
+                adopt_plant(scene, collection, root_obj, props['radius'], props['height'])
+        for key in ('growing_objects', 'initial_object_properties', 'age_object'):
+            scene.pop(key, None)     # moved into the registry
+        return
+    for index, record in enumerate(scene.garden_plants):
+        registry_index[record.name] = index
+        if record.collection and record.root and record.plant_type in plants_rules:
+            engine_plant(record)
+
+@bpy.app.handlers.persistent
+def rebuild_garden_on_load(dummy):
+    resync_garden(bpy.context.scene)
+
+def forget_plants():
+    garden.clear()
+    plant_collections.clear()
+    plant_meshes.clear()
+    registry_index.clear()
+    plant_objects.clear()
+    frame_cache.clear()
+    plant_lods.clear()
+    bounds_cache.clear()
+    growth_job.update(target=None, weeks=[], week=None)
+    culled_plants.clear()
+    pending_plants.clear()
+    growth_cache["garden"] = None
+
+# Function to add a new node
+def create_branch(scene,parent_collection):
+    branch_collection_name = f"{parent_collection.name}_Branch"
+    branch_collection = bpy.data.collections.new(branch_collection_name)
+    parent_collection.children.link(branch_collection)  # Link the new branch collection as a child
+    print(f"{branch_collection_name} added to {parent_collection.name} ")
+    return branch_collection
+
+def part_name(node, rules):
+    if node.kind == growth_engine.LEAF:
+        return "Leaf"
+    return rules.get("flower_part")     # None: an L-system K with no flower drawn
+
+# Material slots of merged plant meshes and part prototypes, see plant_mesh
+SLOT_COLORS = (
+    (0.5, 0.2, 0.1, 1.0),   # stem
+    None,                   # leaf, left on the default material like specific_object does
+    (1.0, 0.8, 0.0, 1.0),   # sunflower petals
+    (0.5, 0.2, 0.0, 1.0),   # sunflower centre
+    (0.7, 0.8, 1.0, 1.0),   # baby's breath flower
+)
+
+def write_plant_mesh(mesh, builder):
+    """Bulk-write the arrays of a PlantMesh into a Blender mesh"""
+    co, loops, starts, totals, materials, smooth = builder.arrays()
+    mesh.clear_geometry()
+    mesh.vertices.add(len(co))
+    mesh.loops.add(len(loops))
+    mesh.polygons.add(len(starts))
+    mesh.vertices.foreach_set("co", co.ravel())
+    mesh.loops.foreach_set("vertex_index", loops)
+    mesh.polygons.foreach_set("loop_start", starts)
+    if bpy.app.version < (4, 0, 0):
+        mesh.polygons.foreach_set("loop_total", totals)   # derived from loop_start since 4.0
+    mesh.polygons.foreach_set("material_index", materials)
+    mesh.polygons.foreach_set("use_smooth", smooth)
+    mesh.update(calc_edges=True)
+
+# Merged mesh mode: one object per plant instead of one per node
+def merged_plant_object(plant_id, collection):
+    """Create the single object that holds everything a plant grows"""
+    mesh = bpy.data.meshes.new(f"{plant_id}_mesh")
+    for color in SLOT_COLORS:
+        mesh.materials.append(pooled_material(color) if color else None)
+    obj = bpy.data.objects.new(mesh.name, mesh)
+    collection.objects.link(obj)
+    return obj
+
+def merged_builder(plant, nodes, rules):
+    """PlantMesh of `nodes` at the plant's current LOD"""
+    level = plant_lods.get(plant.id, (0, 0))[0]
+    builder = plant_mesh.PlantMesh(plant.radius, plant_mesh.LOD_LEVELS[level][1])
+    builder.add_nodes(plant_mesh.lod_nodes(nodes, plant.branches, level), rules.get("flower_part"))
+    return builder
+
+def apply_merged_growth(step, collection, rules):
+    plant = garden.plants[step.plant_id]
+    builder, obj_name = plant_meshes.get(step.plant_id, (None, ""))
+    obj = bpy.data.objects.get(obj_name)
+    if builder is None or obj is None:
+        # First growth (or the object was deleted): start from everything grown so far
+        obj = merged_plant_object(step.plant_id, collection)
+        builder = merged_builder(plant, plant.nodes[1:], rules)
+        plant_meshes[step.plant_id] = (builder, obj.name)
+    else:
+        level = plant_lods.get(plant.id, (0, 0))[0]
+        builder.add_nodes(plant_mesh.lod_nodes(step.nodes, plant.branches, level), rules.get("flower_part"))
+    write_plant_mesh(obj.data, builder)
+
+# Streamed skeleton mode: an L-system plant is one edge mesh, thickened by a Skin modifier
+def write_skeleton_mesh(mesh, co, edges, radii):
+    """Bulk-write the arrays of lsystem.skeleton_arrays into a Blender mesh"""
+    mesh.clear_geometry()
+    mesh.vertices.add(len(co))
+    mesh.edges.add(len(edges))
+    mesh.vertices.foreach_set("co", co.ravel())
+    mesh.edges.foreach_set("vertices", edges.ravel())
+    if not mesh.skin_vertices:
+        mesh.skin_vertices.new()
+    mesh.skin_vertices[0].data.foreach_set("radius", radii.repeat(2))
+    mesh.update()
+
+def apply_skeleton_growth(plant, collection, rules):
+    _, obj_name = plant_meshes.get(plant.id, (None, ""))
+    obj = bpy.data.objects.get(obj_name)
+    if obj is None:
+        obj = merged_plant_object(plant.id, collection)
+        obj.modifiers.new("Skin", 'SKIN')
+        plant_meshes[plant.id] = (None, obj.name)
+    co, edges, radii = lsystem.skeleton_arrays(lsystem.compile_rules(rules), rules, plant.derived[0],
+                                               plant.nodes[0].tip, plant.height, plant.radius,
+                                               seed=plant.seed)
+    write_skeleton_mesh(obj.data, co, edges, radii)
+# Shared subtree mode: every distinct L-system subtree is one mesh, placed as instances
+def subtree_library(plant_type, rules, depth, length, radius):
+    """Collections holding each distinct subtree of a derivation, by level.
+
+    Level k has one child collection per lsystem.SubtreeDAG node at that
+    level: the node's own skeleton plus an instancer for its child subtrees,
+    which come from level k + 1. Found by name after the first build, so
+    plants of the same type, age and size share one library. Returns the
+    level holding the whole plant.
+    """
+    name = f"Garden_Subtrees_{plant_type}_d{depth}_{length:g}x{radius:g}"
+    top = bpy.data.collections.get(f"{name}_L0")
+    if top is not None:
+        return top
+
+    dag = lsystem.SubtreeDAG(lsystem.compile_rules(rules), depth)
+    motions = dag.motions(rules, length)
+    levels = {}
+    for node, children in enumerate(dag.children):
+        if children:
+            levels.setdefault(dag.levels[node], []).append(node)
+    slots = {node: slot for nodes in levels.values() for slot, node in enumerate(nodes)}
+    libraries = {level: bpy.data.collections.new(f"{name}_L{level + 1}") for level in levels}
+
+    for level, nodes in levels.items():
+        for slot, node in enumerate(nodes):
+            co, edges, radii, placements = dag.node_geometry(node, rules, length, radius, motions)
+            # Zero-padded so the children of a level sort in slot order
+            subtree = bpy.data.collections.new(f"{name}_L{level + 1}_{slot:05d}")
+            libraries[level].children.link(subtree)
+            if len(edges):
+                mesh = bpy.data.meshes.new(subtree.name)
+                mesh.materials.append(pooled_material(SLOT_COLORS[0]))
+                write_skeleton_mesh(mesh, co, edges, radii)
+                obj = bpy.data.objects.new(mesh.name, mesh)
+                obj.modifiers.new("Skin", 'SKIN')
+                subtree.objects.link(obj)
+            if placements:
+                mesh = scatter_points(f"{subtree.name}_children",
+                                      [position for _, position, _ in placements],
+                                      [slots[child] for child, _, _ in placements],
+                                      transform_kernel.quaternions_to_euler(
+                                          [rotation for _, _, rotation in placements]).tolist(),
+                                      [(1.0, 1.0, 1.0)] * len(placements))
+                obj = bpy.data.objects.new(mesh.name, mesh)
+                obj.modifiers.new("Subtrees", 'NODES').node_group = instance_node_group(libraries[level + 1])
+                subtree.objects.link(obj)
+    return libraries[-1]
+
+def shares_subtrees(rules):
+    system = lsystem.compile_rules(rules)
+    return not system.stochastic and system.balanced
+
+def apply_subtree_growth(plant, collection, rules):
+    _, obj_name = plant_meshes.get(plant.id, (None, ""))
+    obj = bpy.data.objects.get(obj_name)
+    if obj is None:
+        mesh = scatter_points(f"{plant.id}_subtrees", [plant.nodes[0].tip], [0],
+                              [(0.0, 0.0, 0.0)], [(1.0, 1.0, 1.0)])
+        obj = bpy.data.objects.new(mesh.name, mesh)
+        obj.modifiers.new("Subtrees", 'NODES')
+        collection.objects.link(obj)
+        plant_meshes[plant.id] = (None, obj.name)
+    library = subtree_library(plant.type, rules, plant.derived[0], plant.height, plant.radius)
+    obj.modifiers["Subtrees"].node_group = instance_node_group(library)
+
+def apply_growth(scene, steps):
+    """Create the Blender objects for the nodes the engine grew this week"""
+    for step in steps:
+        collections = plant_collections.get(step.plant_id)
+        record = plant_record(scene, step.plant_id)
+        root_obj = record.root if record else None
+        if collections is None or root_obj is None:
+            print(f"Plant '{step.plant_id}' is missing from the scene")
+            continue
+        plant = garden.plants[step.plant_id]
+        record.active_branches = len(plant.branches)
+        record.next_growth_frame = plant.next_growth_frame(step.frame, plants_rules[plant.type])
+        if step.plant_id in culled_plants:
+            pending_plants.add(step.plant_id)   # built whole once it comes into view
+            continue
+        if step.replace:
+            drop_grown(step.plant_id)
+        rules = plants_rules[plant.type]
+        if scene.plant_mesh_mode == 'SUBTREES' and plant.rewrites and shares_subtrees(rules):
+            apply_subtree_growth(plant, bpy.data.collections.get(collections[0]), rules)
+            continue
+        if scene.plant_mesh_mode in {'SKELETON', 'SUBTREES'} and plant.rewrites:
+            apply_skeleton_growth(plant, bpy.data.collections.get(collections[0]), rules)
+            continue
+        if scene.plant_mesh_mode != 'OBJECTS':
+            apply_merged_growth(step, bpy.data.collections.get(collections[0]), rules)
+            continue
+
+        for branch in step.branches:
+            parent_collection = bpy.data.collections.get(collections[branch.parent])
+            collections.append(create_branch(scene, parent_collection).name)
+
+        # One kernel call turns every node rotation of the step into Euler angles
+        eulers = transform_kernel.quaternions_to_euler([node.rotation for node in step.nodes]).tolist()
+        for node, euler in zip(step.nodes, eulers):
+            collection = bpy.data.collections.get(collections[node.branch])
+            if node.kind == growth_engine.STEM:
+                stem_mesh = prototype_mesh("Stem", (record.radius, record.radius, node.length))
+                new_obj = bpy.data.objects.new(collection.name, stem_mesh)   # adjust name of new node
+                collection.objects.link(new_obj)
+            else:
+                new_obj = specific_object(part_name(node, rules), collection)
+            new_obj.location = node.location
+            new_obj.rotation_euler = euler
+            plant_objects.setdefault(step.plant_id, []).append(new_obj.name)
+
+# Frame cache: weeks already grown are restored from snapshots instead of regrown
+def remove_grown(scene, plant):
+    """Delete the Blender side of the nodes and branches a restore dropped"""
+    record = plant_record(scene, plant.id)
+    if record:
+        record.active_branches = len(plant.branches)
+        record.next_growth_frame = plant.next_growth_frame(garden.frame, plants_rules[plant.type])
+    if plant.id in culled_plants:
+        pending_plants.add(plant.id)
+        return
+
+    builder, obj_name = plant_meshes.get(plant.id, (None, ""))
+    obj = bpy.data.objects.get(obj_name)
+    if builder is not None and obj is not None:
+        builder = merged_builder(plant, plant.nodes[1:], plants_rules[plant.type])
+        plant_meshes[plant.id] = (builder, obj.name)
+        write_plant_mesh(obj.data, builder)
+
+    names = plant_objects.get(plant.id, [])
+    doomed = [bpy.data.objects.get(name) for name in names[len(plant.nodes) - 1:]]
+    del names[len(plant.nodes) - 1:]
+    collections = plant_collections.get(plant.id, [])
+    doomed += [bpy.data.collections.get(name) for name in collections[len(plant.branches):]]
+    del collections[len(plant.branches):]
+    bpy.data.batch_remove([id_data for id_data in doomed if id_data is not None])
+
+def drop_grown(plant_id):
+    """Delete everything shown for a plant but its planted stem, before a rebuild"""
+    doomed = [bpy.data.objects.get(name) for name in plant_objects.pop(plant_id, [])]
+    collections = plant_collections.get(plant_id, [])
+    doomed += [bpy.data.collections.get(name) for name in collections[1:]]
+    del collections[1:]
+    builder, obj_name = plant_meshes.get(plant_id, (None, ""))
+    if builder is not None:
+        plant_meshes[plant_id] = (plant_mesh.PlantMesh(builder.radius, builder.segments), obj_name)
+    if plant_id in plant_lods:
+        plant_lods[plant_id] = (plant_lods[plant_id][0], 0)
+    bpy.data.batch_remove([id_data for id_data in doomed if id_data is not None])
+
+def restore_frame(scene, snapshot):
+    """Show a cached week; returns True if anything in the scene changed"""
+    steps = []
+    changed = garden.restore(snapshot)
+    for plant, node_count, branch_count in changed:
+        if plant.rewrites:
+            # L-system plants are rebuilt whole, like when they grow
+            node_count, branch_count = 1, 1
+        elif len(plant.nodes) < node_count:
+            remove_grown(scene, plant)
+            continue
+        step = growth_engine.PlantStep(plant.id, snapshot.frame)
+        step.replace = plant.rewrites
+        step.branches = plant.branches[branch_count:]
+        step.nodes = plant.nodes[node_count:]
+        steps.append(step)
+    apply_growth(scene, steps)
+    return bool(changed)
+
+def plan_frame(scene, frame):
+    """Restore what the caches have toward week `frame`.
+
+    Returns (changed, weeks still to grow). A week in the growth cache file
+    or the frame cache is restored directly. Otherwise growth carries on
+    from the latest state at or before `frame`: the garden as it is, the
+    last cached week, or the planted stems, and every week from there on is
+    grown in order. The garden (and so the frame cache) therefore only ever
+    holds what playing from week 1 gives.
+    """
+    snapshot = cached_week(scene, frame)
+    if snapshot is None:
+        snapshot = frame_cache.get(frame)
+    if snapshot is not None:
+        return restore_frame(scene, snapshot), []
+
+    current = 0 if garden.frame is None else garden.frame
+    snapshot = latest_week(scene, frame)
+    if snapshot is not None and (current > frame or snapshot.frame > current):
+        return restore_frame(scene, snapshot), list(range(snapshot.frame + 1, frame + 1))
+    if current > frame:
+        # Nothing cached this early: start again from the planted stems
+        return restore_frame(scene, garden.planted()), list(range(1, frame + 1))
+    return False, list(range(current + 1, frame + 1))
+
+def finish_week(scene, week, count=None):
+    """Grow `count` more plants of a WeekGrowth (all by default); returns True if any grew.
+
+    The week goes into the frame cache once its last plant has grown. Weeks
+    come from plan_frame, so every week before it has been grown in order.
+    """
+    steps = week.grow(len(week) if count is None else count)
+    apply_growth(scene, steps)
+    if week.finished:
+        frame_cache.put(garden.snapshot(week.frame, frame_cache.peek(week.frame - 1)))
+    return bool(steps)
+
+def grow_to_frame(scene, frame):
+    """Bring the garden to week `frame`; returns True if anything changed"""
+    changed = cancel_growth_job(scene)
+    restored, weeks = plan_frame(scene, frame)
+    changed = restored or changed
+    for week in weeks:
+        changed = finish_week(scene, garden.start_week(week)) or changed
+    return changed
+
+# Budgeted growth: a timer grows the garden a slice of plants per UI tick so playback stays interactive
+growth_job = {"target": None, "weeks": [], "week": None, "slice": 8}
+
+def schedule_growth(frame):
+    """Have the growth timer bring the garden to week `frame`"""
+    growth_job["target"] = frame
+    growth_job["weeks"] = None      # planned again once the week in progress is finished
+    if not bpy.app.timers.is_registered(growth_timer):
+        bpy.app.timers.register(growth_timer)
+
+def cancel_growth_job(scene):
+    """Finish the week the timer is growing, and drop the rest; returns True if anything grew"""
+    week = growth_job["week"]
+    growth_job.update(target=None, weeks=[], week=None)
+    return week is not None and finish_week(scene, week)
+
+def growth_timer():
+    """Grow for at most scene.growth_budget_ms, then hand the UI back"""
+    scene = bpy.context.scene
+    budget = max(scene.growth_budget_ms, 1) / 1000
+    deadline = time.perf_counter() + budget
+    changed = update_culling(scene)     # plants out of view get none of this tick's geometry
+    while time.perf_counter() < deadline:
+        week = growth_job["week"]
+        if week is None:
+            if growth_job["weeks"] is None:
+                restored, growth_job["weeks"] = plan_frame(scene, growth_job["target"])
+                changed = restored or changed
+            if not growth_job["weeks"]:
+                break
+            week = growth_job["week"] = garden.start_week(growth_job["weeks"].pop(0))
+
+        started = time.perf_counter()
+        count = growth_job["slice"]
+        changed = finish_week(scene, week, count) or changed
+        # Size the next slice to take about a quarter of the budget
+        elapsed = max(time.perf_counter() - started, 1e-6)
+        growth_job["slice"] = max(1, min(4096, int(count * budget / 4 / elapsed)))
+        if week.finished:
+            growth_job["week"] = None
+
+    changed = update_culling(scene) or changed
+    if update_lod(scene) or changed:
+        bpy.context.view_layer.update()
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()     # progress in the panel
+    if growth_job["week"] is None and growth_job["weeks"] == []:
+        return None
+    return 0.001
+
+# Level of detail: plants far from the active camera are drawn coarser, see plant_mesh
+def show_node_lod(obj, node, plant, level):
+    """Hide a grown node object, or swap its stem mesh, for LOD `level`"""
+    visible = bool(plant_mesh.lod_nodes([node], plant.branches, level))
+    obj.hide_viewport = obj.hide_render = not visible
+    if visible and node.kind == growth_engine.STEM:
+        segments = plant_mesh.LOD_LEVELS[level][1]
+        mesh = prototype_mesh("Stem", (plant.radius, plant.radius, node.length), segments)
+        if obj.data != mesh:
+            obj.data = mesh
+
+def apply_lod(plant, level):
+    """Show a plant at LOD `level`; returns True if anything changed"""
+    old_level, shown = plant_lods.get(plant.id, (0, 0))
+    plant_lods[plant.id] = (level, shown)
+    builder, obj_name = plant_meshes.get(plant.id, (None, ""))
+    obj = bpy.data.objects.get(obj_name)
+    if builder is not None and obj is not None:
+        if level == old_level:
+            return False
+        builder = merged_builder(plant, plant.nodes[1:], plants_rules[plant.type])
+        plant_meshes[plant.id] = (builder, obj.name)
+        write_plant_mesh(obj.data, builder)
+        return True
+
+    # Object per node: only objects grown since the last pass, unless the level changed
+    names = plant_objects.get(plant.id, [])
+    start = min(shown, len(names)) if level == old_level else 0
+    for name, node in zip(names[start:], plant.nodes[1 + start:]):
+        obj = bpy.data.objects.get(name)
+        if obj is not None:
+            show_node_lod(obj, node, plant, level)
+    plant_lods[plant.id] = (level, len(names))
+    return start < len(names)
+
+def grown_bounds(plant):
+    """(centre, diameter) of a plant's grown nodes, recomputed only after it grew"""
+    count, centre, diameter = bounds_cache.get(plant.id, (0, None, 0.0))
+    if count != len(plant.nodes):
+        centre, diameter = plant_mesh.plant_bounds(plant.nodes)
+        bounds_cache[plant.id] = (len(plant.nodes), centre, diameter)
+    return centre, diameter
+
+def update_lod(scene):
+    """Pick every plant's LOD from its size seen by the active camera.
+
+    Returns True if anything in the scene changed. With LOD off every plant
+    goes back to full detail.
+    """
+    camera = scene.camera
+    if not scene.use_lod or camera is None:
+        changed = False
+        for plant_id in list(plant_lods):
+            plant = garden.plants.get(plant_id)
+            changed = (plant is not None and apply_lod(plant, 0)) or changed
+        plant_lods.clear()
+        return changed
+
+    plants = [plant for plant in garden.plants.values()
+              if (plant.id in plant_meshes or plant.id in plant_objects) and plant.id not in culled_plants]
+    if not plants:
+        return False
+    centres, diameters = zip(*(grown_bounds(plant) for plant in plants))
+    ortho_scale = camera.data.ortho_scale if camera.data.type == 'ORTHO' else None
+    sizes = plant_mesh.projected_sizes(centres, diameters, camera.matrix_world, camera.data.angle, ortho_scale)
+    changed = False
+    for plant, level in zip(plants, plant_mesh.lod_levels(sizes, scene.lod_bias).tolist()):
+        changed = apply_lod(plant, level) or changed
+    return changed
+
+# Frustum culling: plants out of the camera's view keep growing in the engine only
+def update_culling(scene):
+    """Cull plants outside the active camera's view; returns True if the scene changed.
+
+    Plants that come back into view are built whole from the engine. L-system
+    plants streamed from their rules have no grown nodes to bound, so they
+    are never culled.
+    """
+    camera = scene.camera
+    culled = set()
+    if scene.use_frustum_culling and camera is not None:
+        plants = [plant for plant in garden.plants.values() if not (plant.rewrites and garden.streamed)]
+        if plants:
+            centres, diameters = zip(*(grown_bounds(plant) for plant in plants))
+            render = scene.render
+            aspect = (render.resolution_x * render.pixel_aspect_x) / (render.resolution_y * render.pixel_aspect_y)
+            data = camera.data
+            orthographic = data.type == 'ORTHO'
+            extents = plant_mesh.frame_extents(aspect, data.sensor_fit, data.angle,
+                                               data.ortho_scale if orthographic else None)
+            inside = plant_mesh.in_view(centres, diameters, camera.matrix_world, extents,
+                                        data.clip_end, orthographic)
+            culled = {plant.id for plant, shown in zip(plants, inside.tolist()) if not shown}
+
+    culled_plants.clear()
+    culled_plants.update(culled)
+    back = [garden.plants[plant_id] for plant_id in pending_plants - culled if plant_id in garden.plants]
+    pending_plants.intersection_update(culled)
+    for plant in back:
+        step = growth_engine.PlantStep(plant.id, garden.frame)
+        step.replace = True
+        step.branches = plant.branches[1:]
+        step.nodes = plant.nodes[1:]
+        apply_growth(scene, [step])
+    return bool(back)
+
+def camera_view_handler(scene, depsgraph):
+    """Cull and pick LODs again when the active camera moves or its lens changes"""
+    camera = scene.camera
+    if (scene.use_lod or scene.use_frustum_culling) and not scene.garden_baked and camera is not None \
+            and any(update.id.original in (camera, camera.data) for update in depsgraph.updates):
+        update_culling(scene)
+        update_lod(scene)
+
+def view_settings_changed(self, context):
+    update_culling(context.scene)
+    update_lod(context.scene)
+
+# Garden state: the engine's grown nodes are packed into typed arrays on the scene when the file
+# is saved, so a loaded garden carries on growing from where it was instead of from its planted stems
+def store_garden_state(scene):
+    """Pack the grown nodes of every registered plant into scene['garden_state']"""
+    cancel_growth_job(scene)    # a week grown in part would be stored in part
+    if garden.frame is None:
+        scene.pop("garden_state", None)
+        return
+    plants = [garden.plants.get(record.name) for record in scene.garden_plants]
+    scene["garden_state"] = dict(frame_file.pack_plants(plants), week=garden.frame)
+
+@bpy.app.handlers.persistent
+def store_garden_state_on_save(dummy):
+    store_garden_state(bpy.context.scene)
+
+def adopt_grown(scene, record, plant):
+    """Take over the saved objects of a restored plant; False if they do not match its nodes.
+
+    Objects are found the way apply_growth made them: one object per plant
+    in a merged mesh mode, else one per node in its branch collection, in
+    node order, with branch collections linked under their parent's.
+    """
+    collection = record.collection
+    grown = [obj for obj in collection.objects if obj != record.root]
+    streamed = plant.rewrites and scene.plant_mesh_mode in {'SKELETON', 'SUBTREES'}
+    if not grown and not collection.children:
+        return len(plant.nodes) == 1 and not (streamed and plant.derived[0])
+    if scene.plant_mesh_mode != 'OBJECTS':
+        if len(grown) != 1 or collection.children:
+            return False
+        builder = None if streamed else merged_builder(plant, plant.nodes[1:], plants_rules[plant.type])
+        plant_meshes[plant.id] = (builder, grown[0].name)
+        return True
+
+    collections = [collection]
+    linked = Counter()
+    for branch in plant.branches[1:]:
+        children = collections[branch.parent].children
+        if linked[branch.parent] >= len(children):
+            return False
+        collections.append(children[linked[branch.parent]])
+        linked[branch.parent] += 1
+    objects = [grown] + [list(branch_collection.objects) for branch_collection in collections[1:]]
+    taken = [0] * len(collections)
+    names = []
+    for node in plant.nodes[1:]:
+        if taken[node.branch] >= len(objects[node.branch]):
+            return False
+        names.append(objects[node.branch][taken[node.branch]].name)
+        taken[node.branch] += 1
+    if taken != [len(branch_objects) for branch_objects in objects]:
+        return False
+    plant_collections[plant.id] = [branch_collection.name for branch_collection in collections]
+    plant_objects[plant.id] = names
+    return True
+
+def load_garden_state(scene):
+    """Restore the engine from scene['garden_state'] and take over the saved objects.
+
+    Plants whose saved objects do not match their nodes are rebuilt from
+    the engine. Returns True if a state was restored.
+    """
+    state = scene.get("garden_state")
+    if state is None:
+        return False
+    plants = [garden.plants.get(record.name) for record in scene.garden_plants]
+    try:
+        snapshot = frame_file.unpack_plants(state, state["week"], plants)
+    except (KeyError, ValueError) as error:
+        print(f"Garden state not restored: {error}")
+        return False
+    garden.streamed = scene.plant_mesh_mode in {'SKELETON', 'SUBTREES'}
+    garden.restore(snapshot)
+
+    steps = []
+    for record, plant in zip(scene.garden_plants, plants):
+        if plant is None or adopt_grown(scene, record, plant):
+            continue
+        objects = [obj for obj in record.collection.all_objects if obj != record.root]
+        bpy.data.batch_remove(list(record.collection.children_recursive) + objects + orphaned_data(objects))
+        step = growth_engine.PlantStep(plant.id, garden.frame)
+        step.replace = True
+        step.branches = plant.branches[1:]
+        step.nodes = plant.nodes[1:]
+        steps.append(step)
+    apply_growth(scene, steps)
+    if steps:
+        print(f"Rebuilt {len(steps)} plants whose saved objects did not match their growth")
+    return True
+
+def resync_garden(scene):
+    """Rebuild the engine from the registry, on load or when it changed behind the engine's back.
+
+    Grown objects left in the scene are taken over from the saved garden
+    state, as after loading a file. Without a state that fits they are
+    removed, and the plants grow again from their planted stems rather
+    than growing a second copy.
+    """
+    rebuild_garden(scene)
+    grown = plant_owned_ids(scene, keep_roots=True)
+    if grown and not load_garden_state(scene):
+        bpy.data.batch_remove(grown)
+
+# Depsgraph evaluations per frame, shown in the panel so regressions are visible
+depsgraph_stats = {"current": 0, "last_frame": 0}
+
+def count_depsgraph_update(scene, depsgraph=None):
+    depsgraph_stats["current"] += 1
+
+def start_depsgraph_frame(scene):
+    depsgraph_stats["last_frame"] = depsgraph_stats["current"]
+    depsgraph_stats["current"] = 0
+
+def sync_garden_settings(scene):
+    """Bring the engine's plants and settings in line with the scene"""
+    if len(registry_index) != len(scene.garden_plants):
+        resync_garden(scene)
+    garden.workers = scene.grow_workers
+    garden.streamed = scene.plant_mesh_mode in {'SKELETON', 'SUBTREES'}
+    # Both the seed and the growth mode decide what a week grows into
+    if garden.seed != scene.garden_seed or garden.vectorized != scene.grow_vectorized:
+        garden.seed = scene.garden_seed
+        garden.vectorized = scene.grow_vectorized
+        frame_cache.clear()
+    frame_cache.budget = scene.frame_cache_mb * 1024 * 1024
+    frame_cache.trim()
+
+def show_week(scene, frame):
+    """Grow the garden to week `frame` for the active camera; returns True if anything changed.
+
+    Culling comes first, so plants that just left the view get none of the
+    week's geometry; the second pass builds the plants that grew into view.
+    """
+    changed = update_culling(scene)
+    changed = grow_to_frame(scene, frame) or changed
+    changed = update_culling(scene) or changed
+    return update_lod(scene) or changed
+
+# Growth Handler
+def grow_mesh_handler(scene):
+    if scene.grow_mesh_running and not scene.garden_baked:
+        print(f"Current frame is: {scene.frame_current} ")
+        sync_garden_settings(scene)
+        if scene.growth_budget_ms and not bpy.app.is_job_running('RENDER'):
+            schedule_growth(scene.frame_current)
+            return
+        # Node transforms come from the engine, so the scene is evaluated once per frame
+        if show_week(scene, scene.frame_current):
+            bpy.context.view_layer.update()
+    
+# Baked growth: every week is grown once up front and shown by keyed visibility,
+# so playback and rendering evaluate animation only and never run the engine
+def grown_names(plant):
+    """Names of the objects currently showing a plant's growth"""
+    names = list(plant_objects.get(plant.id, ()))
+    _, obj_name = plant_meshes.get(plant.id, (None, ""))
+    if obj_name:
+        names.append(obj_name)
+    return names
+
+def detach_grown(plant):
+    """Forget a plant's rebuilt-every-week objects but leave them in the scene.
+
+    Its next growth then builds new objects instead of rewriting or deleting
+    these, so every baked week keeps its own geometry.
+    """
+    plant_meshes.pop(plant.id, None)
+    if plant.rewrites:
+        plant_objects.pop(plant.id, None)
+        del plant_collections.get(plant.id, [])[1:]
+
+def key_visibility(objects, first, last, frame_end):
+    """Show `objects` from week `first` to `last` only, through one shared action"""
+    template = objects[0]
+    keys = [(first - 1, True), (first, False)]
+    if last < frame_end:
+        keys.append((last + 1, True))
+    for frame, hidden in keys:
+        template.hide_viewport = template.hide_render = hidden
+        template.keyframe_insert("hide_viewport", frame=frame)
+        template.keyframe_insert("hide_render", frame=frame)
+    action = template.animation_data.action
+    action.name = f"Garden_Bake_{first}-{last}"
+    for obj in objects[1:]:
+        animation = obj.animation_data_create()
+        animation.action = action
+        if hasattr(animation, "action_slot"):
+            animation.action_slot = template.animation_data.action_slot   # layered actions, 4.4+
+        obj.hide_viewport = obj.hide_render = template.hide_render
+
+def bake_growth(scene, first, last):
+    """Grow weeks `first` to `last` once and key when each grown object is shown.
+
+    The garden starts again from its planted stems. Objects rebuilt every
+    week (merged meshes, L-system plants) are kept per week instead of
+    rewritten. Frustum culling and LOD are not applied, since baked geometry
+    has to serve every camera. Returns the number of baked objects.
+    """
+    reset_garden(scene)
+    sync_garden_settings(scene)
+    spans = {}      # object name -> [first week shown, last week shown]
+    shown = {}      # plant id -> names of the objects showing it
+    for week in range(first, last + 1):
+        grow_to_frame(scene, week)
+        for plant in garden.plants.values():
+            names = grown_names(plant)
+            if not names:
+                continue
+            if plant.id in plant_meshes or plant.rewrites:
+                # A rebuilt plant: this week's objects replace last week's
+                for name in shown.get(plant.id, ()):
+                    spans[name][1] = week - 1
+                detach_grown(plant)
+            shown[plant.id] = names
+            for name in names:
+                spans.setdefault(name, [week, last])
+
+    groups = {}
+    for name, span in spans.items():
+        obj = bpy.data.objects.get(name)
+        if obj is not None:
+            groups.setdefault(tuple(span), []).append(obj)
+    for (shown_from, shown_to), objects in groups.items():
+        key_visibility(objects, shown_from, shown_to, last)
+
+    # The engine no longer matches the scene; Reset grows live again
+    forget_plants()
+    scene.garden_baked = True
+    scene.frame_set(scene.frame_current)
+    return sum(len(objects) for objects in groups.values())
+
+class OBJECT_OT_BakeGrowth(bpy.types.Operator):
+    """Grow every week once and key the grown objects' visibility, so rendering only plays animation"""
+    bl_idname = "mesh.bake_growth"
+    bl_label = "Bake Growth"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        scene = context.scene
+        if scene.grow_mesh_running:
+            self.report({'ERROR'}, "Stop growing the scene before baking")
+            return {'CANCELLED'}
+        scene.frame_start = scene.custom_frame_start
+        scene.frame_end = scene.custom_frame_end
+        started = time.perf_counter()
+        count = bake_growth(scene, scene.frame_start, scene.frame_end)
+        self.report({'INFO'}, f"Baked {count} objects for weeks {scene.frame_start}-{scene.frame_end} "
+                              f"in {time.perf_counter() - started:.1f} s")
+        return {'FINISHED'}
+
+# Growth cache files: weeks grown once are saved to disk and replayed in later sessions, see frame_file
+growth_cache = {"path": "", "file": None,   # the open growth cache file
+                "garden": None}             # (garden seed, growth mode, fingerprint) of the live plants, see frame_file
+
+def cached_growth(scene):
+    """The scene's growth cache file, opened once per path; None when unset or unreadable"""
+    path = bpy.path.abspath(scene.growth_cache_file) if scene.growth_cache_file else ""
+    if growth_cache["path"] != path:
+        growth_cache.update(path=path, file=None)
+        if path:
+            try:
+                growth_cache["file"] = frame_file.FrameFile(path)
+            except (OSError, ValueError) as error:
+                print(f"Growth cache not used: {error}")
+    return growth_cache["file"]
+
+def grown_from(cache):
+    """True if a growth cache was saved from the garden's plants as they are now.
+
+    Compares fingerprints of the seeds, growth mode, locations and rules, not
+    just plant ids; the live garden's is computed again only after its plants,
+    seed or growth mode change.
+    """
+    if growth_cache["garden"] is None or growth_cache["garden"][:2] != (garden.seed, garden.vectorized):
+        growth_cache["garden"] = (garden.seed, garden.vectorized, frame_file.garden_fingerprint(garden))
+    return cache.fingerprint == growth_cache["garden"][2]
+
+def cached_week(scene, frame):
+    """Snapshot of week `frame` from the growth cache file, or None.
+
+    The file is only used while it was grown from the garden's plants.
+    """
+    cache = cached_growth(scene)
+    if cache is None or frame not in cache or not grown_from(cache):
+        return None
+    return cache.snapshot(frame)
+
+def latest_week(scene, frame):
+    """Snapshot of the last week at or before `frame` in either cache, or None"""
+    snapshot = frame_cache.latest(frame)
+    cache = cached_growth(scene)
+    if cache is not None and cache.first <= frame:
+        week = min(frame, cache.last)
+        if snapshot is None or snapshot.frame < week:
+            cached = cached_week(scene, week)
+            if cached is not None:
+                snapshot = cached
+    return snapshot
+
+def export_growth_cache(scene, path, first, last):
+    """Grow a copy of the garden through weeks `first` to `last` into a cache file.
+
+    Weeks before `first` are grown too but not saved, so every saved week is
+    what live growth gives. The scene and the live garden are left as they
+    are. Returns the file size.
+    """
+    if not scene.garden_plants:
+        rebuild_garden(scene)   # files saved before the registry existed
+    exported = growth_engine.Garden(plants_rules, scene.grow_workers, scene.garden_seed)
+    exported.vectorized = scene.grow_vectorized
+    for record in scene.garden_plants:
+        if record.collection and record.root and record.plant_type in plants_rules:
+            exported.add_plant(record.name, record.plant_type, tuple(record.root.location),
+                               record.radius, record.height, record.seed)
+    try:
+        writer = frame_file.FrameFileWriter(path, exported)
+        for week in range(1, last + 1):
+            exported.grow(week)
+            if week >= first:
+                writer.add(week)
+        return writer.close()
+    finally:
+        exported.close()
+
+class OBJECT_OT_ExportGrowthCache(bpy.types.Operator, ExportHelper):
+    """Grow every week once and save them to a growth cache file, to replay without growing"""
+    bl_idname = "mesh.export_growth_cache"
+    bl_label = "Export Growth Cache"
+    filename_ext = ".gfc"
+    filter_glob: bpy.props.StringProperty(default="*.gfc", options={'HIDDEN'})
+
+    def execute(self, context):
+        scene = context.scene
+        first, last = scene.custom_frame_start, scene.custom_frame_end
+        started = time.perf_counter()
+        # Let go of the open cache: it may be the file that is about to be replaced
+        growth_cache.update(path="", file=None)
+        size = export_growth_cache(scene, self.filepath, first, last)
+        scene.growth_cache_file = self.filepath
+        self.report({'INFO'}, f"Saved weeks {first}-{last} ({size / 1048576:.1f} MB) "
+                              f"in {time.perf_counter() - started:.1f} s")
+        return {'FINISHED'}
+
+class OBJECT_OT_ImportGrowthCache(bpy.types.Operator, ImportHelper):
+    """Show the current week from a growth cache file; its weeks then replay instead of growing"""
+    bl_idname = "mesh.import_growth_cache"
+    bl_label = "Import Growth Cache"
+    filter_glob: bpy.props.StringProperty(default="*.gfc", options={'HIDDEN'})
+
+    def execute(self, context):
+        scene = context.scene
+        if scene.garden_baked:
+            self.report({'ERROR'}, "Reset the baked growth before importing a growth cache")
+            return {'CANCELLED'}
+        scene.growth_cache_file = self.filepath
+        cache = cached_growth(scene)
+        if cache is None:
+            self.report({'ERROR'}, f"Not a growth cache: {self.filepath}")
+            return {'CANCELLED'}
+        sync_garden_settings(scene)
+        if not grown_from(cache):
+            self.report({'ERROR'}, "The growth cache was saved from other plants or settings")
+            return {'CANCELLED'}
+
+        started = time.perf_counter()
+        frame = min(max(scene.frame_current, cache.first), cache.last)
+        scene.frame_current = frame
+        if show_week(scene, frame):
+            context.view_layer.update()
+        self.report({'INFO'}, f"Week {frame} of {cache.first}-{cache.last} loaded "
+                              f"in {time.perf_counter() - started:.2f} s")
+        return {'FINISHED'}
+
+def stop_animation_at_end_frame(scene):
+    if scene.frame_current >= scene.frame_end:
+        bpy.ops.screen.animation_cancel(restore_frame=False)
+        scene.grow_mesh_running = False
+        # Remove only the stop_animation_at_end_frame handler
+        bpy.app.handlers.frame_change_post.remove(stop_animation_at_end_frame)
+        print("Animation stopped at end frame: {}".format(scene.frame_end))
+
+class OBJECT_OT_GrowScene(bpy.types.Operator):
+    """Grow the plant without recording"""
+    bl_idname = "mesh.grow_scene"
+    bl_label = "Grow Scene"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        context.scene.grow_mesh_running = not context.scene.grow_mesh_running
+
+        context.scene.render.fps = context.scene.custom_frame_per_second
+        context.scene.render.fps_base = 1.0
+        context.scene.frame_start = context.scene.custom_frame_start
+        context.scene.frame_end = context.scene.custom_frame_end
+        
+        if context.scene.grow_mesh_running:
+            # Check if the handler is already added to avoid duplicates
+            if stop_animation_at_end_frame not in bpy.app.handlers.frame_change_post:
+                bpy.app.handlers.frame_change_post.append(stop_animation_at_end_frame)
+            bpy.ops.screen.animation_play()
+        else:
+            context.scene.grow_mesh_running = False
+            bpy.ops.screen.animation_cancel(restore_frame=False)
+            # Remove the handler when stopping the animation manually
+            if stop_animation_at_end_frame in bpy.app.handlers.frame_change_post:
+                bpy.app.handlers.frame_change_post.remove(stop_animation_at_end_frame)
+
+        return {'FINISHED'}
+
+    
+class OBJECT_OT_GrowRenderScene(bpy.types.Operator):
+    """Grow the plant with recording and save to C:/Animation/"""
+    bl_idname = "mesh.grow_render_scene"
+    bl_label = "Grow and Render Scene"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        context.scene.grow_mesh_running = not context.scene.grow_mesh_running
+        
+        context.scene.render.fps = context.scene.custom_frame_per_second
+        context.scene.render.fps_base = 1.0
+        context.scene.frame_start = context.scene.custom_frame_start
+        context.scene.frame_end = context.scene.custom_frame_end
+        camera = bpy.data.objects.get("New_Scene_Camera")
+        
+        if context.scene.grow_mesh_running:
+            if not camera:
+                self.report({'ERROR'}, "Please add plane to the scene")
+                return {'CANCELLED'}
+            else: 
+                context.scene.render.filepath = "C:/Animation/"  # Change to your preferred path
+                context.scene.render.image_settings.file_format = 'FFMPEG'  # Set the output format (FFMPEG for video)
+                context.scene.render.ffmpeg.format = 'MPEG4'
+                context.scene.render.ffmpeg.codec = 'H264'
+                context.scene.render.ffmpeg.constant_rate_factor = 'PERC_LOSSLESS'
+                context.scene.render.ffmpeg.ffmpeg_preset = 'GOOD'
+                print("Animation setup complete: {} weeks at {} fps".format((context.scene.frame_end - context.scene.frame_start + 1) / 2, context.scene.render.fps))
+            
+                bpy.ops.screen.animation_play()
+                # Start rendering the animation
+                bpy.ops.render.render('INVOKE_DEFAULT', animation=True)
+        else:
+            context.scene.grow_mesh_running = False
+            bpy.ops.screen.animation_cancel(restore_frame=False)
+            
+        return {'FINISHED'}
+    
+# Operator for reset animation
+class OBJECT_OT_ResetAnimation(bpy.types.Operator):
+    """Reset animation"""
+    bl_idname = "mesh.reset_animation"
+    bl_label = "Reset"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        bpy.context.scene.frame_current = 0
+        self.reset_objects_to_initial_state(context)
+        return {'FINISHED'}
+    
+    def reset_objects_to_initial_state(self, context):
+        reset_garden(context.scene)
+
+def reset_garden(scene):
+    """Take the garden back to its planted stems, growing live"""
+    if not scene.garden_plants:
+        rebuild_garden(scene)   # files saved before the registry existed
+    
+    # Only the planted stems stay; everything grown from them goes in one batch
+    bpy.data.batch_remove(plant_owned_ids(scene, keep_roots=True))
+    for record in scene.garden_plants:
+        record.active_branches = 1
+        record.next_growth_frame = 0
+    scene.garden_baked = False
+    
+    # The engine is rebuilt from the registry on the next frame
+    forget_plants()
+    
+# Utilities for plants --------------------------------------------------
+# Shared materials: one datablock per distinct (color, shading mode), found by name
+material_stats = {"reused": 0}
+
+def pooled_material(color, use_nodes=False):
+    """Material of the given color, created the first time the color is used"""
+    mode = "Nodes" if use_nodes else "Flat"
+    name = "Garden_{}_{:.3f}_{:.3f}_{:.3f}_{:.3f}".format(mode, *color)
+    material = bpy.data.materials.get(name)
+    if material is not None:
+        material_stats["reused"] += 1
+        return material
+
+    material = bpy.data.materials.new(name=name)
+    material.use_nodes = use_nodes
+    if use_nodes:
+        bsdf = material.node_tree.nodes.get('Principled BSDF')
+        bsdf.inputs['Base Color'].default_value = color
+    else:
+        material.diffuse_color = color
+    return material
+
+def set_color(color_val, obj):
+    name = obj.name
+    mesh_object = bpy.data.objects.get(name)
+
+    if mesh_object:
+        mesh_object.data.materials.append(pooled_material(color_val))
+
+def cursor_location_update(location):
+    x, y, z = location
+    bpy.context.scene.cursor.location[0] = x
+    bpy.context.scene.cursor.location[1] = y
+    bpy.context.scene.cursor.location[2] = z
+
+def origin_to_cursor():
+    bpy.ops.object.origin_set(type='ORIGIN_CURSOR', center='MEDIAN')
+
+def add_cylinder(location, radius, height, collection):
+    """ Add cylinder to the collection tree """
+    location = (location[0], location[1], location[2] + height / 2)
+    
+    bpy.ops.mesh.primitive_cylinder_add(enter_editmode=False, radius=radius, depth=height, location=location)
+    bpy.ops.object.shade_smooth()
+    obj = bpy.context.active_object
+    obj.name = collection.name
+    set_color((0.5, 0.2, 0.1, 1.0), obj)
+    
+    collection.objects.link(obj)
+    
+    bpy.context.scene.collection.objects.unlink(obj)
+    
+    return obj
+
+def set_scene_units():
+    bpy.context.scene.unit_settings.system = 'METRIC'
+    bpy.context.scene.unit_settings.scale_length = 0.01  
+    bpy.context.scene.unit_settings.length_unit = 'CENTIMETERS'
+    
+def plant_new(x, y, location_z, scale_factor=1.0):
+    """Create a new collection for the tree"""
+    unique_suffix = str(uuid.uuid4())[:3]  # Take only the first 8 characters for brevity
+    plant_type = bpy.context.scene.plant_type
+    unique_name = f"{plant_type}_{unique_suffix}"
+    new_collection = bpy.data.collections.new(unique_name)
+    bpy.context.scene.collection.children.link(new_collection)
+    
+    radius = plants_rules[plant_type]["radius"] * scale_factor
+    height = plants_rules[plant_type]["height"] * scale_factor
+    # Example: a young tree might be 0.05 meters (5 cm) in radius and 0.5 meters (50 cm) tall
+    obj = add_cylinder((x, y, location_z), radius, height, new_collection)
+    
+    cursor_location_update((x, y, location_z - location_z))
+    origin_to_cursor()
+    adopt_plant(bpy.context.scene, new_collection, obj, radius, height)
+    all_objects = bpy.context.scene.objects
+
+    # Deselect all objects
+    for obj in all_objects:
+        obj.select_set(False)
+    
+    print(f"Planted {new_collection.name} at ({x:.2f},{y:.2f})")
+
+# End of plant utilities ---------------------------------------------------------------------
+# Node adjustment -----------------------------------------
+def cursor_location_update(location):
+    x, y, z = location
+    bpy.context.scene.cursor.location[0] = x
+    bpy.context.scene.cursor.location[1] = y
+    bpy.context.scene.cursor.location[2] = z
+
+def origin_to_cursor():
+    bpy.ops.object.origin_set(type='ORIGIN_CURSOR', center='MEDIAN')
+
+def set_up_init_cylinder(location, rotation):
+    x, y, z = location
+    bpy.ops.mesh.primitive_cylinder_add(radius=0.01, depth=0.1, location=location, rotation=rotation)
+    cursor_location_update((x, y, z - z))
+    origin_to_cursor()
+    a = bpy.context.active_object
+    return a
+
+# Prototype library: each part mesh is built once and shared by all its instances
+def prototype_mesh(part, scale=(1.0, 1.0, 1.0), segments=32):
+    """Shared mesh of a plant part ("Stem", "Leaf", "Sunflower" or "Baby")"""
+    name = "Garden_{}_{:.4f}_{:.4f}_{:.4f}".format(part, *scale)
+    if part == "Stem" and segments != 32:
+        name += f"_s{segments}"     # coarser stems for distant plants
+    mesh = bpy.data.meshes.get(name)
+    if mesh is not None:
+        return mesh
+
+    builder = plant_mesh.PlantMesh(1.0, segments)
+    template = builder.stem if part == "Stem" else plant_mesh.PARTS[part]
+    builder.add(template, [(0.0, 0.0, 0.0)], [growth_engine.IDENTITY], [scale])
+    mesh = bpy.data.meshes.new(name)
+    for color in SLOT_COLORS:
+        mesh.materials.append(pooled_material(color) if color else None)
+    write_plant_mesh(mesh, builder)
+    return mesh
+
+def specific_object(name, collection):
+    """Add a leaf or flower instance at the origin, the caller places it.
+
+    A flower of a plant type without a flower_part is an empty, so every
+    grown node still has one object.
+    """
+    if name is None:
+        obj = bpy.data.objects.new(f"{collection.name}_flower", None)
+        obj.empty_display_size = 0.02
+        collection.objects.link(obj)
+        return obj
+    if name not in plant_mesh.PARTS:
+        print("Couldn't create specific object")
+        return None
+    suffix = "leaf" if name == "Leaf" else "flower"
+    obj = bpy.data.objects.new(f"{collection.name}_{suffix}", prototype_mesh(name))
+    collection.objects.link(obj)
+    return obj
+
+class OBJECT_OT_PlantMesh(bpy.types.Operator):
+    """Add plant to scene"""
+    bl_idname = "mesh.plant_mesh"
+    bl_label = "Plant Mesh"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        # Get user input properties
+        scale_factor = context.scene.plant_mesh_scale
+        z = context.scene.plant_mesh_location_z 
+        x = context.scene.plant_mesh_location_x
+        y = context.scene.plant_mesh_location_y
+        
+
+        plant_new(x,y,z,scale_factor)
+            
+        return {'FINISHED'}
+
+# Batch planting: many plants in one pass through bpy.data, no operators or selection
+def plant_batch(scene, locations, plant_types, scale_factor=1.0):
+    """Plant one plant of plant_types[i] at each (x, y, z) of locations.
+
+    Planted stems share one mesh per type and size and go straight into
+    their collections, and each plant adds one registry record, so the
+    cost grows linearly with the number of plants. Returns the new plant
+    collections.
+    """
+    taken = set(bpy.data.collections.keys())
+    collections = []
+    for (x, y, z), plant_type in zip(locations, plant_types):
+        rules = plants_rules[plant_type]
+        radius = rules["radius"] * scale_factor
+        height = rules["height"] * scale_factor
+        name = f"{plant_type}_{uuid.uuid4().hex[:6]}"
+        while name in taken:
+            name = f"{plant_type}_{uuid.uuid4().hex[:6]}"
+        taken.add(name)
+
+        collection = bpy.data.collections.new(name)
+        scene.collection.children.link(collection)
+        stem_mesh = prototype_mesh("Stem", (radius, radius, height))
+        obj = bpy.data.objects.new(name, stem_mesh)
+        obj.location = (x, y, z)
+        collection.objects.link(obj)
+        adopt_plant(scene, collection, obj, radius, height)
+        collections.append(collection)
+    return collections
+
+class PlantBatchItem(bpy.types.PropertyGroup):
+    """One plant for OBJECT_OT_PlantBatch"""
+    location: bpy.props.FloatVectorProperty(name="Location", size=3)
+    plant_type: bpy.props.StringProperty(name="Plant Type")
+
+# From a script: bpy.ops.object.plant_batch(plants=[{"location": (x, y, z), "plant_type": "SUNFLOWER"}, ...])
+class OBJECT_OT_PlantBatch(bpy.types.Operator):
+    """Plant many plants at once from a list of locations and plant types"""
+    bl_idname = "object.plant_batch"
+    bl_label = "Plant Batch"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    plants: bpy.props.CollectionProperty(type=PlantBatchItem)
+    scale_factor: bpy.props.FloatProperty(name="Scale", default=1.0, min=0.01)
+
+    def execute(self, context):
+        unknown = {item.plant_type for item in self.plants} - set(plants_rules)
+        if unknown:
+            self.report({'ERROR'}, f"Unknown plant types: {', '.join(sorted(unknown))}")
+            return {'CANCELLED'}
+        collections = plant_batch(context.scene, [item.location[:] for item in self.plants],
+                                  [item.plant_type for item in self.plants], self.scale_factor)
+        self.report({'INFO'}, f"Planted {len(collections)} plants")
+        return {'FINISHED'}
+
+# Blue-noise placement: plants keep their species' spacing, see placement.py
+def placement_bounds(scene, plane_obj):
+    """Area random placement plants in, as (min_x, min_y, max_x, max_y)"""
+    plane_size = scene.plane_size
+    base_x = plane_obj.dimensions.x - plane_size*1.5
+    base_y = plane_obj.dimensions.y - plane_size*1.5
+    return (base_x, base_y, base_x + plane_size, base_y + plane_size)
+
+def plant_spacing(plant_type, radius=None):
+    """Spacing of a species, grown with the plant when it is scaled up"""
+    rules = plants_rules[plant_type]
+    spacing = rules.get("spacing", 4 * rules["radius"])
+    return spacing if radius is None else spacing * radius / rules["radius"]
+
+def planted_hash(scene):
+    """SpatialHash of the plants already in the garden, for spacing new ones"""
+    records = [record for record in scene.garden_plants
+               if record.root is not None and record.plant_type in plants_rules]
+    return placement.SpatialHash([record.root.location[:2] for record in records],
+                                 [plant_spacing(record.plant_type, record.radius) for record in records])
+
+class OBJECT_OT_AddRandomPlants(bpy.types.Operator):
+    """Add Random Plants in Specified Area"""
+    bl_idname = "object.add_random_plants"
+    bl_label = "Add Random Plants"
+
+    def execute(self, context):
+        plane_obj = bpy.data.objects.get("soil")
+        plane_size = context.scene.plane_size
+            
+        if not plane_obj:
+            self.report({'ERROR'}, "Please add plane to the scene")
+            return {'CANCELLED'}
+
+        else:
+            scene = context.scene
+            scale_factor = scene.plant_mesh_scale
+            plant_count = scene.plant_count
+            base_z = scene.plant_mesh_location_z
+            # Each batch gets its own stream, so the same file plants the same layout
+            seed = growth_engine.derive_seed(scene.garden_seed, "placement", len(scene.garden_plants))
+            spacing = plant_spacing(scene.plant_type) * scale_factor
+            points, _ = placement.place_species(placement_bounds(scene, plane_obj), [(spacing, plant_count)],
+                                                seed, planted_hash(scene))
+
+            # Assuming plants are placed at a constant height
+            plant_batch(scene, [(x, y, base_z) for x, y in points.tolist()], [scene.plant_type] * len(points),
+                        scale_factor)
+            if len(points) < plant_count:
+                self.report({'WARNING'}, f"Only {len(points)} of {plant_count} plants fit {spacing:g} apart")
+            else:
+                self.report({'INFO'}, f"Planted {len(points)} plants")
+
+        return {'FINISHED'}
+    
+# Instanced planting: a few grown variants scattered over many points -----------------
+def variant_collection(scene, plant_type, week, variants):
+    """Hidden collection with one fully grown plant per variant.
+
+    Variant seeds derive from the Garden Seed, like the seeds of planted
+    plants. Built once per (type, week, variant count, garden seed) and
+    found by name after that, so every scatter of the same species and
+    stage shares it.
+    """
+    name = f"Garden_Variants_{plant_type}_w{week}_x{variants}_s{scene.garden_seed}"
+    collection = bpy.data.collections.get(name)
+    if collection is not None:
+        return collection
+
+    rules = plants_rules[plant_type]
+    collection = bpy.data.collections.new(name)
+    for variant in range(variants):
+        seed = growth_engine.derive_seed(scene.garden_seed, "variant", plant_type, week, variant)
+        plant = growth_engine.grow_variant(plants_rules, plant_type, week, seed,
+                                           rules["radius"], rules["height"])
+        builder = plant_mesh.PlantMesh(plant.radius)
+        builder.add_nodes(plant.nodes, rules.get("flower_part"))
+        mesh = bpy.data.meshes.new(f"{name}_{variant}")
+        for color in SLOT_COLORS:
+            mesh.materials.append(pooled_material(color) if color else None)
+        write_plant_mesh(mesh, builder)
+        collection.objects.link(bpy.data.objects.new(mesh.name, mesh))
+    return collection
+
+def new_group_socket(group, in_out, name):
+    if hasattr(group, "interface"):     # Blender 4.0+
+        group.interface.new_socket(name=name, in_out=in_out, socket_type='NodeSocketGeometry')
+    elif in_out == 'INPUT':
+        group.inputs.new('NodeSocketGeometry', name)
+    else:
+        group.outputs.new('NodeSocketGeometry', name)
+
+def attribute_output(nodes, name, data_type):
+    node = nodes.new('GeometryNodeInputNamedAttribute')
+    node.data_type = data_type
+    node.inputs["Name"].default_value = name
+    return next(socket for socket in node.outputs if socket.enabled)
+
+def instance_node_group(collection):
+    """Geometry Nodes group putting one child of `collection` on every point.
+
+    The point attributes pick the instance: "variant" (INT) chooses the
+    child, "rotation" (Euler) and "scale" (vector) transform it.
+    """
+    group = bpy.data.node_groups.get(f"{collection.name}_Scatter")
+    if group is not None:
+        return group
+
+    group = bpy.data.node_groups.new(f"{collection.name}_Scatter", 'GeometryNodeTree')
+    new_group_socket(group, 'INPUT', "Geometry")
+    new_group_socket(group, 'OUTPUT', "Geometry")
+    nodes, links = group.nodes, group.links
+    group_in = nodes.new('NodeGroupInput')
+    group_out = nodes.new('NodeGroupOutput')
+
+    info = nodes.new('GeometryNodeCollectionInfo')
+    info.transform_space = 'ORIGINAL'
+    info.inputs["Collection"].default_value = collection
+    info.inputs["Separate Children"].default_value = True
+    info.inputs["Reset Children"].default_value = True
+
+    scatter = nodes.new('GeometryNodeInstanceOnPoints')
+    scatter.inputs["Pick Instance"].default_value = True
+    links.new(group_in.outputs[0], scatter.inputs["Points"])
+    links.new(info.outputs[0], scatter.inputs["Instance"])
+    links.new(attribute_output(nodes, "variant", 'INT'), scatter.inputs["Instance Index"])
+    links.new(attribute_output(nodes, "rotation", 'FLOAT_VECTOR'), scatter.inputs["Rotation"])
+    links.new(attribute_output(nodes, "scale", 'FLOAT_VECTOR'), scatter.inputs["Scale"])
+    links.new(scatter.outputs[0], group_out.inputs[0])
+    return group
+
+def scatter_points(name, locations, variants, rotations, scales):
+    """Vertex-only mesh carrying one point per plant and its instance attributes"""
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(locations))
+    mesh.vertices.foreach_set("co", [c for location in locations for c in location])
+    mesh.attributes.new("variant", 'INT', 'POINT').data.foreach_set("value", variants)
+    mesh.attributes.new("rotation", 'FLOAT_VECTOR', 'POINT').data.foreach_set(
+        "vector", [c for rotation in rotations for c in rotation])
+    mesh.attributes.new("scale", 'FLOAT_VECTOR', 'POINT').data.foreach_set(
+        "vector", [c for scale in scales for c in scale])
+    mesh.update()
+    return mesh
+
+class OBJECT_OT_ScatterPlantInstances(bpy.types.Operator):
+    """Scatter instances of a few grown plants over the plane"""
+    bl_idname = "object.scatter_plant_instances"
+    bl_label = "Scatter Plant Instances"
+
+    def execute(self, context):
+        scene = context.scene
+        plane_obj = bpy.data.objects.get("soil")
+        if not plane_obj:
+            self.report({'ERROR'}, "Please add plane to the scene")
+            return {'CANCELLED'}
+
+        base_z = scene.plant_mesh_location_z
+        variants = scene.instance_variants
+
+        seed = growth_engine.derive_seed(scene.garden_seed, "scatter", scene.plant_type)
+        points, _ = placement.place_species(placement_bounds(scene, plane_obj),
+                                            [(plant_spacing(scene.plant_type), scene.plant_count)],
+                                            seed, planted_hash(scene))
+        rng = random.Random(seed)
+        locations, picks, rotations, scales = [], [], [], []
+        for x, y in points.tolist():
+            locations.append((x, y, base_z))
+            picks.append(rng.randrange(variants))
+            rotations.append((0.0, 0.0, rng.uniform(0.0, 2 * math.pi)))
+            size = rng.uniform(0.8, 1.2)
+            scales.append((size, size, size))
+
+        collection = variant_collection(scene, scene.plant_type, scene.instance_week, variants)
+        mesh = scatter_points(f"{scene.plant_type}_instances", locations, picks, rotations, scales)
+        obj = bpy.data.objects.new(mesh.name, mesh)
+        modifier = obj.modifiers.new("Plant Instances", 'NODES')
+        modifier.node_group = instance_node_group(collection)
+        scene.collection.objects.link(obj)
+
+        self.report({'INFO'}, f"Scattered {len(locations)} plants from {variants} variants")
+        return {'FINISHED'}
+    
+class OBJECT_PT_PlantMeshPanel(bpy.types.Panel):
+    bl_label = "Garden Planning"
+    bl_idname = "OBJECT_PT_PlantMeshPanel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Garden Planning'
+
+    def draw(self, context):
+        layout = self.layout
+
+        layout.label(text="Plant properties:")
+        layout.prop(context.scene, "plant_type", text="Plant Type")
+        layout.prop(context.scene, "plant_mesh_scale", text="Plant Scale")
+        
+        layout.label(text="Exact plant placement:")
+        layout.prop(context.scene, "plant_mesh_location_x", text="Plant X")
+        layout.prop(context.scene, "plant_mesh_location_y", text="Plant Y")
+        layout.prop(context.scene, "plant_mesh_location_z", text="Plant Z")
+        layout.operator("mesh.plant_mesh", text="Plant Mesh")
+        
+        
+        layout.label(text="Random plant placement:")
+        layout.prop(context.scene, "plant_count", text="Number of Plants")
+        
+        layout.operator("object.add_random_plants", text="Add Plants Randomly")
+        layout.prop(context.scene, "instance_variants", text="Variants")
+        layout.prop(context.scene, "instance_week", text="Grown Weeks")
+        layout.operator("object.scatter_plant_instances", text="Scatter Plant Instances")
+        # Add button to trigger the growth
+        
+         # Add button to clear the scene and empty growing_objects
+        layout.label(text="Clear scene:")
+        layout.operator("scene.clear_growing_objects", text="Clear Scene")
+        
+        layout.label(text="Setting up scene:")
+        # Add UI elements for size and color
+        layout.prop(context.scene, "plane_size", text="Plane Size")
+        layout.prop(context.scene, "plane_color", text="Plane Color")
+
+        # Button to add plane using the current size and color settings
+        layout.operator("mesh.add_custom_plane", text="Add Plane")
+        # Add camera and plane
+        layout.operator("object.add_camera", text="Add Camera")
+        
+        
+        
+        layout.label(text="Start/Stop Animation:")
+        
+        # Add button to start/stop animation
+        layout.prop(context.scene, "custom_frame_start", text="Start Week")
+        layout.prop(context.scene, "custom_frame_end", text="End Week")
+        layout.prop(context.scene, "custom_frame_per_second", text="Frame per Second")
+        layout.prop(context.scene, "grow_workers", text="Worker Processes")
+        layout.prop(context.scene, "grow_vectorized", text="Vectorized Placement")
+        layout.prop(context.scene, "garden_seed", text="Garden Seed")
+        layout.prop(context.scene, "frame_cache_mb", text="Frame Cache (MB)")
+        layout.label(text=f"Cached weeks: {len(frame_cache)} ({frame_cache.nbytes / 1048576:.1f} MB)")
+        layout.prop(context.scene, "plant_mesh_mode", text="Plant Mesh")
+        layout.prop(context.scene, "use_frustum_culling", text="Frustum Culling")
+        if culled_plants:
+            layout.label(text=f"Plants out of view: {len(culled_plants)}")
+        layout.prop(context.scene, "use_lod", text="Camera LOD")
+        layout.prop(context.scene, "lod_bias", text="LOD Detail")
+        if plant_lods:
+            counts = Counter(level for level, _ in plant_lods.values())
+            layout.label(text="Plants per LOD: " + " / ".join(
+                str(counts[level]) for level in range(len(plant_mesh.LOD_LEVELS))))
+        layout.label(text=f"Depsgraph updates last frame: {depsgraph_stats['last_frame']}")
+        layout.prop(context.scene, "growth_budget_ms", text="Growth Budget (ms)")
+        week = growth_job["week"]
+        if week is not None:
+            layout.label(text=f"Growing week {week.frame}: {week.done} / {len(week)} plants")
+        elif garden.frame is not None:
+            layout.label(text=f"Week {garden.frame} grown")
+        
+        layout.operator("mesh.grow_scene", text="Grow scene")
+        layout.operator("mesh.grow_render_scene", text="Grow and render scene")
+        layout.operator("mesh.bake_growth", text="Bake Growth")
+        if context.scene.garden_baked:
+            layout.label(text="Growth baked: Reset to grow live")
+        layout.prop(context.scene, "growth_cache_file", text="Growth Cache")
+        cache = growth_cache["file"]
+        if cache is not None and context.scene.growth_cache_file:
+            layout.label(text=f"Cached weeks {cache.first}-{cache.last}, {len(cache.plant_ids)} plants")
+        row = layout.row()
+        row.operator("mesh.export_growth_cache", text="Export Cache")
+        row.operator("mesh.import_growth_cache", text="Import Cache")
+        
+        layout.operator("mesh.reset_animation", text="Reset")
+        
+        
+classes_registered = False
+
+def unregister():
+    global classes_registered
+
+    if classes_registered:
+        # One guarded call per class, so a class that is already gone
+        # doesn't stop the handlers, timer and worker pool teardown below
+        for cls in (OBJECT_OT_PlantMesh,
+                    OBJECT_PT_PlantMeshPanel,
+                    ClearGrowingObjectsOperator,
+                    OBJECT_OT_AddCamera,
+                    OBJECT_OT_AddCustomPlane,
+                    OBJECT_OT_GrowScene,
+                    OBJECT_OT_GrowRenderScene,
+                    OBJECT_OT_ResetAnimation,
+                    OBJECT_OT_BakeGrowth,
+                    OBJECT_OT_ExportGrowthCache,
+                    OBJECT_OT_ImportGrowthCache,
+                    OBJECT_OT_PlantBatch,
+                    PlantBatchItem,
+                    OBJECT_OT_AddRandomPlants,
+                    OBJECT_OT_ScatterPlantInstances):
+            try:
+                bpy.utils.unregister_class(cls)
+            except RuntimeError:
+                pass  # Class was not registered, ignore the error
+
+        # Remove custom properties from the Scene type
+        if hasattr(bpy.types.Scene, 'plant_mesh_scale'):
+            del bpy.types.Scene.plant_mesh_scale
+        if hasattr(bpy.types.Scene, 'plant_mesh_location_x'):
+            del bpy.types.Scene.plant_mesh_location_x
+        if hasattr(bpy.types.Scene, 'plant_mesh_location_y'):
+            del bpy.types.Scene.plant_mesh_location_y
+        if hasattr(bpy.types.Scene, 'plant_mesh_location_z'):
+            del bpy.types.Scene.plant_mesh_location_z
+        if hasattr(bpy.types.Scene, 'grow_mesh_running'):
+            del bpy.types.Scene.grow_mesh_running
+            
+        if grow_mesh_handler in bpy.app.handlers.frame_change_post:
+            bpy.app.handlers.frame_change_post.remove(grow_mesh_handler)
+        for handler in bpy.app.handlers.frame_change_pre[:]:
+            bpy.app.handlers.frame_change_pre.remove(handler)
+        if count_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+            bpy.app.handlers.depsgraph_update_post.remove(count_depsgraph_update)
+        if camera_view_handler in bpy.app.handlers.depsgraph_update_post:
+            bpy.app.handlers.depsgraph_update_post.remove(camera_view_handler)
+        if rebuild_garden_on_load in bpy.app.handlers.load_post:
+            bpy.app.handlers.load_post.remove(rebuild_garden_on_load)
+        if store_garden_state_on_save in bpy.app.handlers.save_pre:
+            bpy.app.handlers.save_pre.remove(store_garden_state_on_save)
+        del bpy.types.Scene.garden_plants
+        bpy.utils.unregister_class(PlantRecord)
+        forget_plants()
+        
+        del bpy.types.Scene.custom_plane_size
+        del bpy.types.Scene.custom_plane_color
+        del bpy.types.Scene.custom_frame_start
+        del bpy.types.Scene.custom_frame_end
+        del bpy.types.Scene.custom_frame_per_second
+        del bpy.types.Scene.grow_workers
+        del bpy.types.Scene.grow_vectorized
+        del bpy.types.Scene.garden_seed
+        del bpy.types.Scene.frame_cache_mb
+        del bpy.types.Scene.plant_mesh_mode
+        del bpy.types.Scene.use_frustum_culling
+        del bpy.types.Scene.growth_budget_ms
+        del bpy.types.Scene.garden_baked
+        del bpy.types.Scene.growth_cache_file
+        growth_cache.update(path="", file=None)
+        if bpy.app.timers.is_registered(growth_timer):
+            bpy.app.timers.unregister(growth_timer)
+        del bpy.types.Scene.use_lod
+        del bpy.types.Scene.lod_bias
+        garden.close()
+        del bpy.types.Scene.plane_size
+        del bpy.types.Scene.plane_color
+        del bpy.types.Scene.plant_type
+        del bpy.types.Scene.plant_count
+        del bpy.types.Scene.instance_variants
+        del bpy.types.Scene.instance_week
+
+        classes_registered = False
+        
+def register(addon_rules, plant_types):
+    """Register the garden for an add-on's plant types.
+
+    `addon_rules` is the add-on's plants_rules, `plant_types` the items
+    callback of its Plant Type menu.
+    """
+    global classes_registered
+
+    if not classes_registered:
+        plants_rules.clear()
+        plants_rules.update(addon_rules)
+        # L-system rules are compiled to their dispatch tables once, here
+        for rules in plants_rules.values():
+            if "axiom" in rules:
+                lsystem.compile_rules(rules)
+        
+        bpy.utils.register_class(OBJECT_OT_AddCamera)
+        bpy.types.Scene.custom_plane_size = bpy.props.FloatProperty(name="Plane Size", default=2.0)
+        bpy.types.Scene.custom_plane_color = bpy.props.FloatVectorProperty(name="Plane Color", subtype='COLOR', default=(0.6, 0.4, 0.1, 1.0), size=4, min=0.0, max=1.0)
+        bpy.utils.register_class(OBJECT_OT_AddCustomPlane)
+        
+        # growth
+        bpy.utils.register_class(OBJECT_OT_GrowScene)
+        bpy.utils.register_class(OBJECT_OT_GrowRenderScene)
+        bpy.utils.register_class(OBJECT_OT_ResetAnimation)
+        bpy.utils.register_class(OBJECT_OT_BakeGrowth)
+        bpy.utils.register_class(OBJECT_OT_ExportGrowthCache)
+        bpy.utils.register_class(OBJECT_OT_ImportGrowthCache)
+        bpy.app.handlers.frame_change_post.append(grow_mesh_handler)
+        bpy.app.handlers.frame_change_pre.append(start_depsgraph_frame)
+        bpy.app.handlers.depsgraph_update_post.append(count_depsgraph_update)
+        bpy.app.handlers.depsgraph_update_post.append(camera_view_handler)
+        
+        # Plant registry, rebuilt into the growth engine whenever a file is loaded
+        bpy.utils.register_class(PlantRecord)
+        bpy.types.Scene.garden_plants = bpy.props.CollectionProperty(type=PlantRecord)
+        bpy.app.handlers.load_post.append(rebuild_garden_on_load)
+        bpy.app.handlers.save_pre.append(store_garden_state_on_save)
+        
+        
+        bpy.utils.register_class(OBJECT_OT_PlantMesh)
+        bpy.utils.register_class(OBJECT_OT_AddRandomPlants)
+        bpy.utils.register_class(PlantBatchItem)
+        bpy.utils.register_class(OBJECT_OT_PlantBatch)
+        bpy.utils.register_class(OBJECT_OT_ScatterPlantInstances)
+        bpy.utils.register_class(OBJECT_PT_PlantMeshPanel)
+        bpy.utils.register_class(ClearGrowingObjectsOperator)
+        
+
+        # Create and add scene properties only if they don't exist
+        if not hasattr(bpy.types.Scene, 'plant_mesh_location_x'):
+            bpy.types.Scene.plant_mesh_location_x = bpy.props.FloatProperty(default=0.0)
+        if not hasattr(bpy.types.Scene, 'plant_mesh_location_y'):
+            bpy.types.Scene.plant_mesh_location_y = bpy.props.FloatProperty(default=0.0)
+        if not hasattr(bpy.types.Scene, 'plant_mesh_location_z'):
+            bpy.types.Scene.plant_mesh_location_z = bpy.props.FloatProperty(default=0.0)
+        if not hasattr(bpy.types.Scene, 'grow_mesh_running'):
+            bpy.types.Scene.grow_mesh_running = bpy.props.BoolProperty(default=False)
+        if not hasattr(bpy.types.Scene, 'plant_mesh_scale'):
+           bpy.types.Scene.plant_mesh_scale = bpy.props.FloatProperty(default=1.0, min=1.0)
+        
+        bpy.types.Scene.plane_size = bpy.props.FloatProperty(
+        name="Plane Size",
+        description="Size of the plane",
+        default=2.0,
+        min=0.1,
+        max=10.0
+        )
+        
+        bpy.types.Scene.plane_color = bpy.props.FloatVectorProperty(
+            name="Plane Color",
+            description="Color of the plane",
+            subtype='COLOR',
+            default=(0.03, 0.10, 0.013, 1.0),
+            min=0.0,
+            max=1.0,
+            size=4
+        )
+        
+        bpy.types.Scene.custom_frame_start = bpy.props.IntProperty(
+        name="Start Week",
+        default=1,
+        min=1,
+        )
+        
+        bpy.types.Scene.custom_frame_end = bpy.props.IntProperty(
+            name="End Week",
+            default=12,
+            min=1,
+        )
+        
+        bpy.types.Scene.custom_frame_per_second = bpy.props.IntProperty(
+            name="Frame per Second",
+            default=1,
+            min=1,
+            max=5
+        )
+        
+        bpy.types.Scene.grow_workers = bpy.props.IntProperty(
+            name="Worker Processes",
+            description="Grow plants in this many processes (0 or 1: grow on the main thread)",
+            default=0,
+            min=0,
+            max=64
+        )
+        
+        bpy.types.Scene.grow_vectorized = bpy.props.BoolProperty(
+            name="Vectorized Placement",
+            description="Place all new nodes of a week in one NumPy batch",
+            default=False
+        )
+        
+        bpy.types.Scene.garden_seed = bpy.props.IntProperty(
+            name="Garden Seed",
+            description="Seed new plants and random placement derive their random streams from",
+            default=0,
+            min=0
+        )
+        
+        bpy.types.Scene.frame_cache_mb = bpy.props.IntProperty(
+            name="Frame Cache",
+            description="Memory for snapshots of grown weeks, in MB (0: no cache)",
+            default=64,
+            min=0
+        )
+        
+        bpy.types.Scene.growth_budget_ms = bpy.props.IntProperty(
+            name="Growth Budget",
+            description="Milliseconds of growth per UI tick: weeks are grown in slices from a timer so "
+                        "playback stays interactive (0: grow each week in the frame handler)",
+            default=0,
+            min=0,
+            max=1000
+        )
+        
+        bpy.types.Scene.garden_baked = bpy.props.BoolProperty(
+            name="Growth Baked",
+            description="Every week is grown and keyed by Bake Growth, so frame changes only play "
+                        "animation (Reset to grow live again)",
+            default=False
+        )
+        
+        bpy.types.Scene.growth_cache_file = bpy.props.StringProperty(
+            name="Growth Cache",
+            description="File saved by Export Growth Cache: its weeks are read back instead of grown "
+                        "(empty: always grow)",
+            subtype='FILE_PATH',
+            default=""
+        )
+        
+        bpy.types.Scene.use_frustum_culling = bpy.props.BoolProperty(
+            name="Frustum Culling",
+            description="Plants outside the active camera's view keep growing but get no Blender "
+                        "geometry until they come into view (for rendering wide gardens)",
+            default=False,
+            update=view_settings_changed
+        )
+        
+        bpy.types.Scene.use_lod = bpy.props.BoolProperty(
+            name="Camera LOD",
+            description="Draw plants with less detail the smaller they appear to the active camera",
+            default=False,
+            update=view_settings_changed
+        )
+        
+        bpy.types.Scene.lod_bias = bpy.props.FloatProperty(
+            name="LOD Detail",
+            description="Multiplies the projected size of plants before picking their LOD (higher: more detail)",
+            default=1.0,
+            min=0.01,
+            update=view_settings_changed
+        )
+        
+        bpy.types.Scene.plant_mesh_mode = bpy.props.EnumProperty(
+            name="Plant Mesh",
+            description="How grown nodes are turned into Blender objects",
+            items=[
+                ('OBJECTS', "Object per Node", "Every internode, leaf and flower is its own object"),
+                ('MERGED', "Mesh per Plant", "Everything a plant grows goes into one mesh"),
+                ('SKELETON', "Streamed Skeleton",
+                 "L-system plants are streamed into one edge mesh with a Skin modifier; "
+                 "other plants get one mesh each"),
+                ('SUBTREES', "Shared Subtrees",
+                 "Repeated L-system subtrees are built once and instanced; stochastic "
+                 "L-systems fall back to the streamed skeleton"),
+            ],
+            default='OBJECTS'
+        )
+        
+        bpy.types.Scene.plant_type = bpy.props.EnumProperty(
+            name="Plant Type",
+            description="Type of plant to use in the scene",
+            items=plant_types
+        )
+        
+        bpy.types.Scene.plant_count = bpy.props.IntProperty(
+            name="Plant Count",
+            description="Number of plants to add",
+            default=5,
+            min=1
+        )
+        
+        bpy.types.Scene.instance_variants = bpy.props.IntProperty(
+            name="Variants",
+            description="Distinct grown plants the instances are picked from",
+            default=4,
+            min=1,
+            max=64
+        )
+        
+        bpy.types.Scene.instance_week = bpy.props.IntProperty(
+            name="Grown Weeks",
+            description="Weeks each instanced variant is grown for",
+            default=12,
+            min=0
+        )
+        
+        classes_registered = True
@@ -0,0 +1,764 @@
+"""Headless growth engine shared by the Garden Planning add-ons.
+
+Nothing in here touches bpy: plants, branches and nodes are plain Python
+objects, and every week the garden hands back a list of PlantStep records
+describing what grew. The add-ons only turn those records into Blender
+objects, so the same engine can be run (and timed) under plain CPython.
+"""
+
+import copy
+import hashlib
+import math
+import random
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Quaternion helpers (w, x, y, z) ------------------------------------------
+IDENTITY = (1.0, 0.0, 0.0, 0.0)
+
+
+def axis_angle_quaternion(axis, angle):
+    """Same result as mathutils.Quaternion(axis, angle)"""
+    x, y, z = axis
+    length = math.sqrt(x * x + y * y + z * z)
+    if length == 0.0:
+        return IDENTITY
+    s = math.sin(angle / 2) / length
+    return (math.cos(angle / 2), x * s, y * s, z * s)
+
+
+def rotate_vector(q, v):
+    """Rotate vector v by the unit quaternion q"""
+    w, qx, qy, qz = q
+    vx, vy, vz = v
+    # t = 2 * cross(q.xyz, v)
+    tx = 2.0 * (qy * vz - qz * vy)
+    ty = 2.0 * (qz * vx - qx * vz)
+    tz = 2.0 * (qx * vy - qy * vx)
+    return (vx + w * tx + (qy * tz - qz * ty),
+            vy + w * ty + (qz * tx - qx * tz),
+            vz + w * tz + (qx * ty - qy * tx))
+
+
+def random_axis(rng):
+    """Random rotation axis, drawn the same way rotate_rand always did"""
+    return (rng.uniform(-1.0, 1.0), rng.uniform(-1.0, 1.0), rng.uniform(-1.0, 1.0))
+
+
+def derive_seed(*keys):
+    """Stable 31-bit seed from keys such as (scene seed, plant id, week).
+
+    Unlike hash() it is the same in every Python session, and it fits the
+    IntProperty the add-ons record it in.
+    """
+    digest = hashlib.blake2b(repr(keys).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") & 0x7FFFFFFF
+
+
+# Plant model --------------------------------------------------------------
+STEM = "stem"
+LEAF = "leaf"
+FLOWER = "flower"
+
+
+class Node:
+    """One internode, leaf or flower of a plant.
+
+    location is the base of the node in world space, rotation its absolute
+    orientation and length the distance from base to top along local Z.
+    The top (tip) is computed once, when the node is created.
+    """
+    __slots__ = ("index", "kind", "branch", "location", "rotation", "length", "frame", "tip")
+
+    def __init__(self, index, kind, branch, location, rotation, length, frame, tip=None):
+        self.index = index
+        self.kind = kind
+        self.branch = branch
+        self.location = location
+        self.rotation = rotation
+        self.length = length
+        self.frame = frame
+        if tip is None:
+            dx, dy, dz = rotate_vector(rotation, (0.0, 0.0, length))
+            x, y, z = location
+            tip = (x + dx, y + dy, z + dz)
+        self.tip = tip
+
+    def top(self):
+        return self.tip
+
+
+class Branch:
+    """A stem axis; branch 0 is the main stem of the plant"""
+    __slots__ = ("index", "parent", "depth", "stems")
+
+    def __init__(self, index, parent, depth):
+        self.index = index
+        self.parent = parent
+        self.depth = depth
+        self.stems = []     # indices into Plant.nodes
+
+
+class PlantStep:
+    """What grew on one plant during one week.
+
+    With replace set the plant was rebuilt: nodes and branches then hold
+    everything but the planted stem, and what was shown before goes away.
+    """
+    __slots__ = ("plant_id", "frame", "branches", "nodes", "replace")
+
+    def __init__(self, plant_id, frame):
+        self.plant_id = plant_id
+        self.frame = frame
+        self.branches = []  # new Branch records, in creation order
+        self.nodes = []     # new Node records, in creation order
+        self.replace = False
+
+
+class Plant:
+    """A planted stem and everything grown from it.
+
+    All random draws come from self.rng, which is reseeded from
+    (seed, week) at the start of every week. What grows in a week therefore
+    depends only on the seed and the plant as it stood, never on which
+    other plants or weeks were evaluated before.
+    """
+    rewrites = False    # True for plants rebuilt from scratch each week (lsystem)
+
+    def __init__(self, plant_id, plant_type, location, radius, height, seed=None):
+        self.id = plant_id
+        self.type = plant_type
+        self.location = tuple(location)
+        self.radius = radius
+        self.height = height
+        self.seed = derive_seed(0, plant_id) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.reset()
+
+    def __getstate__(self):
+        # The generator is reseeded every week, so copies need not carry it
+        state = self.__dict__.copy()
+        del state["rng"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.rng = random.Random(self.seed)
+
+    def growth_state(self, frame, rules):
+        """The part of the plant that growing week `frame` reads, for a worker.
+
+        That is the planted stem and the stems of the branches growing this
+        week, as (index, location, length, tip): growing reads nothing else
+        of them. The other nodes are left out, only counted. Rebuilt plants
+        carry their extra state instead.
+        """
+        state = self.__getstate__()
+        nodes, branches = state.pop("nodes"), state.pop("branches")
+        state["node_count"] = len(nodes)
+        state["branches"] = [(branch.parent, branch.depth) for branch in branches]
+        state["stems"] = {branch.index: [(i, nodes[i].location, nodes[i].length, nodes[i].tip) for i in branch.stems]
+                          for branch in self.growing_branches(frame, rules)}
+        root = nodes[0]
+        state["root"] = (root.location, root.length, root.tip)
+        return state
+
+    @classmethod
+    def from_growth_state(cls, state):
+        """Plant that grows like the one `state` came from; only a worker uses it.
+
+        Its stems are stand-ins holding what growing reads, and the nodes
+        left out of the state are None.
+        """
+        state = dict(state)
+        plant = cls.__new__(cls)
+        plant.nodes = [None] * state.pop("node_count")
+        location, length, tip = state.pop("root")
+        plant.nodes[0] = Node(0, STEM, 0, location, IDENTITY, length, 0, tip)
+        plant.branches = [Branch(i, parent, depth) for i, (parent, depth) in enumerate(state.pop("branches"))]
+        for branch, stems in state.pop("stems").items():
+            for index, location, length, tip in stems:
+                plant.nodes[index] = Node(index, STEM, branch, location, IDENTITY, length, 0, tip)
+                plant.branches[branch].stems.append(index)
+        plant.__setstate__(state)
+        return plant
+
+    def add_step(self, step, extra=None):
+        """Add what a worker grew from growth_state, with its new extra state.
+
+        The step's branches are swapped for this plant's own records.
+        """
+        if step.replace:
+            del self.nodes[1:]
+            self.branches = [Branch(0, -1, 0)]
+            self.branches[0].stems.append(0)
+        self.set_extra_state(extra)
+        step.branches = [Branch(branch.index, branch.parent, branch.depth) for branch in step.branches]
+        self.branches.extend(step.branches)
+        for node in step.nodes:
+            self.nodes.append(node)
+            if node.kind == STEM:
+                self.branches[node.branch].stems.append(node.index)
+
+    def reset(self):
+        """Drop everything that grew, keeping only the planted stem"""
+        self.nodes = []
+        self.branches = [Branch(0, -1, 0)]
+        self._add_node(STEM, 0, self.location, IDENTITY, self.height, 0)
+
+    def extra_state(self):
+        """Immutable state beyond nodes and branches that snapshots keep"""
+        return None
+
+    def set_extra_state(self, state):
+        pass
+
+    def _add_node(self, kind, branch, location, rotation, length, frame, tip=None):
+        node = Node(len(self.nodes), kind, branch, location, rotation, length, frame, tip)
+        self.nodes.append(node)
+        if kind == STEM:
+            self.branches[branch].stems.append(node.index)
+        return node
+
+    def _pick_stem(self, branch, rules, pick=None):
+        """Node a branch grows from; `pick` in [0, 1) replaces the plant's own draw"""
+        stems = self.branches[branch].stems
+        if rules.get("pick_node", "random") == "last":
+            return self.nodes[stems[-1]]
+        if pick is not None:
+            return self.nodes[stems[int(pick * len(stems))]]
+        return self.nodes[self.rng.choice(stems)]
+
+    def _rotation(self, angle, straight=False):
+        if straight:
+            return IDENTITY
+        return axis_angle_quaternion(random_axis(self.rng), angle)
+
+    def is_due(self, frame, rules):
+        """True when some branch of the plant grows in week `frame`"""
+        last_week = rules.get("last_week", 0)
+        stem_interval = rules.get("stem_interval", 0)
+        if stem_interval and frame % stem_interval == 0 and (not last_week or frame <= last_week):
+            return True
+        branch_interval = rules.get("branch_interval", 0)
+        return bool(branch_interval and frame % branch_interval == 0 and len(self.branches) > 1)
+
+    def next_growth_frame(self, frame, rules):
+        """First week after `frame` in which the plant grows, 0 for never"""
+        candidates = []
+        last_week = rules.get("last_week", 0)
+        stem_interval = rules.get("stem_interval", 0)
+        if stem_interval:
+            week = (frame // stem_interval + 1) * stem_interval
+            if not last_week or week <= last_week:
+                candidates.append(week)
+        branch_interval = rules.get("branch_interval", 0)
+        if branch_interval and len(self.branches) > 1:
+            candidates.append((frame // branch_interval + 1) * branch_interval)
+        return min(candidates, default=0)
+
+    def growing_branches(self, frame, rules):
+        """Branches that get a new internode in week `frame`"""
+        if not self.is_due(frame, rules):
+            return []
+        last_week = rules.get("last_week", 0)
+        stem_interval = rules.get("stem_interval", 0)
+        branch_interval = rules.get("branch_interval", 0)
+
+        growing = []
+        for branch in self.branches:
+            if branch.index == 0:
+                interval = stem_interval if not last_week or frame <= last_week else 0
+            else:
+                interval = branch_interval
+            if interval and frame % interval == 0:
+                growing.append(branch)
+        return growing
+
+    def grow(self, frame, rules):
+        """Advance the plant to `frame`, returning a PlantStep or None"""
+        # Only branches that existed at the start of the week grow this week
+        growing = self.growing_branches(frame, rules)
+        if not growing:
+            return None
+        self.rng.seed(derive_seed(self.seed, frame))
+        step = PlantStep(self.id, frame)
+        for branch in growing:
+            self._grow_branch(branch, frame, rules, step)
+        return step
+
+    def _grow_branch(self, branch, frame, rules, step):
+        angle = rules["angle_of_branching"]
+        parent = self._pick_stem(branch.index, rules)
+        straight = branch.index == 0 and rules.get("straight_stem", False)
+        new_node = self._add_node(STEM, branch.index, parent.top(),
+                                  self._rotation(angle, straight), parent.length, frame)
+        step.nodes.append(new_node)
+
+        flower_week = rules.get("flower_week", 0)
+        flower_interval = rules.get("flower_interval", 0)
+        if frame == flower_week and rules.get("flower_head") and branch.index == 0:
+            # The head opens on top of the highest internode of the main stem
+            top_stem = max((self.nodes[i] for i in branch.stems), key=lambda n: n.location[2])
+            head = self._add_node(FLOWER, 0, top_stem.top(),
+                                  self._rotation(rules.get("flower_angle", 45)), 0.0, frame)
+            step.nodes.append(head)
+        elif flower_interval and frame % flower_interval == 0:
+            flower = self._add_node(FLOWER, branch.index, new_node.top(), IDENTITY, 0.0, frame)
+            step.nodes.append(flower)
+
+        sprout_interval = rules.get("sprout_interval", 0)
+        if sprout_interval and frame % sprout_interval == 0 and frame != flower_week:
+            self._sprout(new_node, branch, frame, rules, step)
+
+    def _sprout(self, parent, branch, frame, rules, step):
+        new_branch = Branch(len(self.branches), branch.index, branch.depth + 1)
+        self.branches.append(new_branch)
+        step.branches.append(new_branch)
+
+        angle = rules["angle_of_branching"] + rules.get("sprout_angle", 0)
+        stem = self._add_node(STEM, new_branch.index, parent.top(),
+                              self._rotation(angle), parent.length, frame)
+        step.nodes.append(stem)
+
+        if rules.get("branch_leaf"):
+            leaf = self._add_node(LEAF, new_branch.index, stem.top(),
+                                  self._rotation(rules.get("leaf_angle", 15)), 0.0, frame)
+            step.nodes.append(leaf)
+
+
+def grow_plants(plants, frame, rules):
+    """Grow a slice of the garden in place, returning its PlantSteps"""
+    steps = []
+    for plant in plants:
+        step = plant.grow(frame, rules[plant.type])
+        if step is not None:
+            steps.append(step)
+    return steps
+
+
+def grow_states(states, frame, rules):
+    """Entry point of pool workers: grow plants sent as (class, growth_state).
+
+    Only what grew travels back, as (step, extra state) per plant, for
+    Plant.add_step to add in the main process.
+    """
+    grown = []
+    for plant_class, state in states:
+        plant = plant_class.from_growth_state(state)
+        step = plant.grow(frame, rules[plant.type])
+        grown.append(None if step is None else (step, plant.extra_state()))
+    return grown
+
+
+class Garden:
+    """All plants of a scene, grown week by week from per-type rules.
+
+    Plants are kept in a schedule keyed by the next week they grow in, so a
+    week only visits the plants that actually grow. Playing frames in order
+    keeps the schedule incremental; any jump rebuilds it once.
+
+    With workers > 1 the plants of a week are split across a process pool.
+    Workers only get what the week's growth reads and send back what grew,
+    which is added to the plants in place. Each plant draws from its own
+    seeded stream, so the parallel path gives the same result as the serial
+    one. Plants added without a seed get one
+    derived from (garden seed, plant id).
+    """
+
+    def __init__(self, rules, workers=0, seed=0):
+        self.rules = rules
+        self.plants = {}
+        self.workers = workers
+        self.seed = seed
+        self.vectorized = False
+        self.streamed = False    # L-system plants only count derivations, see lsystem
+        self._pool = None
+        self._pool_size = 0
+        self._schedule = {}      # week -> ids of the plants growing that week
+        self._last_frame = None
+        self._planted = 0
+
+    def __contains__(self, plant_id):
+        return plant_id in self.plants
+
+    @property
+    def frame(self):
+        """Last week grown or restored, None before the first"""
+        return self._last_frame
+
+    def __len__(self):
+        return len(self.plants)
+
+    def add_plant(self, plant_id, plant_type, location, radius, height, seed=None):
+        if plant_type not in self.rules:
+            raise KeyError(f"No growth rules for plant type {plant_type!r}")
+        if seed is None:
+            seed = derive_seed(self.seed, plant_id)
+        plant_class = Plant
+        if "axiom" in self.rules[plant_type]:
+            from lsystem import LSystemPlant as plant_class    # needs NumPy
+        plant = plant_class(plant_id, plant_type, location, radius, height, seed)
+        plant.order = self._planted
+        self._planted += 1
+        self.plants[plant_id] = plant
+        if self._last_frame is not None:
+            self._schedule_plant(plant, self._last_frame)
+        return plant
+
+    def remove_plant(self, plant_id):
+        # Stale ids in the schedule are skipped when their week comes
+        self.plants.pop(plant_id, None)
+
+    def clear(self):
+        self.plants.clear()
+        self._schedule.clear()
+        self._last_frame = None
+
+    def close(self):
+        """Shut down the worker processes, if any were started"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._pool_size = 0
+
+    def reset(self):
+        for plant in self.plants.values():
+            plant.reset()
+        self._schedule.clear()
+        self._last_frame = None
+
+    def _schedule_plant(self, plant, frame):
+        week = plant.next_growth_frame(frame, self.rules[plant.type])
+        if week:
+            self._schedule.setdefault(week, []).append(plant.id)
+
+    def due_plants(self, frame):
+        """Plants growing in week `frame`, in planting order"""
+        if self._last_frame is None or frame != self._last_frame + 1:
+            self._schedule.clear()
+            for plant in self.plants.values():
+                self._schedule_plant(plant, frame - 1)
+        self._last_frame = frame
+        plants = [self.plants[plant_id] for plant_id in self._schedule.pop(frame, ())
+                  if plant_id in self.plants]
+        plants.sort(key=lambda plant: plant.order)
+        return plants
+
+    def node_count(self):
+        return sum(len(plant.nodes) for plant in self.plants.values())
+
+    def snapshot(self, frame, previous=None):
+        """State of every plant after week `frame`, see GardenSnapshot"""
+        return GardenSnapshot(frame, self.plants.values(), previous)
+
+    def planted(self):
+        """Snapshot of every plant as it was planted, before week 1 (frame 0)"""
+        plants = []
+        for plant in self.plants.values():
+            plant = copy.copy(plant)
+            plant.reset()
+            plants.append(plant)
+        return GardenSnapshot(0, plants)
+
+    def restore(self, snapshot):
+        """Put the plants back to a snapshot without growing anything.
+
+        Returns (plant, node_count, branch_count) for every plant that
+        changed, with the counts it had before, so the caller only has to
+        add or remove the difference.
+        """
+        changed = []
+        for plant_id, (nodes, branches, extra) in snapshot.plants.items():
+            plant = self.plants.get(plant_id)
+            if plant is None:
+                continue
+            before = (len(plant.nodes), len(plant.branches))
+            if before == (len(nodes), len(branches)) and plant.extra_state() is extra:
+                continue
+            plant.set_extra_state(extra)
+            plant.nodes = list(nodes)
+            plant.branches = [Branch(i, parent, depth) for i, (parent, depth) in enumerate(branches)]
+            for node in nodes:
+                if node.kind == STEM:
+                    plant.branches[node.branch].stems.append(node.index)
+            changed.append((plant,) + before)
+
+        self._last_frame = snapshot.frame
+        self._schedule.clear()
+        for plant in self.plants.values():
+            self._schedule_plant(plant, snapshot.frame)
+        return changed
+
+    def grow(self, frame):
+        """Grow the plants due this week and return the list of PlantSteps"""
+        week = self.start_week(frame)
+        return week.grow(len(week))
+
+    def start_week(self, frame):
+        """Week `frame` as a WeekGrowth, to grow a few plants at a time"""
+        return WeekGrowth(self, frame, self.due_plants(frame))
+
+    def _grow_chunk(self, plants, frame):
+        for plant in plants:
+            if plant.rewrites:
+                plant.streamed = self.streamed
+        if self.vectorized:
+            steps = self._grow_vectorized(frame, plants)
+        elif self.workers > 1 and len(plants) >= 2 * self.workers:
+            steps = self._grow_parallel(plants, frame)
+        else:
+            steps = grow_plants(plants, frame, self.rules)
+
+        for plant in plants:
+            self._schedule_plant(plant, frame)
+        return steps
+
+    def _executor(self):
+        if self._pool is None or self._pool_size != self.workers:
+            self.close()
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            self._pool_size = self.workers
+        return self._pool
+
+    def _grow_parallel(self, plants, frame):
+        pool = self._executor()
+        # A few chunks per worker keeps the cores busy when plant sizes differ
+        chunk_count = min(len(plants), self.workers * 4)
+        chunk_size = -(-len(plants) // chunk_count)
+        chunks = [plants[i:i + chunk_size] for i in range(0, len(plants), chunk_size)]
+        futures = [pool.submit(grow_states, [(type(plant), plant.growth_state(frame, self.rules[plant.type]))
+                                             for plant in chunk], frame, self.rules)
+                   for chunk in chunks]
+
+        # Merge in submission order so steps come back in the serial order
+        steps = []
+        for chunk, future in zip(chunks, futures):
+            for plant, grown in zip(chunk, future.result()):
+                if grown is not None:
+                    plant.add_step(*grown)
+                    steps.append(grown[0])
+        return steps
+
+    def _grow_vectorized(self, frame, plants):
+        """Grow all plants with the NumPy kernel, one batch per growth wave.
+
+        A week has at most three dependent waves: new internodes, then the
+        flowers and side branches on top of them, then the leaves on the
+        side branches. All the random draws of the week come from one
+        stream seeded by (garden seed, frame), so this mode is deterministic
+        but does not reproduce the per-plant streams of the serial path.
+        """
+        import transform_kernel as kernel   # NumPy is only needed in this mode
+
+        rng = kernel.frame_rng(self.seed, frame)
+        steps = {}
+
+        growing = []
+        for plant in plants:
+            rules = self.rules[plant.type]
+            if plant.rewrites:
+                step = plant.grow(frame, rules)
+                if step is not None:
+                    steps[plant.id] = step
+                continue
+            for branch in plant.growing_branches(frame, rules):
+                growing.append((plant, rules, branch))
+        if not growing:
+            return [steps[plant.id] for plant in plants if plant.id in steps]
+
+        # Wave 1: a new internode on every growing branch
+        picks = rng.random(len(growing))
+        requests = []
+        for (plant, rules, branch), pick in zip(growing, picks):
+            parent = plant._pick_stem(branch.index, rules, pick)
+            straight = branch.index == 0 and rules.get("straight_stem", False)
+            requests.append((plant, STEM, branch.index, parent.tip, parent.length,
+                             rules["angle_of_branching"], straight))
+        new_stems = _place_wave(requests, frame, rng, steps)
+
+        # Wave 2: flowers and side branches on top of the new internodes
+        crowns = []
+        for (plant, rules, branch), node in zip(growing, new_stems):
+            flower_week = rules.get("flower_week", 0)
+            flower_interval = rules.get("flower_interval", 0)
+            if frame == flower_week and rules.get("flower_head") and branch.index == 0:
+                top_stem = max((plant.nodes[i] for i in branch.stems), key=lambda n: n.location[2])
+                crowns.append((plant, FLOWER, 0, top_stem.tip, 0.0,
+                               rules.get("flower_angle", 45), False))
+            elif flower_interval and frame % flower_interval == 0:
+                crowns.append((plant, FLOWER, branch.index, node.tip, 0.0, 0.0, True))
+
+            sprout_interval = rules.get("sprout_interval", 0)
+            if sprout_interval and frame % sprout_interval == 0 and frame != flower_week:
+                new_branch = Branch(len(plant.branches), branch.index, branch.depth + 1)
+                plant.branches.append(new_branch)
+                steps[plant.id].branches.append(new_branch)
+                angle = rules["angle_of_branching"] + rules.get("sprout_angle", 0)
+                crowns.append((plant, STEM, new_branch.index, node.tip, node.length, angle, False))
+        wave = _place_wave(crowns, frame, rng, steps)
+
+        # Wave 3: leaves on the new side branches
+        leaves = []
+        for node, (plant, kind, branch_index, *_) in zip(wave, crowns):
+            rules = self.rules[plant.type]
+            if kind == STEM and rules.get("branch_leaf"):
+                leaves.append((plant, LEAF, branch_index, node.tip, 0.0,
+                               rules.get("leaf_angle", 15), False))
+        _place_wave(leaves, frame, rng, steps)
+
+        return [steps[plant.id] for plant in plants if plant.id in steps]
+
+
+class WeekGrowth:
+    """The plants due in one week, grown a slice at a time.
+
+    Every plant grows from its own seeded stream, so growing a week in
+    slices gives the same plants as Garden.grow. The vectorized mode draws
+    the whole week from one stream, so there the first slice grows all of
+    it. Nothing else should grow or restore the garden until the week is
+    finished: plants not grown yet are already off the schedule.
+    """
+
+    def __init__(self, garden, frame, plants):
+        self.garden = garden
+        self.frame = frame
+        self.plants = plants
+        self.done = 0
+
+    def __len__(self):
+        return len(self.plants)
+
+    @property
+    def finished(self):
+        return self.done >= len(self.plants)
+
+    def grow(self, count):
+        """Grow the next `count` plants and return their PlantSteps"""
+        if self.garden.vectorized:
+            count = len(self.plants)
+        chunk = self.plants[self.done:self.done + max(count, 1)]
+        self.done += len(chunk)
+        if not chunk:
+            return []
+        return self.garden._grow_chunk(chunk, self.frame)
+
+
+class GardenSnapshot:
+    """Nodes and branches of every plant after one week.
+
+    Nodes never change once grown, so a snapshot only keeps tuples of
+    references to them, and plants that did not grow since `previous`
+    share its tuples. nbytes estimates what the snapshot itself adds.
+    """
+    __slots__ = ("frame", "plants", "nbytes")
+
+    def __init__(self, frame, plants, previous=None):
+        self.frame = frame
+        self.plants = {}    # plant id -> (nodes, ((parent, depth) per branch), extra state)
+        self.nbytes = 0
+        shared = previous.plants if previous is not None else {}
+        for plant in plants:
+            part = shared.get(plant.id)
+            extra = plant.extra_state()
+            if (part is None or len(part[0]) != len(plant.nodes) or len(part[1]) != len(plant.branches)
+                    or part[2] is not extra):
+                part = (tuple(plant.nodes), tuple((b.parent, b.depth) for b in plant.branches), extra)
+                self.nbytes += 8 * len(part[0]) + 72 * len(part[1]) + 112
+                if plant.rewrites:
+                    # Rebuilt plants own their nodes and their symbol buffer
+                    self.nbytes += 200 * len(part[0]) + getattr(extra[1], "nbytes", 0)
+            self.plants[plant.id] = part
+            self.nbytes += 64
+
+
+class FrameCache:
+    """Garden snapshots by week with a memory budget in bytes.
+
+    Once the estimated size passes the budget the least recently used
+    weeks are dropped first. A budget of 0 turns the cache off.
+    """
+
+    def __init__(self, budget=0):
+        self.budget = budget
+        self.nbytes = 0
+        self._snapshots = OrderedDict()
+
+    def __contains__(self, frame):
+        return frame in self._snapshots
+
+    def __len__(self):
+        return len(self._snapshots)
+
+    def get(self, frame):
+        snapshot = self._snapshots.get(frame)
+        if snapshot is not None:
+            self._snapshots.move_to_end(frame)
+        return snapshot
+
+    def peek(self, frame):
+        """Like get, without counting as a use"""
+        return self._snapshots.get(frame)
+
+    def latest(self, frame):
+        """Snapshot of the last cached week at or before `frame`, or None"""
+        weeks = [week for week in self._snapshots if week <= frame]
+        return self.get(max(weeks)) if weeks else None
+
+    def put(self, snapshot):
+        if not self.budget:
+            return
+        old = self._snapshots.pop(snapshot.frame, None)
+        if old is not None:
+            self.nbytes -= old.nbytes
+        self._snapshots[snapshot.frame] = snapshot
+        self.nbytes += snapshot.nbytes
+        self.trim()
+
+    def trim(self):
+        while self._snapshots and self.nbytes > self.budget:
+            _, snapshot = self._snapshots.popitem(last=False)
+            self.nbytes -= snapshot.nbytes
+
+    def clear(self):
+        self._snapshots.clear()
+        self.nbytes = 0
+
+
+def _place_wave(requests, frame, rng, steps):
+    """Place a batch of (plant, kind, branch, base, length, angle, straight)
+    requests with one kernel call and add the nodes to their plants"""
+    if not requests:
+        return []
+    import numpy as np
+    import transform_kernel as kernel
+
+    _, _, _, bases, lengths, angles, straight = zip(*requests)
+    quats, tips = kernel.place_tips(np.array(bases), np.array(lengths), np.array(angles),
+                                    rng, straight=straight)
+    quats = quats.tolist()
+    tips = tips.tolist()
+
+    nodes = []
+    for i, (plant, kind, branch, base, length, _, _) in enumerate(requests):
+        node = plant._add_node(kind, branch, tuple(base), tuple(quats[i]), length, frame, tuple(tips[i]))
+        step = steps.get(plant.id)
+        if step is None:
+            step = steps[plant.id] = PlantStep(plant.id, frame)
+        step.nodes.append(node)
+        nodes.append(node)
+    return nodes
+
+
+def grow_variant(rules, plant_type, weeks, seed, radius, height):
+    """Grow a lone plant at the origin for `weeks` weeks.
+
+    Used to build the few distinct plants that instanced gardens scatter:
+    the same (type, weeks, seed) always gives the same plant.
+    """
+    garden = Garden(rules)
+    plant = garden.add_plant(f"{plant_type}_{seed}", plant_type, (0.0, 0.0, 0.0), radius, height, seed)
+    for week in range(1, weeks + 1):
+        garden.grow(week)
+    return plant
@@ -0,0 +1,664 @@
+"""L-system plants for the growth engine.
+
+A plant type whose rules have an "axiom" grows by rewriting: every week is
+one derivation step, up to "depth" steps, and the derived string is read by
+a turtle into the same Node and Branch records the rest of the engine uses.
+
+Symbols are single ASCII characters kept in a uint8 NumPy buffer. A
+derivation rewrites every symbol at once with table lookups, so a step
+costs a few array operations instead of one string concatenation per
+symbol.
+
+Turtle symbols (angles from "angle_of_branching", in degrees):
+    F       internode of the planted stem's height, drawn as a stem node
+    f       move forward without drawing
+    + -     turn around the local X axis
+    & ^     pitch around the local Y axis
+    / \\     roll around the heading (local Z)
+    [ ]     push / pop the turtle; the first node drawn after [ starts a branch
+    L       leaf, tilted by "leaf_angle"
+    K       flower
+Any other symbol (A, B, X ...) only takes part in the rewriting.
+
+For very long derivations derivation_chunks and turtle_chunks stream the
+string and its skeleton (vertices, edges, radii) in fixed-size chunks
+instead of holding the whole string in memory. Deterministic systems can
+instead be expanded into a SubtreeDAG, where each distinct subtree is
+stored and drawn once.
+"""
+
+import bisect
+import math
+
+import numpy as np
+
+import growth_engine
+from growth_engine import Branch, IDENTITY, PlantStep, STEM, LEAF, FLOWER
+
+
+FORWARD, LEAF_SYMBOL, FLOWER_SYMBOL, MOVE, PUSH, POP = (ord(symbol) for symbol in "FLKf[]")
+DRAWN = {FORWARD, LEAF_SYMBOL, FLOWER_SYMBOL}
+
+
+PRODUCTION_KEYS = {"successor", "weight", "min_age", "max_age", "min_depth", "max_depth"}
+
+
+def _alternatives(symbol, production):
+    """A production as a list of alternatives; a plain string is one alternative"""
+    if isinstance(production, str):
+        return [{"successor": production}]
+    for alternative in production:
+        if "successor" not in alternative or set(alternative) - PRODUCTION_KEYS:
+            raise ValueError(f"Bad production for {symbol!r}: {alternative!r}")
+    return list(production)
+
+
+def _applies(alternative, name, value):
+    low = alternative.get("min_" + name)
+    high = alternative.get("max_" + name)
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+def _brackets_balanced(text):
+    nest = 0
+    for symbol in text:
+        nest += (symbol == PUSH) - (symbol == POP)
+        if nest < 0:
+            return False
+    return nest == 0
+
+
+def _bucket_edges(alternatives, name):
+    """Values where some min_/max_ condition on `name` changes its answer"""
+    edges = set()
+    for alternative in alternatives:
+        if alternative.get("min_" + name) is not None:
+            edges.add(alternative["min_" + name])
+        if alternative.get("max_" + name) is not None:
+            edges.add(alternative["max_" + name] + 1)
+    return sorted(edges)
+
+
+def _bucket_value(edges, bucket):
+    """A value inside bucket `bucket` of `edges`"""
+    return edges[bucket - 1] if bucket else (edges[0] - 1 if edges else 0)
+
+
+def _alias_table(weights):
+    """Walker/Vose alias table: one draw picks an alternative in O(1)"""
+    count = len(weights)
+    total = float(sum(weights))
+    prob = [weight * count / total for weight in weights]
+    alias = list(range(count))
+    small = [i for i, p in enumerate(prob) if p < 1.0]
+    large = [i for i, p in enumerate(prob) if p >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        alias[less] = more
+        prob[more] -= 1.0 - prob[less]
+        (small if prob[more] < 1.0 else large).append(more)
+    for i in small + large:
+        prob[i] = 1.0
+    return prob, alias
+
+
+# Counter-based random numbers: the draw of a symbol depends only on
+# (seed, derivation, position), so streamed and whole-array derivations agree
+GOLDEN = 0x9E3779B97F4A7C15
+MASK = (1 << 64) - 1
+
+
+def _mix(x):
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK
+    return x ^ (x >> 31)
+
+
+def derivation_key(seed, age):
+    return _mix((seed * GOLDEN + age) & MASK)
+
+
+def uniform_pair(key, index):
+    """Two uniforms in [0, 1) for the symbol at `index`"""
+    x = _mix((key + index * GOLDEN) & MASK)
+    return (x >> 32) / 4294967296.0, (x & 0xFFFFFFFF) / 4294967296.0
+
+
+def uniforms(key, count):
+    """uniform_pair for indices 0 .. count - 1, as two arrays"""
+    with np.errstate(over="ignore"):
+        x = np.uint64(key) + np.arange(count, dtype=np.uint64) * np.uint64(GOLDEN)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x ^= x >> np.uint64(31)
+    return (x >> np.uint64(32)) / 4294967296.0, (x & np.uint64(0xFFFFFFFF)) / 4294967296.0
+
+
+class LSystem:
+    """Axiom and productions of one plant type, compiled to dispatch tables.
+
+    A production is a successor string, or a list of alternatives
+    {"successor", "weight", "min_age", "max_age", "min_depth", "max_depth"}.
+    age is the number of the derivation (the week) and depth the [ ]
+    nesting of the symbol. Conditions only change at a few ages and
+    depths, so one table is built per age range up front; a cell of it,
+    indexed by (symbol, depth range), holds the alternatives that apply
+    as an alias table. Rewriting a symbol is then a fixed number of
+    lookups however many rules the species has.
+    """
+
+    def __init__(self, axiom, productions):
+        self.axiom = self.encode(axiom)
+        # Successor ids 0-255 are the symbols themselves, then one per alternative
+        successors = [bytes([symbol]) for symbol in range(256)]
+        options = {}
+        for symbol, production in productions.items():
+            for alternative in _alternatives(symbol, production):
+                options.setdefault(ord(symbol), []).append((len(successors), alternative))
+                successors.append(self.encode(alternative["successor"]).tobytes())
+        alternatives = [alternative for choices in options.values() for _, alternative in choices]
+
+        self.successors = successors
+        self.rewritten = set(options)
+        # Every successor closes the brackets it opens (needed to share subtrees)
+        self.balanced = not self.rewritten & {PUSH, POP} and all(
+            _brackets_balanced(successor) for successor in successors[256:])
+        self._lengths = np.array([len(successor) for successor in successors], dtype=np.int64)
+        self._starts = np.concatenate(([0], np.cumsum(self._lengths)[:-1]))
+        self._flat = np.frombuffer(b"".join(successors), dtype=np.uint8)
+
+        self._age_edges = _bucket_edges(alternatives, "age")
+        self._depth_edges = _bucket_edges(alternatives, "depth")
+        self._depth_array = np.array(self._depth_edges, dtype=np.int64)
+        self._tables = [self._build_table(options, _bucket_value(self._age_edges, bucket))
+                        for bucket in range(len(self._age_edges) + 1)]
+        self._table_lists = [tuple(column.tolist() for column in table) for table in self._tables]
+        self.stochastic = any(table[3].max() > 1 for table in self._tables)
+        # Random choices and depth conditions need every symbol's position
+        self.positional = self.stochastic or bool(self._depth_edges)
+
+    def _build_table(self, options, age):
+        """(choices, prob, alias, sizes) with one row per (symbol, depth range)"""
+        depth_buckets = len(self._depth_edges) + 1
+        cells = [[(symbol, 1.0)] for symbol in range(256) for _ in range(depth_buckets)]
+        for symbol, choices in options.items():
+            for bucket in range(depth_buckets):
+                depth = _bucket_value(self._depth_edges, bucket)
+                live = [(successor, alternative.get("weight", 1.0)) for successor, alternative in choices
+                        if alternative.get("weight", 1.0) > 0
+                        and _applies(alternative, "age", age) and _applies(alternative, "depth", depth)]
+                if live:
+                    cells[symbol * depth_buckets + bucket] = live
+
+        width = max(len(live) for live in cells)
+        choices = np.zeros((len(cells), width), dtype=np.int64)
+        prob = np.ones((len(cells), width))
+        alias = np.zeros((len(cells), width), dtype=np.int64)
+        sizes = np.empty(len(cells), dtype=np.int64)
+        for cell, live in enumerate(cells):
+            cell_prob, cell_alias = _alias_table([weight for _, weight in live])
+            choices[cell, :len(live)] = [successor for successor, _ in live]
+            prob[cell, :len(live)] = cell_prob
+            alias[cell, :len(live)] = cell_alias
+            sizes[cell] = len(live)
+        return choices, prob, alias, sizes
+
+    @staticmethod
+    def encode(text):
+        return np.frombuffer(text.replace(" ", "").encode("ascii"), dtype=np.uint8).copy()
+
+    def _age_bucket(self, age):
+        return bisect.bisect_right(self._age_edges, age)
+
+    def pick(self, symbols, age, seed=0):
+        """Successor id of every symbol for derivation number `age`"""
+        choices, prob, alias, sizes = self._tables[self._age_bucket(age)]
+        cells = symbols.astype(np.int64)
+        if self._depth_edges:
+            step = (symbols == PUSH).astype(np.int64) - (symbols == POP)
+            depth = np.cumsum(step) - step
+            cells = cells * (len(self._depth_edges) + 1) + np.searchsorted(self._depth_array, depth, side="right")
+        if not self.stochastic:
+            return choices[cells, 0]
+        column_u, coin = uniforms(derivation_key(seed, age), len(symbols))
+        column = (column_u * sizes[cells]).astype(np.int64)
+        return np.where(coin < prob[cells, column], choices[cells, column], choices[cells, alias[cells, column]])
+
+    def choose(self, symbol, age, depth, key, index):
+        """pick for a single symbol at position `index`, as the streaming expansion needs"""
+        choices, prob, alias, sizes = self._table_lists[self._age_bucket(age)]
+        cell = symbol
+        if self._depth_edges:
+            cell = symbol * (len(self._depth_edges) + 1) + bisect.bisect_right(self._depth_edges, depth)
+        size = sizes[cell]
+        if size == 1:
+            return choices[cell][0]
+        column_u, coin = uniform_pair(key, index)
+        column = int(column_u * size)
+        return choices[cell][column] if coin < prob[cell][column] else choices[cell][alias[cell][column]]
+
+    def derive(self, symbols, age=1, seed=0):
+        """Derivation number `age`: every symbol is replaced at once"""
+        picks = self.pick(symbols, age, seed)
+        lengths = self._lengths[picks]
+        ends = np.cumsum(lengths)
+        total = int(ends[-1]) if len(ends) else 0
+        # Position of every output symbol inside the successor it comes from
+        within = np.arange(total) - np.repeat(ends - lengths, lengths)
+        return self._flat[np.repeat(self._starts[picks], lengths) + within]
+
+    def symbol_counts(self, depth):
+        """How often each symbol occurs after `depth` derivations, without deriving.
+
+        Only for systems that are not positional, where the counts are exact.
+        """
+        successor_counts = np.zeros((len(self.successors), 256), dtype=np.int64)
+        for successor, text in enumerate(self.successors):
+            np.add.at(successor_counts[successor], np.frombuffer(text, dtype=np.uint8), 1)
+        counts = np.bincount(self.axiom, minlength=256).astype(np.int64)
+        for age in range(1, depth + 1):
+            counts = counts @ successor_counts[self._tables[self._age_bucket(age)][0][:, 0]]
+        return counts
+
+
+_compiled = {}
+
+
+def compile_rules(rules):
+    """LSystem of a rules dict, compiled the first time it is asked for"""
+    key = (rules["axiom"], repr(rules.get("productions", {})))
+    system = _compiled.get(key)
+    if system is None:
+        system = _compiled[key] = LSystem(rules["axiom"], rules.get("productions", {}))
+    return system
+
+
+def multiply_quaternions(a, b):
+    aw, ax, ay, az = a
+    bw, bx, by, bz = b
+    return (aw * bw - ax * bx - ay * by - az * bz,
+            aw * bx + ax * bw + ay * bz - az * by,
+            aw * by - ax * bz + ay * bw + az * bx,
+            aw * bz + ax * by - ay * bx + az * bw)
+
+
+def turtle_turns(rules):
+    """Local rotation of every turn symbol"""
+    angle = math.radians(rules["angle_of_branching"])
+    axes = {"+": (1, 0, 0), "-": (1, 0, 0), "&": (0, 1, 0), "^": (0, 1, 0), "/": (0, 0, 1), "\\": (0, 0, 1)}
+    return {ord(symbol): growth_engine.axis_angle_quaternion(axis, -angle if symbol in "-^\\" else angle)
+            for symbol, axis in axes.items()}
+
+
+def interpret(plant, symbols, rules, frame):
+    """Walk the turtle over a derived string, adding its nodes to `plant`.
+
+    The turtle starts on top of the planted stem, heading up.
+    """
+    turns = turtle_turns(rules)
+    leaf_tilt = growth_engine.axis_angle_quaternion((1, 0, 0), math.radians(rules.get("leaf_angle", 45)))
+    length = plant.height
+    position, rotation, branch = plant.nodes[0].tip, IDENTITY, 0
+    open_branch = False     # a [ was read and no node has been drawn since
+    stack = []
+
+    for symbol in symbols.tobytes():
+        if symbol in turns:
+            rotation = multiply_quaternions(rotation, turns[symbol])
+        elif symbol in DRAWN:
+            if open_branch:
+                new_branch = Branch(len(plant.branches), branch, plant.branches[branch].depth + 1)
+                plant.branches.append(new_branch)
+                branch = new_branch.index
+                open_branch = False
+            if symbol == FORWARD:
+                position = plant._add_node(STEM, branch, position, rotation, length, frame).tip
+            elif symbol == LEAF_SYMBOL:
+                plant._add_node(LEAF, branch, position, multiply_quaternions(rotation, leaf_tilt), 0.0, frame)
+            else:
+                plant._add_node(FLOWER, branch, position, rotation, 0.0, frame)
+        elif symbol == PUSH:
+            stack.append((position, rotation, branch))
+            open_branch = True
+        elif symbol == POP:
+            if stack:
+                position, rotation, branch = stack.pop()
+            open_branch = False
+        elif symbol == MOVE:
+            dx, dy, dz = growth_engine.rotate_vector(rotation, (0.0, 0.0, length))
+            position = (position[0] + dx, position[1] + dy, position[2] + dz)
+
+
+# Streaming ---------------------------------------------------------------
+CHUNK_SIZE = 1 << 16    # symbols per chunk
+MAX_STACK = 256         # deepest [ nesting the streaming turtle follows
+
+
+def derivation_chunks(system, depth, chunk_size=CHUNK_SIZE, seed=0):
+    """The string after `depth` derivations, as bytes chunks in order.
+
+    The expansion runs depth first, holding one successor per level, so
+    memory stays flat however many symbols the derivation has. It gives
+    the same string as calling system.derive `depth` times with `seed`.
+    """
+    if depth == 0:
+        yield system.axiom.tobytes()
+        return
+    successors = system.successors
+    rewritten = system.rewritten
+    positional = system.positional
+    keys = [derivation_key(seed, age) for age in range(1, depth + 1)]
+    index = [0] * (depth + 1)   # per level: position of the next symbol
+    nest = [0] * (depth + 1)    # per level: [ ] depth of the next symbol
+    parts, size = [], 0
+    stack = [iter(system.axiom.tobytes())]
+    while stack:
+        symbol = next(stack[-1], None)
+        if symbol is None:
+            stack.pop()
+            continue
+        level = len(stack)      # this symbol is rewritten by derivation number `level`
+        if positional:
+            successor = system.choose(symbol, level, nest[level], keys[level - 1], index[level])
+            index[level] += 1
+            nest[level] += (symbol == PUSH) - (symbol == POP)
+        elif symbol in rewritten:
+            successor = system.choose(symbol, level, 0, 0, 0)
+        elif level < depth:
+            # A symbol without productions expands to itself
+            successor = symbol
+            level = depth
+        else:
+            successor = symbol
+        if level < depth:
+            stack.append(iter(successors[successor]))
+            continue
+        parts.append(successors[successor])
+        size += len(successors[successor])
+        if size >= chunk_size:
+            yield b"".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b"".join(parts)
+
+
+def turtle_chunks(chunks, rules, origin, length, radius, max_stack=MAX_STACK):
+    """Run the turtle over a stream of symbol chunks, yielding skeleton arrays.
+
+    For every chunk yields (co, edges, radii): float32 (n, 3) positions of
+    the new vertices, int32 (m, 2) edges by global vertex index and float32
+    radii. Vertex 0 is `origin` and comes with the first chunk. Every F
+    adds one vertex and one edge, f starts a new piece, and the radius
+    shrinks by "radius_ratio" in each branch. Branches nested deeper than
+    max_stack are skipped, so the stack never grows past it.
+    """
+    turns = turtle_turns(rules)
+    ratio = rules.get("radius_ratio", 0.7)
+    position, rotation, vertex, width = tuple(origin), IDENTITY, 0, radius
+    heading = (0.0, 0.0, length)
+    count = 1
+    stack = []
+    skip = 0    # depth inside a branch that is too deep to follow
+    co, edges, radii = list(position), [], [width]
+
+    for chunk in chunks:
+        for symbol in chunk:
+            if skip:
+                skip += (symbol == PUSH) - (symbol == POP)
+            elif symbol == FORWARD or symbol == MOVE:
+                position = (position[0] + heading[0], position[1] + heading[1], position[2] + heading[2])
+                co.extend(position)
+                radii.append(width)
+                if symbol == FORWARD:
+                    edges.extend((vertex, count))
+                vertex = count
+                count += 1
+            elif symbol in turns:
+                rotation = multiply_quaternions(rotation, turns[symbol])
+                heading = growth_engine.rotate_vector(rotation, (0.0, 0.0, length))
+            elif symbol == PUSH:
+                if len(stack) >= max_stack:
+                    skip = 1
+                else:
+                    stack.append((position, rotation, heading, vertex, width))
+                    width *= ratio
+            elif symbol == POP and stack:
+                position, rotation, heading, vertex, width = stack.pop()
+        yield (np.array(co, dtype=np.float32).reshape(-1, 3),
+               np.array(edges, dtype=np.int32).reshape(-1, 2),
+               np.array(radii, dtype=np.float32))
+        co, edges, radii = [], [], []
+
+
+def skeleton_arrays(system, rules, depth, origin, length, radius, chunk_size=CHUNK_SIZE, seed=0):
+    """Whole skeleton of a derivation as (co, edges, radii) for foreach_set.
+
+    When the symbol counts are known up front the output arrays are sized
+    from them and filled chunk by chunk; the derived string itself is never
+    held in memory either way.
+    """
+    stream = turtle_chunks(derivation_chunks(system, depth, chunk_size, seed), rules, origin, length, radius)
+    if system.positional:
+        co, edges, radii = zip(*stream)
+        return np.concatenate(co), np.concatenate(edges), np.concatenate(radii)
+
+    counts = system.symbol_counts(depth)
+    vertex_total = 1 + int(counts[FORWARD] + counts[MOVE])
+    co = np.empty((vertex_total, 3), dtype=np.float32)
+    edges = np.empty((int(counts[FORWARD]), 2), dtype=np.int32)
+    radii = np.empty(vertex_total, dtype=np.float32)
+
+    vertex_count = edge_count = 0
+    for chunk_co, chunk_edges, chunk_radii in stream:
+        co[vertex_count:vertex_count + len(chunk_co)] = chunk_co
+        radii[vertex_count:vertex_count + len(chunk_radii)] = chunk_radii
+        edges[edge_count:edge_count + len(chunk_edges)] = chunk_edges
+        vertex_count += len(chunk_co)
+        edge_count += len(chunk_edges)
+    # Skipped branches leave the ends unused
+    return co[:vertex_count], edges[:edge_count], radii[:vertex_count]
+
+
+# Shared subtrees ----------------------------------------------------------
+def _advance(position, rotation, offset):
+    dx, dy, dz = growth_engine.rotate_vector(rotation, offset)
+    return (position[0] + dx, position[1] + dy, position[2] + dz)
+
+
+class SubtreeDAG:
+    """The expansion of `depth` derivations as a DAG of shared subtrees.
+
+    A node is a symbol at one level of the derivation together with all it
+    expands into. Nodes are hash-consed on (symbol, level, [ ] depth), so a
+    subtree that occurs many times is stored once: memory grows with the
+    distinct subtrees, not with the length of the expanded string. Symbols
+    drawn as they are (at the last level, or without productions) are
+    leaves keyed on the symbol alone. Node ids are topologically sorted,
+    children before parents.
+
+    Random choices depend on the position of every symbol, so stochastic
+    systems have nothing to share and are refused.
+    """
+
+    def __init__(self, system, depth):
+        if system.stochastic or not system.balanced:
+            raise ValueError("Only deterministic L-systems with balanced successors share subtrees")
+        self.system = system
+        self.depth = depth
+        self.symbols = []
+        self.levels = []
+        self.nests = []
+        self.children = []  # child node ids, empty for leaves
+        self._ids = {}
+        children = self._expand(system.axiom.tobytes(), 0, 0)
+        self.root = self._add(None, -1, 0, children)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _add(self, symbol, level, nest, children):
+        self.symbols.append(symbol)
+        self.levels.append(level)
+        self.nests.append(nest)
+        self.children.append(tuple(children))
+        return len(self.symbols) - 1
+
+    def _expand(self, successor, level, nest):
+        children = []
+        for symbol in successor:
+            children.append(self._node(symbol, level, nest))
+            nest += (symbol == PUSH) - (symbol == POP)
+        return children
+
+    def _node(self, symbol, level, nest):
+        leaf = level >= self.depth or symbol not in self.system.rewritten
+        key = (symbol,) if leaf else (symbol, level, nest)
+        node = self._ids.get(key)
+        if node is None:
+            children = ()
+            if not leaf:
+                successor = self.system.successors[self.system.choose(symbol, level + 1, nest, 0, 0)]
+                children = self._expand(successor, level + 1, nest)
+            node = self._ids[key] = self._add(symbol, level, nest, children)
+        return node
+
+    def expanded_size(self):
+        """Length of the string the DAG stands for"""
+        sizes = []
+        for children in self.children:
+            sizes.append(sum(sizes[child] for child in children) if children else 1)
+        return sizes[self.root]
+
+    def occurrences(self):
+        """How many times every node occurs in the expanded tree"""
+        counts = [0] * len(self.symbols)
+        counts[self.root] = 1
+        for node in range(len(self.symbols) - 1, -1, -1):
+            for child in self.children[node]:
+                counts[child] += counts[node]
+        return counts
+
+    def motions(self, rules, length):
+        """(offset, rotation) every node moves the turtle by, in the node's frame"""
+        turns = turtle_turns(rules)
+        motions = []
+        for node, children in enumerate(self.children):
+            symbol = self.symbols[node]
+            if children:
+                position, rotation, stack = (0.0, 0.0, 0.0), IDENTITY, []
+                for child in children:
+                    if self.children[child] or self.symbols[child] not in (PUSH, POP):
+                        offset, turn = motions[child]
+                        position = _advance(position, rotation, offset)
+                        rotation = multiply_quaternions(rotation, turn)
+                    elif self.symbols[child] == PUSH:
+                        stack.append((position, rotation))
+                    elif stack:
+                        position, rotation = stack.pop()
+                motions.append((position, rotation))
+            elif symbol in (FORWARD, MOVE):
+                motions.append(((0.0, 0.0, length), IDENTITY))
+            else:
+                motions.append(((0.0, 0.0, 0.0), turns.get(symbol, IDENTITY)))
+        return motions
+
+    def node_geometry(self, node, rules, length, radius, motions):
+        """What one node draws itself, in its own frame.
+
+        Returns (co, edges, radii, placements): the skeleton of the node's
+        leaf children like turtle_chunks draws it, and (child, position,
+        rotation) for each child subtree, which is drawn once on its own
+        and placed as an instance.
+        """
+        turns = turtle_turns(rules)
+        ratio = rules.get("radius_ratio", 0.7)
+        width = radius * ratio ** self.nests[node]
+        position, rotation, vertex, count = (0.0, 0.0, 0.0), IDENTITY, 0, 1
+        co, edges, radii, placements, stack = [0.0, 0.0, 0.0], [], [width], [], []
+
+        for child in self.children[node]:
+            symbol = self.symbols[child]
+            if self.children[child] or symbol in (FORWARD, MOVE):
+                if self.children[child]:
+                    placements.append((child, position, rotation))
+                offset, turn = motions[child]
+                position = _advance(position, rotation, offset)
+                rotation = multiply_quaternions(rotation, turn)
+                co.extend(position)
+                radii.append(width)
+                if symbol == FORWARD and not self.children[child]:
+                    edges.extend((vertex, count))
+                vertex = count
+                count += 1
+            elif symbol in turns:
+                rotation = multiply_quaternions(rotation, turns[symbol])
+            elif symbol == PUSH:
+                stack.append((position, rotation, vertex, width))
+                width *= ratio
+            elif symbol == POP and stack:
+                position, rotation, vertex, width = stack.pop()
+        return (np.array(co, dtype=np.float32).reshape(-1, 3),
+                np.array(edges, dtype=np.int32).reshape(-1, 2),
+                np.array(radii, dtype=np.float32),
+                placements)
+
+
+class LSystemPlant(growth_engine.Plant):
+    """Plant grown by rewriting: one derivation per week, up to rules["depth"].
+
+    With streamed set only the derivation count advances: no string or
+    nodes are kept, and the caller draws the plant with skeleton_arrays.
+    """
+    rewrites = True
+    streamed = False
+
+    def reset(self):
+        super().reset()
+        self.derived = (0, None)    # (derivation count, symbols), replaced as a whole
+
+    def extra_state(self):
+        return self.derived
+
+    def set_extra_state(self, state):
+        self.derived = state
+
+    def is_due(self, frame, rules):
+        return self.derived[0] < min(frame, rules.get("depth", 0))
+
+    def next_growth_frame(self, frame, rules):
+        derivations = self.derived[0]
+        if derivations >= rules.get("depth", 0):
+            return 0
+        return max(frame + 1, derivations + 1)
+
+    def growing_branches(self, frame, rules):
+        return []
+
+    def grow(self, frame, rules):
+        """Derive up to week `frame` and rebuild the nodes from the new string"""
+        if not self.is_due(frame, rules):
+            return None
+        target = min(frame, rules["depth"])
+        root = self.nodes[0]
+        self.nodes = [root]
+        self.branches = [Branch(0, -1, 0)]
+        self.branches[0].stems.append(root.index)
+
+        if self.streamed:
+            self.derived = (target, None)
+        else:
+            system = compile_rules(rules)
+            derivations, symbols = self.derived
+            if symbols is None:
+                derivations, symbols = 0, system.axiom
+            while derivations < target:
+                derivations += 1
+                symbols = system.derive(symbols, derivations, self.seed)
+            self.derived = (derivations, symbols)
+            interpret(self, symbols, rules, frame)
+
+        step = PlantStep(self.id, frame)
+        step.replace = True
+        step.branches = self.branches[1:]
+        step.nodes = self.nodes[1:]
+        return step
@@ -0,0 +1,165 @@
+"""Blue-noise placement of plants on the soil plane.
+
+SpatialHash buckets points into a uniform grid so neighbour queries only
+look at a few cells. poisson_disk throws darts at the cells of a finer
+grid in nine interleaved phases: cells of the same phase are too far apart
+to conflict, so every dart of a phase is tested and accepted at once with
+array operations. The result is a Poisson-disk (blue-noise) layout where
+no two plants are closer than their species' spacing.
+
+Spacing between plants of two species is the mean of their spacings, so
+every plant keeps a footprint of half its spacing around it.
+"""
+
+import math
+
+import numpy as np
+
+
+class SpatialHash:
+    """Uniform grid over 2D points with their spacings, for neighbour queries"""
+
+    def __init__(self, points, spacings, cell_size=None):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.spacings = np.broadcast_to(np.asarray(spacings, dtype=np.float64), len(self.points)).copy()
+        if cell_size is None:
+            cell_size = self.spacings.max() if len(self.points) else 1.0
+        self.cell_size = cell_size
+        keys = self._keys(np.floor(self.points / cell_size).astype(np.int64))
+        self.order = np.argsort(keys, kind="stable")
+        self.cells, self.starts, self.counts = np.unique(keys[self.order], return_index=True, return_counts=True)
+        self.most = int(self.counts.max()) if len(self.counts) else 0
+
+    def __len__(self):
+        return len(self.points)
+
+    @staticmethod
+    def _keys(cells):
+        # Cells are hashed to one int64; 2**31 cells a side is far beyond any garden
+        return (cells[..., 0] << 32) + cells[..., 1]
+
+    def _window(self, centres, reach):
+        """Candidate point indices around each centre, -1 where there is none"""
+        centres = np.asarray(centres, dtype=np.float64).reshape(-1, 2)
+        span = int(math.ceil(reach / self.cell_size))
+        base = np.floor(centres / self.cell_size).astype(np.int64)
+        columns = []
+        if not len(self.cells):
+            return np.full((len(centres), 0), -1, dtype=np.int64)
+        for dx in range(-span, span + 1):
+            for dy in range(-span, span + 1):
+                keys = self._keys(base + (dx, dy))
+                slot = np.minimum(np.searchsorted(self.cells, keys), len(self.cells) - 1)
+                found = self.cells[slot] == keys
+                start = self.starts[slot]
+                count = np.where(found, self.counts[slot], 0)
+                for k in range(self.most):
+                    columns.append(np.where(k < count, self.order[np.minimum(start + k, len(self.order) - 1)], -1))
+        return np.stack(columns, axis=1)
+
+    def conflicts(self, centres, spacings):
+        """Which centres, with their own spacings, are too close to a point"""
+        if not len(self.points):
+            return np.zeros(len(np.asarray(centres).reshape(-1, 2)), dtype=bool)
+        centres = np.asarray(centres, dtype=np.float64).reshape(-1, 2)
+        spacings = np.broadcast_to(np.asarray(spacings, dtype=np.float64), len(centres))
+        reach = (spacings.max(initial=0.0) + self.spacings.max()) / 2
+        window = self._window(centres, reach)
+        valid = window >= 0
+        offsets = self.points[np.maximum(window, 0)] - centres[:, None, :]
+        limits = (spacings[:, None] + self.spacings[np.maximum(window, 0)]) / 2
+        return (valid & ((offsets ** 2).sum(axis=2) < limits ** 2)).any(axis=1)
+
+    def query(self, centre, radius):
+        """Indices of the points within `radius` of `centre`, nearest first"""
+        window = self._window([centre], radius)[0]
+        window = window[window >= 0]
+        distances = np.hypot(*(self.points[window] - np.asarray(centre, dtype=np.float64)).T)
+        inside = distances <= radius
+        return window[inside][np.argsort(distances[inside], kind="stable")]
+
+
+def poisson_disk(bounds, spacing, rng, existing=None, count=None, attempts=8):
+    """Blue-noise points in bounds = (min_x, min_y, max_x, max_y).
+
+    No two new points are closer than `spacing`, and none is closer to a
+    point of the `existing` SpatialHash than the mean of both spacings.
+    Every empty cell gets one dart per phase and attempt, so the plane is
+    filled close to its maximal density; with `count` given, attempts stop
+    once that many points are placed (each attempt covers the whole plane).
+    """
+    min_x, min_y, max_x, max_y = bounds
+    cell = spacing / math.sqrt(2)       # at most one point per cell
+    nx = max(1, int(math.ceil((max_x - min_x) / cell)))
+    ny = max(1, int(math.ceil((max_y - min_y) / cell)))
+    pad = 2                             # a point's neighbours are at most two cells away
+    rows = ny + 2 * pad
+    # Point of every cell, flattened with a border; NaN marks an empty cell
+    grid_x = np.full((nx + 2 * pad) * rows, np.nan)
+    grid_y = np.full((nx + 2 * pad) * rows, np.nan)
+    offsets = [dx * rows + dy for dx in range(-pad, pad + 1) for dy in range(-pad, pad + 1)
+               if (dx, dy) != (0, 0) and abs(dx) + abs(dy) < 4]
+    limit = spacing * spacing
+    total = 0
+
+    phases = []
+    for px in range(3):
+        for py in range(3):
+            cells_x, cells_y = np.meshgrid(np.arange(px, nx, 3), np.arange(py, ny, 3), indexing="ij")
+            phases.append((cells_x.ravel(), cells_y.ravel()))
+
+    for _ in range(attempts):
+        if count is not None and total >= count:
+            break
+        for index, (cells_x, cells_y) in enumerate(phases):
+            flat = (cells_x + pad) * rows + cells_y + pad
+            empty = np.isnan(grid_x[flat])
+            cells_x, cells_y, flat = cells_x[empty], cells_y[empty], flat[empty]
+            if not len(flat):
+                continue
+            dart_x = min_x + (cells_x + rng.random(len(flat))) * cell
+            dart_y = min_y + (cells_y + rng.random(len(flat))) * cell
+            inside = (dart_x < max_x) & (dart_y < max_y)
+            for offset in offsets:
+                # NaN distances of empty neighbours compare False
+                near = (grid_x[flat + offset] - dart_x) ** 2 + (grid_y[flat + offset] - dart_y) ** 2 < limit
+                inside &= ~near
+            if existing is not None and len(existing):
+                inside[inside] = ~existing.conflicts(np.column_stack((dart_x[inside], dart_y[inside])), spacing)
+            grid_x[flat[inside]] = dart_x[inside]
+            grid_y[flat[inside]] = dart_y[inside]
+            total += np.count_nonzero(inside)
+            # Cells still empty after this pass are the only ones worth retrying
+            phases[index] = (cells_x[~inside], cells_y[~inside])
+
+    filled = ~np.isnan(grid_x)
+    return np.column_stack((grid_x[filled], grid_y[filled]))
+
+
+def place_species(bounds, species, seed, existing=None):
+    """Blue-noise layout for several species at once.
+
+    species is a list of (spacing, count); the widest spaced species is
+    placed first so the small ones fill the gaps, all kept clear of the
+    `existing` SpatialHash. Returns (points, labels) with labels indexing
+    into `species`; a species gets fewer than `count` points when no more
+    fit. The same seed gives the same layout.
+    """
+    rng = np.random.default_rng(seed)
+    hash_points = [] if existing is None else [existing.points]
+    hash_spacings = [] if existing is None else [existing.spacings]
+    placed, labels = [], []
+    for index in sorted(range(len(species)), key=lambda index: -species[index][0]):
+        spacing, count = species[index]
+        others = SpatialHash(np.concatenate(hash_points) if hash_points else np.empty((0, 2)),
+                             np.concatenate(hash_spacings) if hash_spacings else np.empty(0))
+        points = poisson_disk(bounds, spacing, rng, others, count)
+        # A random subset of a Poisson-disk layout is still one
+        points = points[rng.permutation(len(points))[:count]]
+        placed.append(points)
+        labels.append(np.full(len(points), index, dtype=np.int64))
+        hash_points.append(points)
+        hash_spacings.append(np.full(len(points), spacing))
+    if not placed:
+        return np.empty((0, 2)), np.empty(0, dtype=np.int64)
+    return np.concatenate(placed), np.concatenate(labels)
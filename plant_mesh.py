@@ -0,0 +1,250 @@
+"""Vertex and face arrays for plants drawn as one merged mesh.
+
+Instead of one Blender object per internode, every node of a plant is
+appended to a single set of arrays laid out the way Mesh.foreach_set
+expects them: flat vertex coordinates, loop vertex indices, and per
+polygon loop start, loop total and material index.
+"""
+
+import math
+
+import numpy as np
+
+import growth_engine
+import transform_kernel
+
+
+# Material slots of a merged plant mesh
+STEM_MATERIAL = 0
+LEAF_MATERIAL = 1
+PETAL_MATERIAL = 2
+CENTRE_MATERIAL = 3
+BABY_MATERIAL = 4
+MATERIAL_SLOTS = 5
+
+
+class Template:
+    """Local geometry of one part, instanced once per node"""
+
+    def __init__(self, verts, faces, materials, smooth=False):
+        self.verts = np.asarray(verts, dtype=np.float64)
+        self.loops = np.array([i for face in faces for i in face], dtype=np.int32)
+        self.totals = np.array([len(face) for face in faces], dtype=np.int32)
+        self.starts = np.concatenate(([0], np.cumsum(self.totals)[:-1])).astype(np.int32)
+        self.materials = np.broadcast_to(np.asarray(materials, dtype=np.int32), self.totals.shape)
+        self.smooth = smooth
+
+
+def cylinder_template(segments, radius=1.0, bottom=0.0, top=1.0, material=STEM_MATERIAL, smooth=True):
+    """Closed cylinder along Z, like primitive_cylinder_add"""
+    angles = np.arange(segments) * (2 * math.pi / segments)
+    ring = np.stack((np.cos(angles) * radius, np.sin(angles) * radius), axis=1)
+    verts = np.concatenate((np.column_stack((ring, np.full(segments, bottom))),
+                            np.column_stack((ring, np.full(segments, top)))))
+    faces = [(i, (i + 1) % segments, segments + (i + 1) % segments, segments + i)
+             for i in range(segments)]
+    faces.append(tuple(reversed(range(segments))))          # bottom cap
+    faces.append(tuple(range(segments, 2 * segments)))      # top cap
+    return Template(verts, faces, material, smooth)
+
+
+def sphere_template(segments, rings, radius, material):
+    verts = [(0.0, 0.0, radius)]
+    for ring in range(1, rings):
+        theta = math.pi * ring / rings
+        for segment in range(segments):
+            phi = 2 * math.pi * segment / segments
+            verts.append((radius * math.sin(theta) * math.cos(phi),
+                          radius * math.sin(theta) * math.sin(phi),
+                          radius * math.cos(theta)))
+    verts.append((0.0, 0.0, -radius))
+    bottom = len(verts) - 1
+
+    def ring_vertex(ring, segment):
+        return 1 + (ring - 1) * segments + segment % segments
+
+    faces = [(0, ring_vertex(1, s), ring_vertex(1, s + 1)) for s in range(segments)]
+    for ring in range(1, rings - 1):
+        faces += [(ring_vertex(ring, s), ring_vertex(ring + 1, s),
+                   ring_vertex(ring + 1, s + 1), ring_vertex(ring, s + 1)) for s in range(segments)]
+    faces += [(ring_vertex(rings - 1, s + 1), ring_vertex(rings - 1, s), bottom) for s in range(segments)]
+    return Template(verts, faces, material)
+
+
+def merge_templates(*templates):
+    verts, faces, materials = [], [], []
+    for template in templates:
+        offset = len(verts)
+        verts.extend(template.verts.tolist())
+        for start, total in zip(template.starts, template.totals):
+            faces.append(tuple(int(i) + offset for i in template.loops[start:start + total]))
+        materials.extend(template.materials.tolist())
+    return Template(verts, faces, materials)
+
+
+# The same shapes specific_object builds, at the same sizes
+LEAF = Template([(0, 0, 0), (0.5, 0, 0), (0, 0.5, 0), (0.5, 0.5, 0)], [(0, 1, 3, 2)], LEAF_MATERIAL)
+SUNFLOWER = merge_templates(
+    cylinder_template(32, 0.5, -0.015, 0.015, PETAL_MATERIAL, smooth=False),
+    cylinder_template(32, 0.2, -0.0175, 0.0175, CENTRE_MATERIAL, smooth=False))
+BABY = sphere_template(8, 6, 0.02, BABY_MATERIAL)
+PARTS = {"Leaf": LEAF, "Sunflower": SUNFLOWER, "Baby": BABY}
+
+
+def place_template(template, locations, rotations, scales=None):
+    """Vertices of `template` placed once per (location, rotation, scale)"""
+    matrices = transform_kernel.quaternions_to_matrices(np.asarray(rotations, dtype=np.float64))
+    local = np.broadcast_to(template.verts, (len(matrices),) + template.verts.shape)
+    if scales is not None:
+        local = local * np.asarray(scales, dtype=np.float64)[:, None, :]
+    verts = np.einsum("nij,nkj->nki", matrices, local)
+    return verts + np.asarray(locations, dtype=np.float64)[:, None, :]
+
+
+class PlantMesh:
+    """Geometry of one plant, grown by appending chunks of nodes"""
+
+    def __init__(self, radius, segments=32):
+        self.radius = radius
+        self.segments = segments
+        self.stem = cylinder_template(segments)
+        self.chunks = []
+        self.vertex_count = 0
+        self.loop_count = 0
+        self._arrays = None
+
+    def add(self, template, locations, rotations, scales=None):
+        count = len(locations)
+        if not count:
+            return
+        verts = place_template(template, locations, rotations, scales).reshape(-1, 3)
+        instance = np.arange(count, dtype=np.int32)
+        loops = (template.loops[None, :] + (instance * len(template.verts))[:, None]).ravel()
+        starts = (template.starts[None, :] + (instance * len(template.loops))[:, None]).ravel()
+
+        self.chunks.append((verts.astype(np.float32),
+                            loops + self.vertex_count,
+                            starts + self.loop_count,
+                            np.tile(template.totals, count),
+                            np.tile(template.materials, count),
+                            np.full(count * len(template.totals), template.smooth)))
+        self.vertex_count += len(verts)
+        self.loop_count += len(loops)
+        self._arrays = None
+
+    def add_nodes(self, nodes, flower_part=None):
+        """Append the geometry of engine nodes (stems, leaves, flowers).
+
+        Flowers are skipped when the plant type names no `flower_part`, as
+        for L-system rules whose K symbols only mark where flowers would go.
+        """
+        by_template = {}
+        for node in nodes:
+            if node.kind == growth_engine.STEM:
+                template, scale = self.stem, (self.radius, self.radius, node.length)
+            elif node.kind == growth_engine.LEAF:
+                template, scale = LEAF, (1.0, 1.0, 1.0)
+            elif flower_part is not None:
+                template, scale = PARTS[flower_part], (1.0, 1.0, 1.0)
+            else:
+                continue
+            group = by_template.setdefault(id(template), (template, [], [], []))
+            group[1].append(node.location)
+            group[2].append(node.rotation)
+            group[3].append(scale)
+        for template, locations, rotations, scales in by_template.values():
+            self.add(template, locations, rotations, scales)
+
+    def arrays(self):
+        """(co, vertex_index, loop_start, loop_total, material_index, use_smooth)"""
+        if self._arrays is None:
+            if self.chunks:
+                self._arrays = tuple(np.concatenate(column) for column in zip(*self.chunks))
+            else:
+                self._arrays = (np.empty((0, 3), np.float32), np.empty(0, np.int32),
+                                np.empty(0, np.int32), np.empty(0, np.int32),
+                                np.empty(0, np.int32), np.empty(0, bool))
+            self.chunks = [self._arrays]
+        return self._arrays
+
+
+# Level of detail: plants covering little of the camera frame get coarser geometry
+LOD_LEVELS = (
+    # (smallest projected size, stem segments, leaves and flowers, deepest branch shown)
+    (0.2, 32, True, None),
+    (0.05, 12, True, None),
+    (0.015, 6, False, 2),
+    (0.0, 3, False, 0),
+)
+
+
+def plant_bounds(nodes):
+    """(centre, diameter) of the box around the bases and tips of `nodes`"""
+    points = np.array([node.location for node in nodes] + [node.tip for node in nodes], dtype=np.float64)
+    low, high = points.min(axis=0), points.max(axis=0)
+    return (low + high) / 2, float(np.linalg.norm(high - low))
+
+
+def projected_sizes(centres, diameters, camera_matrix, angle, ortho_scale=None):
+    """Fraction of the frame each plant covers, seen from a camera.
+
+    camera_matrix is the camera's 4x4 world matrix (it looks down its local
+    -Z) and angle its field of view in radians; orthographic cameras give
+    ortho_scale instead. A camera inside a plant's bounds sees it whole,
+    one behind the camera gets 0.
+    """
+    centres = np.asarray(centres, dtype=np.float64).reshape(-1, 3)
+    diameters = np.asarray(diameters, dtype=np.float64)
+    if ortho_scale is not None:
+        return diameters / ortho_scale
+    matrix = np.asarray(camera_matrix, dtype=np.float64)
+    depth = (centres - matrix[:3, 3]) @ -matrix[:3, 2]
+    sizes = diameters / (2 * np.maximum(depth, 1e-6) * math.tan(angle / 2))
+    sizes = np.where(depth > diameters / 2, sizes, np.inf)
+    return np.where(depth < -diameters / 2, 0.0, sizes)
+
+
+def lod_levels(sizes, bias=1.0):
+    """Index into LOD_LEVELS for each projected size; bias > 1 keeps more detail"""
+    thresholds = np.array([level[0] for level in LOD_LEVELS])
+    return (thresholds[None, :] > np.asarray(sizes)[:, None] * bias).sum(axis=1)
+
+
+def lod_nodes(nodes, branches, level):
+    """The nodes drawn at LOD `level`"""
+    _, _, parts, max_depth = LOD_LEVELS[level]
+    return [node for node in nodes
+            if (parts or node.kind == growth_engine.STEM)
+            and (max_depth is None or branches[node.branch].depth <= max_depth)]
+
+
+# Frustum culling: which plants the camera can see at all
+def frame_extents(aspect, fit, angle, ortho_scale=None):
+    """Half width and half height of a camera's frame.
+
+    Tangents of the half angles for a perspective camera, distances for an
+    orthographic one. aspect is width / height, fit the camera's sensor_fit
+    and angle (or ortho_scale) the size along the fitted side.
+    """
+    size = ortho_scale / 2 if ortho_scale is not None else math.tan(angle / 2)
+    if fit == 'HORIZONTAL' or (fit == 'AUTO' and aspect >= 1):
+        return size, size / aspect
+    return size * aspect, size
+
+
+def in_view(centres, diameters, camera_matrix, extents, clip_end, orthographic=False):
+    """Which bounding spheres are at least partly inside a camera's view"""
+    centres = np.asarray(centres, dtype=np.float64).reshape(-1, 3)
+    radii = np.asarray(diameters, dtype=np.float64) / 2
+    matrix = np.asarray(camera_matrix, dtype=np.float64)
+    axes = matrix[:3, :3] / np.linalg.norm(matrix[:3, :3], axis=0)
+    local = (centres - matrix[:3, 3]) @ axes
+    depth = -local[:, 2]
+    visible = (depth > -radii) & (depth < clip_end + radii)
+    for offset, half in zip((local[:, 0], local[:, 1]), extents):
+        if orthographic:
+            visible &= np.abs(offset) - half < radii
+        else:
+            # Distance to the side plane through the camera
+            visible &= (np.abs(offset) - depth * half) / math.hypot(1.0, half) < radii
+    return visible
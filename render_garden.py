@@ -0,0 +1,140 @@
+"""Grow and render a garden without the Blender UI.
+
+    blender -b -P render_garden.py -- garden.json
+
+The JSON spec describes one garden; every key but "plants" and "output" is
+optional (the # notes are not part of the JSON):
+
+    {
+        "addon": "garden_planning",         # or "branching_prototype"
+        "seed": 7,                          # Garden Seed
+        "plane_size": 4.0,
+        "plants": [
+            {"type": "SUNFLOWER", "location": [0.2, 0.1, 0.0]},
+            {"type": "BABYSBREATH", "count": 40}
+        ],
+        "weeks": [1, 12],                   # first and last week rendered
+        "bake": true,                       # grow every week before rendering, see Bake Growth
+        "resolution": [1920, 1080],
+        "output": "/renders/garden_a",      # one image per week: week_0001.png ...
+        "format": "PNG",
+        "engine": "BLENDER_EEVEE",
+        "samples": 64,
+        "mesh_mode": "MERGED",              # Plant Mesh
+        "workers": 0                        # Worker Processes
+    }
+
+Plants with a "count" are laid out by the add-on's blue-noise placement,
+clear of the plants given by location. Run one Blender process per garden
+to render many of them, e.g. from a shell loop over spec files.
+"""
+
+import importlib
+import json
+import os
+import sys
+import time
+
+import bpy
+
+# The add-ons and the modules they import sit next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import garden_blender
+import growth_engine
+import placement
+
+
+def read_spec(argv):
+    """Spec file named after the -- that separates script arguments from Blender's"""
+    args = argv[argv.index("--") + 1:] if "--" in argv else []
+    if len(args) != 1:
+        raise SystemExit("usage: blender -b -P render_garden.py -- garden.json")
+    with open(args[0]) as spec_file:
+        spec = json.load(spec_file)
+    for key in ("plants", "output"):
+        if key not in spec:
+            raise SystemExit(f"{args[0]}: missing {key!r}")
+    return spec
+
+
+def empty_scene(scene):
+    """Remove the startup cube, camera and collections, and light the garden with a sun"""
+    bpy.data.batch_remove(garden_blender.scene_owned_ids(scene))
+    if not any(obj.type == 'LIGHT' for obj in scene.objects):
+        sun = bpy.data.objects.new("Sun", bpy.data.lights.new("Sun", 'SUN'))
+        sun.rotation_euler = (0.6, 0.2, 0.8)
+        scene.collection.objects.link(sun)
+
+
+def plant_garden(scene, plants):
+    """Plant the spec's plants: fixed locations first, then the counted ones by placement"""
+    fixed = [plant for plant in plants if "location" in plant]
+    counted = [plant for plant in plants if "location" not in plant]
+    unknown = {plant["type"] for plant in plants} - set(garden_blender.plants_rules)
+    if unknown:
+        raise SystemExit(f"unknown plant types: {', '.join(sorted(unknown))}")
+
+    garden_blender.plant_batch(scene, [tuple(plant["location"]) for plant in fixed],
+                               [plant["type"] for plant in fixed])
+    if counted:
+        species = [(garden_blender.plant_spacing(plant["type"]), plant["count"]) for plant in counted]
+        seed = growth_engine.derive_seed(scene.garden_seed, "placement", len(scene.garden_plants))
+        bounds = garden_blender.placement_bounds(scene, bpy.data.objects["soil"])
+        points, labels = placement.place_species(bounds, species, seed, garden_blender.planted_hash(scene))
+        garden_blender.plant_batch(scene, [(x, y, 0.0) for x, y in points.tolist()],
+                                   [counted[label]["type"] for label in labels.tolist()])
+        for plant, placed in zip(counted, [int((labels == index).sum()) for index in range(len(counted))]):
+            if placed < plant["count"]:
+                print(f"Only {placed} of {plant['count']} {plant['type']} plants fit")
+
+
+def render_garden(spec):
+    addon = importlib.import_module(spec.get("addon", "garden_planning"))
+    addon.register()
+    scene = bpy.context.scene
+    empty_scene(scene)
+
+    scene.garden_seed = spec.get("seed", 0)
+    scene.plane_size = spec.get("plane_size", scene.plane_size)
+    scene.plant_mesh_mode = spec.get("mesh_mode", scene.plant_mesh_mode)
+    scene.grow_workers = spec.get("workers", 0)
+    scene.growth_budget_ms = 0      # every week is grown in full before it is rendered
+    bpy.ops.mesh.add_custom_plane()
+    bpy.ops.object.add_camera()
+    scene.camera = bpy.data.objects["New_Scene_Camera"]
+    plant_garden(scene, spec["plants"])
+
+    render = scene.render
+    render.resolution_x, render.resolution_y = spec.get("resolution", (1920, 1080))
+    render.resolution_percentage = 100
+    render.engine = spec.get("engine", render.engine)
+    if "samples" in spec:
+        if render.engine == 'CYCLES':
+            scene.cycles.samples = spec["samples"]
+        else:
+            scene.eevee.taa_render_samples = spec["samples"]
+    render.image_settings.file_format = spec.get("format", "PNG")
+    output = os.path.abspath(spec["output"])
+    os.makedirs(output, exist_ok=True)
+
+    first, last = spec.get("weeks", (1, 12))
+    scene.frame_start, scene.frame_end = first, last
+    if spec.get("bake", False):
+        started = time.perf_counter()
+        count = garden_blender.bake_growth(scene, first, last)
+        print(f"Baked {count} objects in {time.perf_counter() - started:.2f} s")
+    scene.grow_mesh_running = True
+    for week in range(first, last + 1):
+        started = time.perf_counter()
+        scene.frame_set(week)       # grow_mesh_handler grows the week, unless it is baked
+        grown = time.perf_counter()
+        render.filepath = os.path.join(output, f"week_{week:04d}")
+        bpy.ops.render.render(write_still=True)
+        print(f"Week {week}: grown in {grown - started:.2f} s, rendered in {time.perf_counter() - grown:.2f} s")
+    scene.grow_mesh_running = False
+    garden_blender.garden.close()
+
+
+if __name__ == "__main__":
+    render_garden(read_spec(sys.argv))
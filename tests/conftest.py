@@ -0,0 +1,95 @@
+"""Shared helpers: the headless modules and a small mixed garden.
+
+The add-ons themselves need Blender, so the rules here mirror the plant
+types of garden_planning.py (node by node) and branching_prototype.py
+(L-systems).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import growth_engine    # noqa: E402
+
+
+RULES = {
+    "SUNFLOWER": {
+        "angle_of_branching": 0,
+        "radius": 0.1,
+        "height": 0.5,
+        "spacing": 0.45,
+        "stem_interval": 2,
+        "branch_interval": 0,
+        "sprout_interval": 2,
+        "sprout_angle": 45,
+        "last_week": 12,
+        "straight_stem": True,
+        "branch_leaf": True,
+        "leaf_angle": 15,
+        "flower_week": 12,
+        "flower_head": True,
+        "flower_part": "Sunflower",
+    },
+    "BABYSBREATH": {
+        "angle_of_branching": 1,
+        "radius": 0.01,
+        "height": 0.2,
+        "spacing": 0.25,
+        "stem_interval": 3,
+        "branch_interval": 5,
+        "sprout_interval": 2,
+        "sprout_angle": 45,
+        "last_week": 12,
+        "flower_week": 12,
+        "flower_interval": 4,
+        "flower_part": "Baby",
+    },
+    "TREE": {
+        "angle_of_branching": 45,
+        "radius": 0.05,
+        "height": 0.5,
+        "spacing": 0.8,
+        "axiom": "FA",
+        "productions": {
+            "A": [{"successor": "F[&A]///[&A]////[&AL]", "max_age": 3},
+                  {"successor": "F[&A]////[&AK]", "min_age": 4}],
+        },
+        "depth": 5,
+    },
+    "SHRUB": {
+        "angle_of_branching": 30,
+        "radius": 0.05,
+        "height": 0.5,
+        "spacing": 0.5,
+        "axiom": "A",
+        "productions": {
+            "A": [{"successor": "[&FA]//[&FA]//[&FA]//[&FA]", "weight": 2},
+                  {"successor": "[&FA]///[&FA]///[&FA]", "weight": 3},
+                  {"successor": "FA", "weight": 1, "min_depth": 2}],
+        },
+        "depth": 4,
+    },
+}
+
+WEEKS = 14
+
+
+def make_garden(workers=0, seed=7, count=24):
+    """A garden of `count` plants, cycling through every plant type"""
+    garden = growth_engine.Garden(RULES, workers=workers, seed=seed)
+    types = list(RULES)
+    for index in range(count):
+        plant_type = types[index % len(types)]
+        garden.add_plant(f"Plant.{index:03d}", plant_type, (index * 0.5, (index % 5) * 0.3, 0.0),
+                         RULES[plant_type]["radius"], RULES[plant_type]["height"])
+    return garden
+
+
+def garden_state(garden):
+    """Everything grown so far, per plant id, for comparing two gardens"""
+    return {plant.id: ([(node.kind, node.branch, node.frame, node.length,
+                         tuple(node.location), tuple(node.rotation), tuple(node.tip))
+                        for node in plant.nodes],
+                       [(branch.parent, branch.depth) for branch in plant.branches])
+            for plant in garden.plants.values()}
@@ -0,0 +1,137 @@
+"""Growth cache files and packed plant state round-trip the grown garden"""
+
+import os
+
+import numpy as np
+import pytest
+
+import frame_file
+from conftest import WEEKS, garden_state, make_garden
+
+
+def assert_close(state, expected):
+    """Same plants as `expected`, with positions as exact as float32 keeps them"""
+    assert state.keys() == expected.keys()
+    for plant_id, (nodes, branches) in state.items():
+        expected_nodes, expected_branches = expected[plant_id]
+        assert branches == expected_branches
+        assert [node[:3] for node in nodes] == [node[:3] for node in expected_nodes]
+        floats = [[node[3], *node[4], *node[5], *node[6]] for node in nodes]
+        expected_floats = [[node[3], *node[4], *node[5], *node[6]] for node in expected_nodes]
+        assert np.allclose(floats, expected_floats, atol=1e-5)
+
+
+def write_cache(path, first=1, last=WEEKS):
+    """Grow a garden into a cache; returns the live state of every week"""
+    garden = make_garden()
+    weeks = {}
+    with frame_file.FrameFileWriter(str(path), garden) as writer:
+        for week in range(1, last + 1):
+            garden.grow(week)
+            if week >= first:
+                writer.add(week)
+                weeks[week] = garden_state(garden)
+    return garden, weeks
+
+
+def test_frame_file_round_trips_every_week(tmp_path):
+    path = tmp_path / "garden.gfc"
+    garden, weeks = write_cache(path, first=3)
+    assert os.listdir(tmp_path) == ["garden.gfc"]
+
+    cache = frame_file.FrameFile(str(path))
+    assert (cache.first, cache.last, len(cache)) == (3, WEEKS, WEEKS - 2)
+    assert 2 not in cache and WEEKS in cache and WEEKS + 1 not in cache
+    assert cache.plant_ids == list(garden.plants)
+    assert cache.fingerprint == frame_file.garden_fingerprint(garden)
+
+    restored = make_garden()
+    for week in reversed(range(3, WEEKS + 1)):
+        restored.restore(cache.snapshot(week))
+        assert restored.frame == week
+        assert_close(garden_state(restored), weeks[week])
+    with pytest.raises(KeyError):
+        cache.snapshot(2)
+
+
+def test_growth_carries_on_from_a_cached_week(tmp_path):
+    path = tmp_path / "garden.gfc"
+    garden, _ = write_cache(path, last=4)
+    for week in range(5, WEEKS + 1):
+        garden.grow(week)
+
+    restored = make_garden()
+    restored.restore(frame_file.FrameFile(str(path)).snapshot(4))
+    for week in range(5, WEEKS + 1):
+        restored.grow(week)
+    assert_close(garden_state(restored), garden_state(garden))
+
+
+def test_writer_refuses_a_gap(tmp_path):
+    garden = make_garden()
+    writer = frame_file.FrameFileWriter(str(tmp_path / "garden.gfc"), garden)
+    garden.grow(1)
+    writer.add(1)
+    with pytest.raises(ValueError):
+        writer.add(3)
+
+
+def test_rewriting_a_cache_keeps_an_open_reader_whole(tmp_path):
+    path = tmp_path / "garden.gfc"
+    _, weeks = write_cache(path, last=6)
+    cache = frame_file.FrameFile(str(path))
+    write_cache(path, last=2)
+
+    restored = make_garden()
+    restored.restore(cache.snapshot(6))
+    assert_close(garden_state(restored), weeks[6])
+    assert frame_file.FrameFile(str(path)).last == 2
+    assert os.listdir(tmp_path) == ["garden.gfc"]
+
+
+def test_fingerprint_follows_what_growth_depends_on():
+    fingerprint = frame_file.garden_fingerprint(make_garden())
+    assert frame_file.garden_fingerprint(make_garden()) == fingerprint
+    assert frame_file.garden_fingerprint(make_garden(seed=8)) != fingerprint
+    assert frame_file.garden_fingerprint(make_garden(count=23)) != fingerprint
+
+    vectorized = make_garden()
+    vectorized.vectorized = True
+    assert frame_file.garden_fingerprint(vectorized) != fingerprint
+
+    moved = make_garden()
+    plant = moved.plants["Plant.000"]
+    plant.location = (plant.location[0] + 0.1,) + tuple(plant.location[1:])
+    assert frame_file.garden_fingerprint(moved) != fingerprint
+
+    # Plant order does not matter
+    reordered = make_garden()
+    reordered.plants = dict(reversed(list(reordered.plants.items())))
+    assert frame_file.garden_fingerprint(reordered) == fingerprint
+
+
+def test_packed_plants_round_trip():
+    garden = make_garden()
+    for week in range(1, 8):
+        garden.grow(week)
+    plants = list(garden.plants.values())
+    arrays = frame_file.pack_plants(plants)
+    assert arrays["node_floats"].dtype == np.float32
+    assert arrays["node_ints"].dtype == np.int32
+
+    restored = make_garden()
+    restored.restore(frame_file.unpack_plants({name: array.tolist() for name, array in arrays.items()},
+                                              7, list(restored.plants.values())))
+    assert restored.frame == 7
+    assert_close(garden_state(restored), garden_state(garden))
+
+
+def test_unpacking_for_other_plants_fails():
+    garden = make_garden()
+    garden.grow(1)
+    arrays = frame_file.pack_plants(list(garden.plants.values()))
+    with pytest.raises(ValueError):
+        frame_file.unpack_plants(arrays, 1, list(make_garden(count=23).plants.values()))
+    arrays["branches"] = arrays["branches"][:-2]
+    with pytest.raises(ValueError):
+        frame_file.unpack_plants(arrays, 1, list(garden.plants.values()))
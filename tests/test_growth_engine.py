@@ -0,0 +1,179 @@
+"""Growth engine: plants follow their rules, and grow the same every time"""
+
+import math
+
+import growth_engine
+from conftest import RULES, WEEKS, garden_state, make_garden
+
+
+def grown(garden, weeks=WEEKS):
+    for week in range(1, weeks + 1):
+        garden.grow(week)
+    return garden_state(garden)
+
+
+def close(a, b):
+    return all(math.isclose(x, y, abs_tol=1e-9) for x, y in zip(a, b))
+
+
+def test_sunflower_follows_its_rules():
+    garden = growth_engine.Garden(RULES)
+    plant = garden.add_plant("Sunflower", "SUNFLOWER", (1.0, 2.0, 0.0), 0.1, 0.5, seed=3)
+    grown(garden)
+
+    main = [plant.nodes[index] for index in plant.branches[0].stems]
+    assert [node.frame for node in main] == [0, 2, 4, 6, 8, 10, 12]
+    assert all(node.rotation == growth_engine.IDENTITY for node in main)
+    # Each new internode starts on top of one grown before it
+    for index, node in enumerate(main[1:], 1):
+        assert any(close(node.location, parent.top()) for parent in main[:index])
+
+    flowers = [node for node in plant.nodes if node.kind == growth_engine.FLOWER]
+    assert len(flowers) == 1 and flowers[0].frame == 12
+    assert close(flowers[0].location, main[-1].top())
+
+    # A side branch with a leaf sprouts every other week, but not in the flower week
+    sides = plant.branches[1:]
+    assert [(branch.parent, branch.depth) for branch in sides] == [(0, 1)] * 5
+    for branch in sides:
+        nodes = [node for node in plant.nodes if node.branch == branch.index]
+        assert [node.kind for node in nodes] == [growth_engine.STEM, growth_engine.LEAF]
+        assert close(nodes[1].location, nodes[0].top())
+
+
+def test_steps_hold_what_grew_that_week():
+    garden = make_garden()
+    counts = {plant.id: len(plant.nodes) for plant in garden.plants.values()}
+    for week in range(1, WEEKS + 1):
+        for step in garden.grow(week):
+            assert step.frame == week
+            assert all(node.frame == week for node in step.nodes)
+            nodes = garden.plants[step.plant_id].nodes
+            # An L-system step replaces everything above the planted stem
+            if step.replace:
+                assert step.nodes == nodes[1:]
+                counts[step.plant_id] = 1 + len(step.nodes)
+            else:
+                assert step.nodes == nodes[-len(step.nodes):]
+                counts[step.plant_id] += len(step.nodes)
+        assert garden.node_count() == sum(counts.values())
+    # Nothing is left to grow after the last week of every rule
+    assert garden.grow(WEEKS + 10) == []
+
+
+def test_schedule_grows_the_plants_due_each_week():
+    garden = make_garden()
+    # Week 9 jumps ahead and rebuilds the schedule; Late is planted mid-way
+    for week in [1, 2, 3, 4, 5, 6, 9, 10, 11, 12, 13, 14]:
+        if week == 5:
+            garden.add_plant("Late", "BABYSBREATH", (9.0, 9.0, 0.0), 0.01, 0.2, seed=99)
+        due = [plant.id for plant in garden.plants.values() if plant.is_due(week, RULES[plant.type])]
+        assert [step.plant_id for step in garden.grow(week)] == due
+
+
+def test_same_seeds_grow_the_same_garden():
+    assert grown(make_garden()) == grown(make_garden())
+
+
+def test_parallel_growth_matches_serial():
+    serial = grown(make_garden())
+    garden = make_garden(workers=2)
+    try:
+        assert grown(garden) == serial
+    finally:
+        garden.close()
+
+
+def test_parallel_growth_keeps_the_plants_and_their_nodes():
+    garden = make_garden(workers=2)
+    try:
+        plants = dict(garden.plants)
+        grown(garden, 6)
+        week_six = garden.snapshot(6)
+        grown(garden)
+    finally:
+        garden.close()
+
+    assert all(garden.plants[plant_id] is plant for plant_id, plant in plants.items())
+    # Nodes grown by week six are still the ones its snapshot holds
+    for plant_id, (nodes, _, _) in week_six.plants.items():
+        if not plants[plant_id].rewrites:
+            assert all(a is b for a, b in zip(nodes, garden.plants[plant_id].nodes))
+    assert garden.restore(garden.snapshot(WEEKS)) == []
+
+
+def test_sliced_growth_matches_serial():
+    for vectorized in (False, True):
+        whole = make_garden()
+        whole.vectorized = vectorized
+        expected = grown(whole)
+        garden = make_garden()
+        garden.vectorized = vectorized
+        for week in range(1, WEEKS + 1):
+            growth = garden.start_week(week)
+            while not growth.finished:
+                growth.grow(3)
+            assert growth.done == len(growth)
+        assert garden_state(garden) == expected
+
+
+def test_vectorized_growth_is_deterministic():
+    garden = make_garden()
+    garden.vectorized = True
+    vectorized = grown(garden)
+    again = make_garden()
+    again.vectorized = True
+    assert grown(again) == vectorized
+
+    # Its own random stream places the nodes, but the plants grow the same parts
+    def parts(state):
+        return {plant_id: ([node[:4] for node in nodes], branches)
+                for plant_id, (nodes, branches) in state.items()}
+    assert parts(vectorized) == parts(grown(make_garden()))
+
+    for plant in garden.plants.values():
+        tips = [plant.location]
+        for node in plant.nodes:
+            assert math.isclose(sum(c * c for c in node.rotation), 1.0)
+            assert any(close(node.location, tip) for tip in tips)
+            dx, dy, dz = growth_engine.rotate_vector(node.rotation, (0.0, 0.0, node.length))
+            x, y, z = node.location
+            assert close(node.tip, (x + dx, y + dy, z + dz))
+            tips.append(node.tip)
+
+
+def test_plant_seeds_come_from_garden_seed():
+    assert grown(make_garden(seed=3)) == grown(make_garden(seed=3))
+    assert grown(make_garden(seed=3)) != grown(make_garden(seed=4))
+
+
+def test_restore_then_grow_matches_serial():
+    serial = grown(make_garden())
+    garden = make_garden()
+    grown(garden, 6)
+    week_six = garden.snapshot(6)
+    grown(garden)
+
+    garden.restore(week_six)
+    for week in range(7, WEEKS + 1):
+        garden.grow(week)
+    assert garden_state(garden) == serial
+
+
+def test_regrow_from_planted_matches_serial():
+    serial = grown(make_garden())
+    garden = make_garden()
+    grown(garden, 9)
+
+    garden.restore(garden.planted())
+    assert garden.frame == 0
+    assert all(len(plant.nodes) == 1 for plant in garden.plants.values())
+    assert grown(garden) == serial
+
+
+def test_reset_grows_again_from_the_planted_stems():
+    garden = make_garden()
+    first = grown(garden)
+    garden.reset()
+    assert all(len(plant.nodes) == 1 for plant in garden.plants.values())
+    assert grown(garden) == first
@@ -0,0 +1,115 @@
+"""L-systems: derivation, the turtle, and the streamed and shared forms of the derived string"""
+
+import numpy as np
+import pytest
+
+import growth_engine
+import lsystem
+from conftest import RULES, WEEKS, make_garden
+
+
+DEPTH_RULES = {
+    "angle_of_branching": 20,
+    "axiom": "A",
+    "productions": {
+        # Deterministic, but the successor depends on the [ ] depth
+        "A": [{"successor": "F[+A][-A]FA", "max_depth": 1},
+              {"successor": "F[^AL]A", "min_depth": 2}],
+    },
+    "depth": 5,
+}
+
+
+def derived(system, depth, seed):
+    symbols = system.axiom
+    for age in range(1, depth + 1):
+        symbols = system.derive(symbols, age, seed)
+    return symbols.tobytes()
+
+
+def test_derivation_rewrites_every_symbol_at_once():
+    system = lsystem.compile_rules({"axiom": "FA", "productions": {"A": "F[+A]"}})
+    symbols = system.derive(system.axiom)
+    assert symbols.tobytes() == b"FF[+A]"
+    assert system.derive(symbols).tobytes() == b"FF[+F[+A]]"
+    assert lsystem.compile_rules({"axiom": "FA", "productions": {"A": "F[+A]"}}) is system
+
+
+def test_turtle_draws_a_node_per_symbol():
+    garden = make_garden(count=4)
+    for week in range(1, WEEKS + 1):
+        garden.grow(week)
+
+    for plant in garden.plants.values():
+        rules = RULES[plant.type]
+        if "axiom" not in rules:
+            continue
+        count, symbols = plant.extra_state()
+        assert count == rules["depth"]
+        symbols = symbols.tobytes()
+        kinds = [node.kind for node in plant.nodes[1:]]
+        assert kinds.count(growth_engine.STEM) == symbols.count(b"F")
+        assert kinds.count(growth_engine.LEAF) == symbols.count(b"L")
+        assert kinds.count(growth_engine.FLOWER) == symbols.count(b"K")
+        # The turtle starts on top of the planted stem
+        assert plant.nodes[1].location == plant.nodes[0].tip
+        for branch in plant.branches[1:]:
+            parent = plant.branches[branch.parent]
+            assert branch.parent < branch.index and branch.depth == parent.depth + 1
+
+
+@pytest.mark.parametrize("rules", [RULES["TREE"], RULES["SHRUB"], DEPTH_RULES], ids=["tree", "shrub", "depth"])
+@pytest.mark.parametrize("chunk_size", [1, 7, lsystem.CHUNK_SIZE])
+def test_streamed_derivation_matches_derive(rules, chunk_size):
+    system = lsystem.compile_rules(rules)
+    longest = max(len(successor) for successor in system.successors)
+    for seed in (0, 1, 12345):
+        for depth in range(rules["depth"] + 1):
+            chunks = list(lsystem.derivation_chunks(system, depth, chunk_size, seed))
+            assert b"".join(chunks) == derived(system, depth, seed)
+            assert all(len(chunk) < chunk_size + longest for chunk in chunks[:-1])
+
+
+def test_stochastic_derivation_depends_on_seed():
+    system = lsystem.compile_rules(RULES["SHRUB"])
+    assert system.stochastic
+    strings = {derived(system, 4, seed) for seed in range(8)}
+    assert len(strings) > 1
+
+
+def test_symbol_counts_match_derive():
+    system = lsystem.compile_rules(RULES["TREE"])
+    assert not system.positional
+    for depth in range(RULES["TREE"]["depth"] + 1):
+        symbols = np.frombuffer(derived(system, depth, 0), dtype=np.uint8)
+        assert np.array_equal(system.symbol_counts(depth), np.bincount(symbols, minlength=256))
+
+
+@pytest.mark.parametrize("rules", [RULES["TREE"], RULES["SHRUB"]], ids=["tree", "shrub"])
+def test_skeleton_has_a_vertex_per_move_and_an_edge_per_stem(rules):
+    system = lsystem.compile_rules(rules)
+    depth = rules["depth"]
+    symbols = derived(system, depth, 3)
+    co, edges, radii = lsystem.skeleton_arrays(system, rules, depth, (1.0, 2.0, 0.0), 0.5, 0.05,
+                                               chunk_size=5, seed=3)
+    assert len(co) == len(radii) == 1 + symbols.count(b"F") + symbols.count(b"f")
+    assert len(edges) == symbols.count(b"F")
+    assert tuple(co[0]) == (1.0, 2.0, 0.0)
+    assert edges.min() >= 0 and edges.max() < len(co)
+
+    whole = lsystem.skeleton_arrays(system, rules, depth, (1.0, 2.0, 0.0), 0.5, 0.05, seed=3)
+    for sliced, unsliced in zip((co, edges, radii), whole):
+        assert np.array_equal(sliced, unsliced)
+
+
+def test_subtree_dag_stands_for_the_derived_string():
+    for rules in (RULES["TREE"], DEPTH_RULES):
+        system = lsystem.compile_rules(rules)
+        dag = lsystem.SubtreeDAG(system, rules["depth"])
+        assert dag.expanded_size() == len(derived(system, rules["depth"], 0))
+        assert len(dag) < dag.expanded_size()
+
+
+def test_subtree_dag_refuses_stochastic_rules():
+    with pytest.raises(ValueError):
+        lsystem.SubtreeDAG(lsystem.compile_rules(RULES["SHRUB"]), 3)
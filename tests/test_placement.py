@@ -0,0 +1,88 @@
+"""Placement: blue-noise layouts keep every plant's spacing"""
+
+import numpy as np
+
+import placement
+
+
+BOUNDS = (-2.0, -1.0, 4.0, 3.0)
+
+
+def distances(a, b):
+    return np.hypot(*(a[:, None, :] - b[None, :, :]).transpose(2, 0, 1))
+
+
+def assert_inside(points, bounds=BOUNDS):
+    min_x, min_y, max_x, max_y = bounds
+    assert (points[:, 0] >= min_x).all() and (points[:, 0] < max_x).all()
+    assert (points[:, 1] >= min_y).all() and (points[:, 1] < max_y).all()
+
+
+def test_poisson_disk_keeps_spacing():
+    points = placement.poisson_disk(BOUNDS, 0.3, np.random.default_rng(1))
+    assert len(points) > 100
+    assert_inside(points)
+    gaps = distances(points, points)
+    np.fill_diagonal(gaps, np.inf)
+    assert gaps.min() >= 0.3
+
+
+def test_poisson_disk_fills_the_plane():
+    # A maximal layout leaves no gap wider than twice the spacing
+    spacing = 0.3
+    points = placement.poisson_disk(BOUNDS, spacing, np.random.default_rng(2), attempts=30)
+    grid = np.stack(np.meshgrid(np.linspace(-1.5, 3.5, 40), np.linspace(-0.5, 2.5, 30)), axis=-1).reshape(-1, 2)
+    assert distances(grid, points).min(axis=1).max() < 2 * spacing
+
+
+def test_poisson_disk_stops_at_count():
+    # Attempts cover the whole plane, so the count is a floor, not an exact size
+    points = placement.poisson_disk(BOUNDS, 0.3, np.random.default_rng(3), count=20)
+    full = placement.poisson_disk(BOUNDS, 0.3, np.random.default_rng(3))
+    assert 20 <= len(points) < len(full)
+
+
+def test_poisson_disk_keeps_clear_of_existing_points():
+    existing = placement.SpatialHash([(0.0, 0.0), (1.0, 1.0), (2.5, 0.5)], [0.8, 0.8, 1.2])
+    points = placement.poisson_disk(BOUNDS, 0.3, np.random.default_rng(4), existing)
+    limits = (0.3 + existing.spacings[None, :]) / 2
+    assert (distances(points, existing.points) >= limits).all()
+
+
+def test_place_species_keeps_mixed_spacing():
+    existing = placement.SpatialHash([(0.5, 0.5)], 0.8)
+    species = [(0.25, 60), (0.45, 25), (0.8, 5)]
+    points, labels = placement.place_species(BOUNDS, species, 9, existing)
+    assert_inside(points)
+    assert np.bincount(labels, minlength=3).tolist() == [60, 25, 5]
+
+    spacings = np.array([spacing for spacing, _ in species])[labels]
+    gaps = distances(points, points)
+    np.fill_diagonal(gaps, np.inf)
+    assert (gaps >= (spacings[:, None] + spacings[None, :]) / 2).all()
+    assert (distances(points, existing.points)[:, 0] >= (spacings + 0.8) / 2).all()
+
+
+def test_place_species_gives_fewer_points_when_full():
+    points, labels = placement.place_species((0.0, 0.0, 1.0, 1.0), [(0.5, 100)], 0)
+    assert 0 < len(points) < 100
+
+
+def test_place_species_is_seeded():
+    species = [(0.25, 40), (0.45, 10)]
+    first = placement.place_species(BOUNDS, species, 5)
+    second = placement.place_species(BOUNDS, species, 5)
+    other = placement.place_species(BOUNDS, species, 6)
+    assert all(np.array_equal(a, b) for a, b in zip(first, second))
+    assert not np.array_equal(first[0], other[0])
+
+
+def test_spatial_hash_query_is_nearest_first():
+    rng = np.random.default_rng(8)
+    points = rng.random((200, 2)) * 5
+    grid = placement.SpatialHash(points, 0.4)
+    centre = (2.5, 2.5)
+    found = grid.query(centre, 0.7)
+    reach = np.hypot(*(points - centre).T)
+    assert sorted(found.tolist()) == np.flatnonzero(reach <= 0.7).tolist()
+    assert (np.diff(reach[found]) >= 0).all()
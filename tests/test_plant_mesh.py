@@ -0,0 +1,95 @@
+"""Merged plant meshes, level of detail and frustum culling"""
+
+import math
+
+import numpy as np
+
+import growth_engine
+import plant_mesh
+from conftest import RULES, WEEKS
+
+
+def grown_plant(plant_type, weeks=WEEKS):
+    garden = growth_engine.Garden(RULES, seed=2)
+    garden.add_plant("Plant", plant_type, (1.0, 2.0, 0.0), RULES[plant_type]["radius"], RULES[plant_type]["height"])
+    for week in range(1, weeks + 1):
+        garden.grow(week)
+    return garden.plants["Plant"]
+
+
+def kinds(nodes):
+    return [sum(node.kind == kind for node in nodes)
+            for kind in (growth_engine.STEM, growth_engine.LEAF, growth_engine.FLOWER)]
+
+
+def test_add_nodes_draws_every_part():
+    plant = grown_plant("SUNFLOWER")
+    stems, leaves, flowers = kinds(plant.nodes)
+    assert stems and leaves and flowers
+
+    mesh = plant_mesh.PlantMesh(0.1, segments=8)
+    mesh.add_nodes(plant.nodes, "Sunflower")
+    co, vertex_index, loop_start, loop_total, material_index, use_smooth = mesh.arrays()
+    assert len(co) == stems * 16 + leaves * 4 + flowers * len(plant_mesh.SUNFLOWER.verts)
+    assert len(loop_start) == len(loop_total) == len(material_index) == len(use_smooth)
+    assert loop_start[-1] + loop_total[-1] == len(vertex_index)
+    assert vertex_index.max() == len(co) - 1
+    assert set(material_index.tolist()) == {plant_mesh.STEM_MATERIAL, plant_mesh.LEAF_MATERIAL,
+                                            plant_mesh.PETAL_MATERIAL, plant_mesh.CENTRE_MATERIAL}
+
+
+def test_add_nodes_skips_flowers_without_a_part():
+    plant = grown_plant("SUNFLOWER")
+    stems, leaves, _ = kinds(plant.nodes)
+    mesh = plant_mesh.PlantMesh(0.1, segments=8)
+    mesh.add_nodes(plant.nodes)
+    assert mesh.vertex_count == stems * 16 + leaves * 4
+    assert plant_mesh.PETAL_MATERIAL not in mesh.arrays()[4]
+
+
+def test_stems_run_from_base_to_tip():
+    plant = grown_plant("BABYSBREATH")
+    stems = [node for node in plant.nodes if node.kind == growth_engine.STEM]
+    mesh = plant_mesh.PlantMesh(0.01, segments=6)
+    mesh.add_nodes(stems)
+    rings = mesh.arrays()[0].reshape(len(stems), 2, 6, 3).mean(axis=2)
+    assert np.allclose(rings[:, 0], [node.location for node in stems], atol=1e-5)
+    assert np.allclose(rings[:, 1], [node.tip for node in stems], atol=1e-5)
+
+
+def test_arrays_grow_in_chunks():
+    plant = grown_plant("BABYSBREATH")
+    whole = plant_mesh.PlantMesh(0.01)
+    whole.add_nodes(plant.nodes, "Baby")
+    chunked = plant_mesh.PlantMesh(0.01)
+    for start in range(0, len(plant.nodes), 5):
+        chunked.add_nodes(plant.nodes[start:start + 5], "Baby")
+        chunked.arrays()
+    assert whole.vertex_count == chunked.vertex_count
+    # Each call groups its own nodes by part, so only the vertex order differs
+    assert np.allclose(np.sort(whole.arrays()[0], axis=0), np.sort(chunked.arrays()[0], axis=0))
+
+
+def test_lod_drops_parts_then_branches():
+    plant = grown_plant("BABYSBREATH")
+    levels = plant_mesh.lod_levels([1.0, 0.1, 0.02, 0.001])
+    assert levels.tolist() == [0, 1, 2, 3]
+    assert plant_mesh.lod_levels([0.1], bias=3.0).tolist() == [0]
+
+    full = plant_mesh.lod_nodes(plant.nodes, plant.branches, 0)
+    coarse = plant_mesh.lod_nodes(plant.nodes, plant.branches, 3)
+    assert full == plant.nodes
+    assert coarse and all(node.kind == growth_engine.STEM and node.branch == 0 for node in coarse)
+
+
+def test_culling_and_projected_size():
+    # A camera at (0, 0, 10) looking down -Z with a 90 degree view
+    camera = np.eye(4)
+    camera[2, 3] = 10.0
+    extents = plant_mesh.frame_extents(1.0, 'AUTO', math.pi / 2)
+    centres = [(0.0, 0.0, 0.0), (9.0, 0.0, 0.0), (11.0, 0.0, 0.0), (0.0, 0.0, 20.0), (0.0, 0.0, -200.0)]
+    visible = plant_mesh.in_view(centres, [1.0] * 5, camera, extents, clip_end=100.0)
+    assert visible.tolist() == [True, True, False, False, False]
+
+    sizes = plant_mesh.projected_sizes(centres[:1] + centres[3:4], [1.0, 1.0], camera, math.pi / 2)
+    assert np.allclose(sizes, [1.0 / 20.0, 0.0])
@@ -0,0 +1,80 @@
+"""Transform kernel: the batched maths agrees with the per-node maths"""
+
+import math
+
+import numpy as np
+
+import growth_engine
+import transform_kernel
+
+
+def random_quaternions(count, seed=0):
+    quats = np.random.default_rng(seed).normal(size=(count, 4))
+    return quats / np.linalg.norm(quats, axis=1)[:, None]
+
+
+def euler_matrices(eulers):
+    """XYZ Euler angles to matrices, as Euler.to_matrix does"""
+    matrices = []
+    for x, y, z in eulers:
+        rx = np.array([[1, 0, 0], [0, math.cos(x), -math.sin(x)], [0, math.sin(x), math.cos(x)]])
+        ry = np.array([[math.cos(y), 0, math.sin(y)], [0, 1, 0], [-math.sin(y), 0, math.cos(y)]])
+        rz = np.array([[math.cos(z), -math.sin(z), 0], [math.sin(z), math.cos(z), 0], [0, 0, 1]])
+        matrices.append(rz @ ry @ rx)
+    return np.array(matrices)
+
+
+def euler_quaternion(x, y, z):
+    """Euler((x, y, z)).to_quaternion()"""
+    cx, sx = math.cos(x / 2), math.sin(x / 2)
+    cy, sy = math.cos(y / 2), math.sin(y / 2)
+    cz, sz = math.cos(z / 2), math.sin(z / 2)
+    return (cx * cy * cz + sx * sy * sz, sx * cy * cz - cx * sy * sz,
+            cx * sy * cz + sx * cy * sz, cx * cy * sz - sx * sy * cz)
+
+
+def test_euler_angles_give_the_quaternion_rotation():
+    quats = random_quaternions(500)
+    eulers = transform_kernel.quaternions_to_euler(quats)
+    assert eulers.shape == (500, 3)
+    assert np.allclose(euler_matrices(eulers), transform_kernel.quaternions_to_matrices(quats))
+    # The smaller of the two solutions, as Blender picks it
+    x, y, z = eulers.T
+    other = np.stack((x - np.copysign(math.pi, x), np.copysign(math.pi, y) - y,
+                      z - np.copysign(math.pi, z)), axis=1)
+    assert (np.abs(eulers).sum(axis=1) <= np.abs(other).sum(axis=1) + 1e-9).all()
+
+
+def test_euler_angles_in_gimbal_lock():
+    quats = np.array([euler_quaternion(0.4, math.pi / 2, 0.0), euler_quaternion(0.4, -math.pi / 2, 0.3)])
+    eulers = transform_kernel.quaternions_to_euler(quats)
+    # Z is folded into X
+    assert np.allclose(np.abs(eulers[:, 1]), math.pi / 2)
+    assert np.allclose(eulers[:, 2], 0.0)
+    assert np.allclose(euler_matrices(eulers), transform_kernel.quaternions_to_matrices(quats))
+
+
+def test_euler_angles_of_plain_sequences():
+    assert transform_kernel.quaternions_to_euler([]).shape == (0, 3)
+    assert np.allclose(transform_kernel.quaternions_to_euler([growth_engine.IDENTITY]), 0.0)
+    assert np.allclose(transform_kernel.quaternions_to_euler([euler_quaternion(0.5, -0.2, 1.1)]),
+                       [(0.5, -0.2, 1.1)])
+
+
+def test_rotate_vectors_matches_matrices_and_engine():
+    quats = random_quaternions(50, seed=1)
+    vectors = np.random.default_rng(2).normal(size=(50, 3))
+    rotated = transform_kernel.rotate_vectors(quats, vectors)
+    assert np.allclose(rotated, np.einsum("nij,nj->ni", transform_kernel.quaternions_to_matrices(quats), vectors))
+    for quat, vector, expected in zip(quats.tolist(), vectors.tolist(), rotated):
+        assert np.allclose(growth_engine.rotate_vector(quat, vector), expected)
+
+
+def test_place_tips():
+    bases = np.array([(0.0, 0.0, 0.0), (1.0, 2.0, 3.0), (5.0, 5.0, 5.0)])
+    axes = np.array([(1.0, 0.0, 0.0), (0.0, 0.0, 0.0), (0.0, 1.0, 0.0)])
+    quats, tips = transform_kernel.place_tips(bases, [1.0, 2.0, 0.5], math.pi / 2, axes=axes,
+                                              straight=[False, False, True])
+    # A zero axis and a straight row both keep the identity rotation
+    assert np.allclose(quats[1:], growth_engine.IDENTITY)
+    assert np.allclose(tips, [(0.0, -1.0, 0.0), (1.0, 2.0, 5.0), (5.0, 5.0, 5.5)])
@@ -0,0 +1,107 @@
+"""Batched NumPy versions of the node placement maths.
+
+Every function works on whole arrays of growing tips: one call places all
+the nodes of a week instead of one matrix_world @ Vector and one
+Quaternion -> matrix -> Euler round trip per object. Quaternions are
+stored (w, x, y, z) like mathutils, Euler angles in Blender's XYZ order.
+"""
+
+import numpy as np
+
+
+def frame_rng(seed, frame):
+    """Deterministic random stream for one week of growth"""
+    return np.random.default_rng([seed, frame])
+
+
+def random_axes(rng, count):
+    """Random rotation axes, uniform in [-1, 1) per component like rotate_rand"""
+    return rng.uniform(-1.0, 1.0, (count, 3))
+
+
+def axis_angle_quaternions(axes, angles):
+    """Vectorized mathutils.Quaternion(axis, angle); zero axes give identity"""
+    axes = np.asarray(axes, dtype=np.float64)
+    angles = np.broadcast_to(np.asarray(angles, dtype=np.float64), axes.shape[:1])
+    lengths = np.linalg.norm(axes, axis=1)
+    zero = lengths == 0.0
+    half = np.where(zero, 0.0, angles / 2)
+    scale = np.sin(half) / np.where(zero, 1.0, lengths)
+
+    quats = np.empty((axes.shape[0], 4))
+    quats[:, 0] = np.cos(half)
+    quats[:, 1:] = axes * scale[:, None]
+    return quats
+
+
+def rotate_vectors(quats, vectors):
+    """Rotate each vector by the matching unit quaternion"""
+    w = quats[:, :1]
+    q = quats[:, 1:]
+    t = 2.0 * np.cross(q, vectors)
+    return vectors + w * t + np.cross(q, t)
+
+
+def tip_positions(bases, quats, lengths):
+    """Top of each node: base + rotation @ (0, 0, length)"""
+    up = np.zeros((len(lengths), 3))
+    up[:, 2] = lengths
+    return np.asarray(bases, dtype=np.float64) + rotate_vectors(quats, up)
+
+
+def quaternions_to_matrices(quats):
+    w, x, y, z = quats.T
+    matrices = np.empty((quats.shape[0], 3, 3))
+    matrices[:, 0, 0] = 1 - 2 * (y * y + z * z)
+    matrices[:, 0, 1] = 2 * (x * y - w * z)
+    matrices[:, 0, 2] = 2 * (x * z + w * y)
+    matrices[:, 1, 0] = 2 * (x * y + w * z)
+    matrices[:, 1, 1] = 1 - 2 * (x * x + z * z)
+    matrices[:, 1, 2] = 2 * (y * z - w * x)
+    matrices[:, 2, 0] = 2 * (x * z - w * y)
+    matrices[:, 2, 1] = 2 * (y * z + w * x)
+    matrices[:, 2, 2] = 1 - 2 * (x * x + y * y)
+    return matrices
+
+
+def quaternions_to_euler(quats):
+    """Vectorized Quaternion.to_matrix().to_euler() (XYZ order).
+
+    Blender picks the smaller of the two Euler solutions of a matrix, so
+    this does the same to give identical angles. `quats` may be any
+    sequence of (w, x, y, z), including an empty one.
+    """
+    m = quaternions_to_matrices(np.asarray(quats, dtype=np.float64).reshape(-1, 4))
+    cy = np.hypot(m[:, 0, 0], m[:, 1, 0])
+    regular = cy > 16 * np.finfo(np.float32).eps
+
+    first = np.stack((np.arctan2(m[:, 2, 1], m[:, 2, 2]),
+                      np.arctan2(-m[:, 2, 0], cy),
+                      np.arctan2(m[:, 1, 0], m[:, 0, 0])), axis=1)
+    second = np.stack((np.arctan2(-m[:, 2, 1], -m[:, 2, 2]),
+                       np.arctan2(-m[:, 2, 0], -cy),
+                       np.arctan2(-m[:, 1, 0], -m[:, 0, 0])), axis=1)
+    use_second = np.abs(second).sum(axis=1) < np.abs(first).sum(axis=1)
+    eulers = np.where(use_second[:, None], second, first)
+
+    # Gimbal lock: Z is folded into X
+    degenerate = np.stack((np.arctan2(-m[:, 1, 2], m[:, 1, 1]),
+                           np.arctan2(-m[:, 2, 0], cy),
+                           np.zeros_like(cy)), axis=1)
+    return np.where(regular[:, None], eulers, degenerate)
+
+
+def place_tips(bases, lengths, angles, rng=None, axes=None, straight=None):
+    """Place a batch of new nodes in one shot.
+
+    bases are the parent tips the new nodes start from. Random axes are
+    drawn from rng unless given; rows flagged in `straight` keep the
+    identity rotation. Returns (quaternions, tips).
+    """
+    count = len(lengths)
+    if axes is None:
+        axes = random_axes(rng, count)
+    quats = axis_angle_quaternions(axes, angles)
+    if straight is not None:
+        quats[np.asarray(straight, dtype=bool)] = (1.0, 0.0, 0.0, 0.0)
+    return quats, tip_positions(bases, quats, lengths)